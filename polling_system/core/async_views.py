@@ -0,0 +1,139 @@
+# core/async_views.py
+"""
+ASGI-native read endpoints, mounted under ``/api/async/``.
+
+Under ASGI a sync DRF view runs in a worker thread, one thread per
+in-flight request. These views run the hot reads (project list/detail,
+criteria, leaderboard) on the event loop instead: the async ``a*`` methods
+of the viewsets fetch with the async ORM and cache API, reuse the same
+filters, pagination, serializers and cached payloads as the sync
+endpoints, and return identical JSON.
+
+Only reads are served here; the sync endpoints remain the write path and
+work the same under WSGI and ASGI.
+
+``/api/stream/`` is the live counterpart of polling these endpoints: a
+Server-Sent Events stream fed by ``core.events``.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import events, vote_buffer
+from .leaderboard import DEFAULT_LIMIT, atop_projects
+from .models import Project
+from .renderers import ORJSONRenderer
+from .serializers import LeaderboardEntrySerializer
+from .viewsets import CriteriaViewSet, LeaderboardViewSet, ProjectViewSet
+
+
+# Set by ConditionalGetMixin; carried over when the DRF response is rendered here
+CONDITIONAL_HEADERS = ("ETag", "Last-Modified", "Cache-Control", "Vary")
+
+
+def _render(data, status=200):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def async_view(viewset_class, action, basename=None):
+    """Expose a viewset's async ``a<action>`` method as a plain async Django view (GET only)."""
+    handler = getattr(viewset_class, f"a{action}")
+
+    @wraps(handler)
+    async def view(request, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return _render({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        viewset = viewset_class(
+            request=request, args=(), kwargs=kwargs, action=action, basename=basename, format_kwarg=None
+        )
+        try:
+            # The viewset's authentication, permission and throttle checks.
+            # Token authentication looks the user up and throttles hit the
+            # cache, so those run off the event loop; without credentials or
+            # throttles the checks are plain attribute tests.
+            if "authorization" in request.headers or viewset.get_throttles():
+                await sync_to_async(viewset.initial)(request, **kwargs)
+            else:
+                viewset.initial(request, **kwargs)
+            response = await handler(viewset, request, **kwargs)
+        except Http404 as http404:
+            exc = NotFound(*http404.args)
+            return _render({"detail": exc.detail}, status=exc.status_code)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return _render(data, status=exc.status_code)
+        if not isinstance(response, Response):
+            # 304/412 from a conditional request, already final
+            return response
+        rendered = _render(response.data, status=response.status_code)
+        for header in CONDITIONAL_HEADERS:
+            if header in response:
+                rendered[header] = response[header]
+        return rendered
+
+    return view
+
+
+project_list = async_view(ProjectViewSet, "list", basename="project")
+project_detail = async_view(ProjectViewSet, "retrieve", basename="project")
+criteria_list = async_view(CriteriaViewSet, "list", basename="criteria")
+criteria_detail = async_view(CriteriaViewSet, "retrieve", basename="criteria")
+leaderboard = async_view(LeaderboardViewSet, "list", basename="leaderboard")
+
+
+async def live_stream(request):
+    """
+    GET /api/stream/                  leaderboard changes
+    GET /api/stream/?category=poll    changes within a category
+    GET /api/stream/?project=12       changes of one project
+
+    Starts with a ``snapshot`` event (the project, or the current top
+    entries), then sends an ``update`` event with ``vote_count``,
+    ``average_score``, ``weighted_score``, ``rank`` and ``category_rank``
+    whenever a matching project changes.
+    """
+    if request.method != "GET":
+        return _render({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    project_id, category = request.GET.get("project"), request.GET.get("category")
+    if project_id is not None:
+        if not project_id.isdigit():
+            return _render({"project": "Must be an integer"}, status=400)
+        channel = f"project:{project_id}"
+    elif category is not None:
+        if category not in dict(Project.CATEGORY_CHOICES):
+            return _render({"category": f"Unknown category '{category}'"}, status=400)
+        channel = f"category:{category}"
+    else:
+        channel = "leaderboard"
+
+    # Subscribe before reading the snapshot so no change falls in between
+    subscription = events.hub.subscribe([channel])
+    if project_id is not None:
+        initial = (await events.snapshot([int(project_id)])).get(int(project_id))
+        if initial is None:
+            subscription.close()
+            return _render({"detail": "No Project matches the given query."}, status=404)
+    else:
+        top = await atop_projects(category, DEFAULT_LIMIT)
+        initial = await vote_buffer.amerge(LeaderboardEntrySerializer(top, many=True).data)
+
+    async def stream():
+        keepalive = events.events_setting("KEEPALIVE_SECONDS")
+        try:
+            yield events.encode("snapshot", initial)
+            while True:
+                event = await subscription.get(timeout=keepalive)
+                yield ": keepalive\n\n" if event is None else events.encode("update", event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
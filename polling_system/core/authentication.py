@@ -0,0 +1,119 @@
+# core/authentication.py
+"""
+JWT authentication without the per-request User query.
+
+``CachedJWTAuthentication`` is simplejwt's ``JWTAuthentication`` with the
+user served from the shared cache for ``AUTH_CACHE["USER_TTL"]`` seconds.
+The cached copy leaves out the password hash; only its digest is kept,
+for the password-change check. The User signals in ``core.models`` drop
+the cached copy on every save or delete, so deactivating or editing a
+user takes effect on the next request. Writes that bypass signals (``QuerySet.update``) take effect
+within the TTL.
+
+Revocation lives in the same cache: a revoked token's ``jti`` is stored
+until the token would have expired, and is fetched in the same
+``get_many`` as the user. ``RotatingRefreshSerializer`` uses it to enforce
+``BLACKLIST_AFTER_ROTATION``. Each refresh token can be exchanged once,
+with no blacklist tables and no query. Use a cache that doesn't evict
+these keys (Redis without an eviction policy, not the per-process
+LocMemCache) when relying on this in production.
+"""
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import KEY_PREFIX, user_key
+
+DEFAULTS = {"USER_TTL": 60}
+
+
+def auth_cache_setting(name):
+    return getattr(settings, "AUTH_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def _revoked_key(jti):
+    return f"{KEY_PREFIX}:jwt:revoked:{jti}"
+
+
+def _remaining(token):
+    return max(int(token.get("exp", 0) - time.time()), 1)
+
+
+def is_revoked(token):
+    return cache.get(_revoked_key(token[api_settings.JTI_CLAIM])) is not None
+
+
+def revoke(token):
+    """
+    Reject ``token`` from now until it expires. Returns False if it was
+    already revoked, so it can be used as an atomic one-time claim.
+    """
+    return cache.add(_revoked_key(token[api_settings.JTI_CLAIM]), 1, timeout=_remaining(token))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        keys = [user_key(user_id), _revoked_key(validated_token.get(api_settings.JTI_CLAIM))]
+        found = cache.get_many(keys)
+        if keys[1] in found:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        if keys[0] not in found:
+            # Not cached: the stock lookup, including its active/password checks
+            user = super().get_user(validated_token)
+            cache.set(keys[0], self.cacheable(user), auth_cache_setting("USER_TTL"))
+            return user
+
+        user, password_digest = found[keys[0]]
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    @staticmethod
+    def cacheable(user):
+        """
+        ``(user, password digest)`` to cache: a copy of the user without its
+        password hash, which is left deferred. Reading it queries the
+        database, and ``save()`` leaves it alone.
+        """
+        copied = copy.copy(user)
+        del copied.__dict__["password"]
+        return copied, get_md5_hash_password(user.password)
+
+
+class RotatingRefreshSerializer(TokenRefreshSerializer):
+    """TokenRefreshSerializer enforcing BLACKLIST_AFTER_ROTATION through the cache."""
+
+    def validate(self, attrs):
+        if not (api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION):
+            return super().validate(attrs)
+        token = self.token_class(attrs["refresh"])
+        # Turn replays away before the user query, but only claim the token
+        # once the refresh went through, so a failed one can be retried
+        if is_revoked(token):
+            raise InvalidToken(_("Token is blacklisted"))
+        data = super().validate(attrs)
+        if not revoke(token):
+            raise InvalidToken(_("Token is blacklisted"))
+        return data
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication like the stock JWTAuthentication."""
+    target_class = "core.authentication.CachedJWTAuthentication"
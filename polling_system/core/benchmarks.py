@@ -0,0 +1,175 @@
+# core/benchmarks.py
+"""
+In-process benchmarks of the API hot paths, checked against committed budgets.
+
+Each scenario is one request through the full Django/DRF stack (APIClient,
+no server), run ``runs`` times against a dataset generated by
+``seed_nexus`` at one of ``SIZES``. Per scenario we record:
+
+* ``queries``: the most SQL queries any single request issued
+* ``p50_ms`` / ``p95_ms``: wall-clock latency
+* ``peak_kb``: tracemalloc peak during the first request, which is left
+  out of the timings so tracing doesn't skew them
+
+``check`` compares results with ``benchmark_budgets.json``. The budgets
+don't depend on the dataset size, so a request that grows with the data,
+such as a new N+1 or an unbounded prefetch, fails at the larger sizes even
+if it passes at the small ones. The response cache is off while
+measuring, so every request takes the database path.
+
+Run with ``manage.py bench_api``; ``core.tests`` checks the query budgets
+on a tiny dataset.
+"""
+import json
+import time
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+from statistics import median, quantiles
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from .models import Comment, Criteria, Project, User
+
+BUDGETS_FILE = Path(__file__).with_name("benchmark_budgets.json")
+PREFIX = "bench-api"
+
+# seed_nexus options per dataset size
+SIZES = {
+    "tiny": {"users": 20, "projects_per_category": 4, "votes": 100, "ratings": 200},
+    "small": {"users": 500, "projects_per_category": 100, "votes": 5_000, "ratings": 20_000},
+    "medium": {"users": 5_000, "projects_per_category": 1_000, "votes": 50_000, "ratings": 200_000},
+    "large": {"users": 20_000, "projects_per_category": 4_000, "votes": 300_000, "ratings": 1_000_000},
+}
+
+# Comment threads put on the benchmarked project: roots x replies each
+COMMENT_ROOTS, COMMENT_REPLIES = 40, 6
+
+
+def build_dataset(size, runs):
+    """
+    Seed a dataset and pick the most voted published project as the target.
+    Writes use one fresh judge per run so every vote and rating is new.
+    """
+    call_command("seed_nexus", prefix=PREFIX, seed=1, stdout=StringIO(), **SIZES[size])
+    target = Project.objects.filter(status="published").order_by("-vote_count", "pk").first()
+    reader, *repliers = User.objects.filter(username__startswith=f"{PREFIX}-").order_by("pk")[:COMMENT_REPLIES + 1]
+    judges = User.objects.bulk_create(
+        User(username=f"{PREFIX}-judge-{n}", email=f"{PREFIX}-judge-{n}@example.com") for n in range(runs)
+    )
+    roots = Comment.objects.bulk_create(
+        Comment(user=reader, project=target, content=f"Root {n}") for n in range(COMMENT_ROOTS)
+    )
+    Comment.objects.bulk_create(
+        Comment(user=user, project=target, parent=root, thread=root, content="Reply")
+        for root in roots for user in repliers
+    )
+    criteria = Criteria.objects.filter(project_category=target.category).order_by("order", "pk").first()
+    return SimpleNamespace(target=target, reader=reader, judges=judges, criteria=criteria)
+
+
+def _project_url(data):
+    return f"/api/projects/{data.target.pk}/"
+
+
+# name -> (method, path, user, body, expected status); path/user/body take (dataset, run)
+SCENARIOS = {
+    "project_list": ("get", lambda d, i: "/api/projects/", lambda d, i: d.reader, None, 200),
+    "project_detail": ("get", lambda d, i: _project_url(d), lambda d, i: d.reader, None, 200),
+    "vote": ("post", lambda d, i: _project_url(d) + "vote/", lambda d, i: d.judges[i], None, 201),
+    "unvote": ("delete", lambda d, i: _project_url(d) + "unvote/", lambda d, i: d.judges[i], None, 200),
+    "rating_create": (
+        "post", lambda d, i: _project_url(d) + "ratings/", lambda d, i: d.judges[i],
+        lambda d, i: {"criteria_id": d.criteria.pk, "score": 1 + i % 10}, 201,
+    ),
+    "comment_threads": ("get", lambda d, i: _project_url(d) + "comments/", lambda d, i: d.reader, None, 200),
+    "criteria_list": ("get", lambda d, i: "/api/criteria/", lambda d, i: d.reader, None, 200),
+}
+
+
+class BenchmarkError(AssertionError):
+    pass
+
+
+def _request(client, data, name, run):
+    method, path, user, body, expected = SCENARIOS[name]
+    client.force_authenticate(user(data, run))
+    response = getattr(client, method)(path(data, run), body(data, run) if body else None, format="json")
+    if response.status_code != expected:
+        raise BenchmarkError(f"{name}: expected HTTP {expected}, got {response.status_code}: {response.content[:200]}")
+    return response
+
+
+def measure(data, runs, scenarios=None, timing=True):
+    """
+    Results per scenario. Scenarios run in ``SCENARIOS`` order, each ``runs``
+    times (vote before unvote, so every unvote has a vote to remove). The
+    first run doubles as warm-up and is the one traced for memory; with
+    ``timing`` off only query counts are taken.
+    """
+    client = APIClient()
+    results = {}
+    with override_settings(RESPONSE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for name in scenarios or SCENARIOS:
+            result = results[name] = {"queries": 0}
+            timings = []
+            for run in range(runs):
+                traced = timing and run == 0
+                if traced:
+                    tracemalloc.start()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    _request(client, data, name, run)
+                    elapsed = time.perf_counter() - started
+                if traced:
+                    result["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                    tracemalloc.stop()
+                else:
+                    timings.append(elapsed)
+                result["queries"] = max(result["queries"], len(captured))
+            if timing and timings:
+                result["p50_ms"] = round(median(timings) * 1000, 2)
+                result["p95_ms"] = round((quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]) * 1000, 2)
+    return results
+
+
+def load_budgets(path=BUDGETS_FILE):
+    with open(path) as budgets:
+        return json.load(budgets)
+
+
+def check(results, budgets, size=None):
+    """Budget violations as readable lines; empty when everything is within budget."""
+    label = f"@{size}" if size else ""
+    failures = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            failures.append(f"{name}{label}: no budget committed")
+            continue
+        for metric, measured in result.items():
+            limit = budget.get(metric)
+            if measured is not None and limit is not None and measured > limit:
+                failures.append(f"{name}{label}: {metric} {measured} > budget {limit}")
+    return failures
+
+
+def suggest_budgets(all_results):
+    """
+    Budgets from measured results (any number of sizes): exact query counts,
+    latency and memory with headroom for noisier machines.
+    """
+    budgets = {}
+    for results in all_results:
+        for name, result in results.items():
+            budget = budgets.setdefault(name, {})
+            budget["queries"] = max(budget.get("queries", 0), result["queries"])
+            for metric, headroom in (("p95_ms", 3), ("peak_kb", 1.5)):
+                if result.get(metric) is not None:
+                    budget[metric] = max(budget.get(metric, 0), round(result[metric] * headroom))
+    return budgets
@@ -0,0 +1,347 @@
+# core/cache.py
+"""
+Generation-based response caching for the read-heavy endpoints.
+
+Every cached payload is keyed by the generations it depends on:
+
+* ``all``           bumped by Criteria writes and bulk repairs
+* ``projects``      bumped by writes to what project lists show of a
+                    project besides its counters (the row, its images)
+* ``project:<id>``  bumped by writes touching that project, comments
+                    included
+* ``stats`` and ``stats:<id>``
+                    bumped by vote and rating writes, including buffered
+                    votes and ratings left to the async stats pipeline
+* ``comments:<id>`` bumped by comment writes on that project
+* ``criteria``      bumped by Criteria writes; versions the in-process
+                    criteria registry (``core.registry``)
+
+Project lists follow ``stats`` through ``lagged`` (every
+``RESPONSE_CACHE_STATS_LAG`` seconds at most), so a voting storm doesn't
+throw away every cached list page on every vote; their counters are up to
+that many seconds old. Buffered votes are added on every read instead,
+and a buffer flush makes lists catch up at once, as the pending deltas
+they relied on are gone.
+
+A write bumps its generations, which makes every key built from the old
+values unreachable at once; stale entries then simply age out. Nothing is
+ever deleted or scanned.
+
+The same generations validate conditional GETs (``ConditionalGetMixin``).
+An ETag is a hash of the generations a response depends on, and
+Last-Modified is the latest time one of them was bumped, so a client
+revalidating an unchanged payload gets a 304 from one cache read.
+"""
+import time
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+KEY_PREFIX = "nexus"
+
+
+def _gen_key(name):
+    return f"{KEY_PREFIX}:gen:{name}"
+
+
+def _touched_key(name):
+    return f"{KEY_PREFIX}:touched:{name}"
+
+
+def _bump(names):
+    for name in names:
+        key = _gen_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing or evicted; restart from a clock value so old keys can't come back
+            if not cache.add(key, time.time_ns(), timeout=None):
+                cache.incr(key)
+    cache.set_many({_touched_key(name): time.time() for name in names}, timeout=None)
+
+
+def bump(*names):
+    """
+    Bump generations now and again once the surrounding transaction commits,
+    so a read that raced the write can't pin pre-commit data in the cache.
+    """
+    _bump(names)
+    transaction.on_commit(lambda: _bump(names))
+
+
+def invalidate_project(project_id):
+    bump("projects", f"project:{project_id}")
+
+
+def invalidate_stats(project_id):
+    bump("stats", f"stats:{project_id}")
+
+
+def invalidate_comments(project_id):
+    # Project detail embeds the first comments
+    bump(f"project:{project_id}", f"comments:{project_id}")
+
+
+def invalidate_all():
+    bump("all")
+
+
+def invalidate_criteria():
+    bump("all", "criteria")
+
+
+def user_key(user_id):
+    return f"{KEY_PREFIX}:user:{user_id}"
+
+
+def forget_user(user_id):
+    """Drop the copy of a user that core.authentication serves JWT requests from."""
+    cache.delete(user_key(user_id))
+
+
+def lagged(name, seconds):
+    """
+    A generation that follows ``name`` at most once every ``seconds``: read
+    after it expires, it takes ``name``'s current value. Payloads keyed on
+    it are rebuilt at most that often however fast ``name`` is bumped, and
+    keep their key while ``name`` stays put. ``seconds=0`` is ``name``.
+    """
+    return f"{name}@{seconds}" if seconds else name
+
+
+def expire_lagged(name, seconds):
+    """Have ``lagged(name, seconds)`` catch up with ``name`` on its next read."""
+    if seconds:
+        cache.delete_many([_gen_key(lagged(name, seconds)), _touched_key(lagged(name, seconds))])
+
+
+def _lag(name):
+    base, _, seconds = name.partition("@")
+    return base, int(seconds or 0)
+
+
+def _gen_keys(names):
+    return [_gen_key(name) for name in names]
+
+
+def _version_keys(names):
+    return [key for name in names for key in (_gen_key(name), _touched_key(name))]
+
+
+def _initial(name, base=None):
+    """``{key: (value, timeout)}`` to add for a generation that is missing; ``base`` is ``versions`` of a lagged name's base."""
+    if base is not None:
+        (gen,), touched = base
+        return {_gen_key(name): (gen, _lag(name)[1]), _touched_key(name): (touched, _lag(name)[1])}
+    # Evicted or never bumped: restart from a clock value so old keys can't
+    # come back, and "now" is the only safe modification time
+    return {_gen_key(name): (time.time_ns(), None), _touched_key(name): (time.time(), None)}
+
+
+def _resolve(names, found):
+    gens = [found.get(_gen_key(name), 0) for name in names]
+    touched = [found.get(_touched_key(name), time.time()) for name in names]
+    return gens, max(touched, default=time.time())
+
+
+def generations(*names):
+    if any(_lag(name)[1] for name in names):
+        # Lagged generations are copied along with their bump times
+        return versions(*names)[0]
+    keys = _gen_keys(names)
+    found = cache.get_many(keys)
+    values = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+        values.append(found[key])
+    return values
+
+
+async def agenerations(*names):
+    """``generations`` for async views, using the cache's async API."""
+    if any(_lag(name)[1] for name in names):
+        # Lagged generations are copied along with their bump times
+        return (await aversions(*names))[0]
+    keys = _gen_keys(names)
+    found = await cache.aget_many(keys)
+    values = []
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            found[key] = await cache.aget(key)
+        values.append(found[key])
+    return values
+
+
+def versions(*names):
+    """``(generations, last modified timestamp)`` of the named generations, in one cache read."""
+    keys = _version_keys(names)
+    found = cache.get_many(keys)
+    missing = [name for name in names if _gen_key(name) not in found or _touched_key(name) not in found]
+    if missing:
+        for name in missing:
+            base, seconds = _lag(name)
+            for key, (value, timeout) in _initial(name, versions(base) if seconds else None).items():
+                cache.add(key, value, timeout=timeout)
+        # Another process may have added them first; theirs are the ones that stick
+        found = cache.get_many(keys)
+    return _resolve(names, found)
+
+
+async def aversions(*names):
+    """``versions`` for async views."""
+    keys = _version_keys(names)
+    found = await cache.aget_many(keys)
+    missing = [name for name in names if _gen_key(name) not in found or _touched_key(name) not in found]
+    if missing:
+        for name in missing:
+            base, seconds = _lag(name)
+            for key, (value, timeout) in _initial(name, await aversions(base) if seconds else None).items():
+                await cache.aadd(key, value, timeout=timeout)
+        found = await cache.aget_many(keys)
+    return _resolve(names, found)
+
+
+def response_cache_key(basename, action, pk, url, params, gens):
+    """Key of a cached response; ``url`` is the absolute URL without query string."""
+    parts = [basename, action, pk, url, repr(params), repr(gens)]
+    return f"{KEY_PREFIX}:resp:{sha1('|'.join(map(str, parts)).encode()).hexdigest()}"
+
+
+def response_cache_timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def response_cache_stats_lag():
+    return getattr(settings, "RESPONSE_CACHE_STATS_LAG", 5)
+
+
+class CachedResponseMixin:
+    """
+    Serve ``list``/``retrieve`` from the shared cache.
+
+    ``cache_query_params`` are the only query parameters that can change a
+    response; everything else is ignored when building the key. Views name
+    their generations in ``get_cache_generations``. The cached payload is
+    user-independent; ``personalize`` can adjust a copy per request.
+    """
+    cache_query_params = ()
+
+    def get_cache_generations(self):
+        return ["all"]
+
+    def personalize(self, data):
+        return data
+
+    def cache_key(self, request):
+        params = [(name, request.query_params.get(name)) for name in self.cache_query_params]
+        return response_cache_key(
+            self.basename, self.action, self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""),
+            request.build_absolute_uri(request.path), params, generations(*self.get_cache_generations()),
+        )
+
+    def cached_response(self, request, build):
+        timeout = response_cache_timeout()
+        if not timeout:
+            return Response(self.personalize(build()))
+        key = self.cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, timeout)
+        return Response(self.personalize(data))
+
+    async def apersonalize(self, data):
+        return data
+
+    async def acached_response(self, request, abuild):
+        """
+        ``cached_response`` for the async views (core.async_views). The key
+        is built the same way, but it includes the path, so these entries
+        are separate from the sync endpoints'.
+        """
+        timeout = response_cache_timeout()
+        if not timeout:
+            return Response(await self.apersonalize(await abuild()))
+        params = [(name, request.query_params.get(name)) for name in self.cache_query_params]
+        key = response_cache_key(
+            self.basename, self.action, self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""),
+            request.build_absolute_uri(request.path), params, await agenerations(*self.get_cache_generations()),
+        )
+        data = await cache.aget(key)
+        if data is None:
+            data = await abuild()
+            await cache.aset(key, data, timeout)
+        return Response(await self.apersonalize(data))
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs).data
+        )
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified validation for ``list``/``retrieve``, answered before
+    any query or serializer runs.
+
+    Both validators come from ``get_cache_generations`` (the same contract
+    as ``CachedResponseMixin``), so every generation a payload depends on
+    must be listed. The ETag also covers the full URL, the renderer and the
+    user, since payloads can be personalized. Last-Modified is left out
+    while its second is still running: HTTP dates have no sub-second part,
+    so a later change in that second would compare equal.
+    """
+
+    def get_cache_generations(self):
+        return ["all"]
+
+    def _validators(self, request, gens, last_modified):
+        renderer = getattr(request, "accepted_renderer", None)
+        parts = [self.basename, self.action, request.get_full_path(), getattr(renderer, "format", ""),
+                 request.user.pk, repr(gens)]
+        etag = quote_etag(sha1("|".join(map(str, parts)).encode()).hexdigest())
+        # Whole seconds, as HTTP dates have them
+        return etag, (int(last_modified) if time.time() - last_modified >= 1 else None)
+
+    @staticmethod
+    def _set_validators(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            # Revalidate every time; payloads differ per user
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def conditional_response(self, request, respond):
+        etag, last_modified = self._validators(request, *versions(*self.get_cache_generations()))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        return self._set_validators(respond() if response is None else response, etag, last_modified)
+
+    async def aconditional_response(self, request, arespond):
+        """``conditional_response`` for the async views (core.async_views)."""
+        etag, last_modified = self._validators(request, *await aversions(*self.get_cache_generations()))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        return self._set_validators(await arespond() if response is None else response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,269 @@
+# core/events.py
+"""
+Live project updates for the Server-Sent Events stream (``core.async_views.live_stream``).
+
+Writers don't build events. The vote and rating write paths call
+``project_changed(project_id)``, which publishes the bare id once the
+transaction commits:
+
+* ``inprocess`` backend: straight to this process's ``hub``
+* ``redis`` backend: ``PUBLISH`` on a Redis channel. Every process that
+  holds streams runs one listener thread that forwards the ids to its hub.
+
+The hub collects ids for ``COALESCE_SECONDS``. It then loads the changed
+projects in one query and their ranks in one windowed query, and pushes
+the result to every local subscriber of ``project:<id>``, ``category:<key>``
+and ``leaderboard``. The windowed query also returns the leaderboard's
+top entries overall and per category; those whose row differs from the
+last flush (a project overtaken by a changed one, say) go out on the
+ranking channels too. A change costs the same with one dashboard open or a
+thousand, and nothing is computed while nobody is listening.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from . import vote_buffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {"BACKEND": "inprocess", "COALESCE_SECONDS": 0.25, "KEEPALIVE_SECONDS": 15, "QUEUE_SIZE": 100}
+
+REDIS_CHANNEL = "nexus:events:projects"
+
+SNAPSHOT_FIELDS = ("id", "name", "category", "vote_count", "average_score", "weighted_score", "rating_count")
+
+
+def events_setting(name):
+    return getattr(settings, "LIVE_EVENTS", {}).get(name, DEFAULTS[name])
+
+
+def _ranked_projects():
+    from .models import Project
+
+    return Project.objects.filter(status="published", rating_count__gt=0)
+
+
+def _ranks(project_ids, top=0):
+    """
+    ``{id: row}`` of the ranked projects among ``project_ids`` plus those
+    within the first ``top`` overall or in their category, with
+    ``SNAPSHOT_FIELDS``, ``rank`` and ``category_rank``, in one query.
+    """
+    order = [F("weighted_score").desc(), F("id").asc()]
+    ranked = _ranked_projects().annotate(
+        rank=Window(RowNumber(), order_by=order),
+        category_rank=Window(RowNumber(), partition_by=[F("category")], order_by=order),
+    ).values(*SNAPSHOT_FIELDS, "rank", "category_rank")
+    # Pick the rows out after numbering; a filter on the queryset would rank them among themselves
+    sql, params = ranked.query.sql_with_params()
+    conditions, extra = [], []
+    if project_ids:
+        conditions.append(f"ranked.id IN ({', '.join(['%s'] * len(project_ids))})")
+        extra += project_ids
+    if top:
+        conditions.append("ranked.rank <= %s OR ranked.category_rank <= %s")
+        extra += [top, top]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM ({sql}) ranked WHERE {' OR '.join(conditions)}", [*params, *extra])
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return {row["id"]: row for row in rows}
+
+
+async def snapshot(project_ids, top=0):
+    """
+    Current stats of the given published projects, keyed by id, with
+    ``rank`` (overall) and ``category_rank`` on the leaderboard ordering;
+    ``None`` while a project has no ratings. ``top`` adds the projects
+    ranked within the first ``top`` overall or in their category.
+    """
+    from .models import Project
+
+    rows = {
+        row["id"]: row
+        async for row in Project.objects.filter(pk__in=project_ids, status="published").values(*SNAPSHOT_FIELDS)
+    }
+    rated = [pk for pk, row in rows.items() if row["rating_count"]]
+    ranked = await sync_to_async(_ranks)(rated, top) if rated or top else {}
+    for pk, row in rows.items():
+        row["rank"] = ranked[pk]["rank"] if pk in ranked else None
+        row["category_rank"] = ranked[pk]["category_rank"] if pk in ranked else None
+    for pk, row in ranked.items():
+        rows.setdefault(pk, row)
+    await vote_buffer.amerge(list(rows.values()))
+    return rows
+
+
+def channels_for(row):
+    return (f"project:{row['id']}", f"category:{row['category']}", "leaderboard")
+
+
+def ranking_channels_for(row, top):
+    """The ranking channels on which ``row`` is within the first ``top``."""
+    ranks = (("leaderboard", row["rank"]), (f"category:{row['category']}", row["category_rank"]))
+    return tuple(channel for channel, rank in ranks if rank is not None and rank <= top)
+
+
+class Subscription:
+    """One stream's queue. Iterate it from the event loop that created it."""
+
+    def __init__(self, hub, channels):
+        self.hub = hub
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=events_setting("QUEUE_SIZE"))
+
+    def put(self, event):
+        # A stalled client drops events rather than growing without bound
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """The next event, or ``None`` after ``timeout`` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """Per-process fan-out of project changes to the subscribed streams."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._pending = set()
+        self._flushing = False
+        # Rows of the last flush, to resend only the top entries that moved.
+        # The first flush of a process resends them all once.
+        self._sent = {}
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        backend().listen()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+    def notify(self, project_id):
+        """Queue a changed project; safe to call from any thread."""
+        with self._lock:
+            # Streams whose event loop is gone can't be served any more
+            self._subscriptions = {sub for sub in self._subscriptions if not sub.loop.is_closed()}
+            if not self._subscriptions:
+                return
+            self._pending.add(project_id)
+            if self._flushing:
+                return
+            self._flushing = True
+            loop = next(iter(self._subscriptions)).loop
+        asyncio.run_coroutine_threadsafe(self._flush(), loop)
+
+    async def _flush(self):
+        from .leaderboard import DEFAULT_LIMIT
+
+        await asyncio.sleep(events_setting("COALESCE_SECONDS"))
+        with self._lock:
+            project_ids, self._pending = self._pending, set()
+            self._flushing = False
+        # One past the streams' top entries, so the project pushed out of
+        # them is seen leaving
+        top = DEFAULT_LIMIT + 1
+        try:
+            rows = await snapshot(project_ids, top)
+        except Exception:
+            logger.exception("Could not load live updates for projects %s", sorted(project_ids))
+            return
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            sent, self._sent = self._sent, rows
+        for pk, row in rows.items():
+            if pk in project_ids:
+                channels = channels_for(row)
+            elif sent.get(pk) != row:
+                # Overtaken or moved up by a changed project
+                channels = ranking_channels_for(row, top)
+            else:
+                continue
+            for subscription in subscriptions:
+                if subscription.channels.intersection(channels) and not subscription.loop.is_closed():
+                    subscription.loop.call_soon_threadsafe(subscription.put, row)
+
+
+hub = Hub()
+
+
+class InProcessBackend:
+    def publish(self, project_id):
+        hub.notify(project_id)
+
+    def listen(self):
+        pass
+
+
+class RedisBackend:
+    """Fan changes out to every process through Redis pub/sub."""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, project_id):
+        self.client.publish(REDIS_CHANNEL, project_id)
+
+    def listen(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._forward, name="nexus-events", daemon=True)
+                self._listener.start()
+
+    def _forward(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(REDIS_CHANNEL)
+        for message in pubsub.listen():
+            hub.notify(int(message["data"]))
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        if events_setting("BACKEND") == "redis":
+            _backend = RedisBackend(getattr(settings, "REDIS_URL", None) or "redis://localhost:6379/0")
+        else:
+            _backend = InProcessBackend()
+    return _backend
+
+
+def project_changed(project_id):
+    """Announce new stats for a project once the current transaction commits."""
+    # robust: a broker hiccup must not fail a vote that already committed
+    transaction.on_commit(lambda: backend().publish(project_id), robust=True)
+
+
+def encode(event, data):
+    """One SSE frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
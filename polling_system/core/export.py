@@ -0,0 +1,210 @@
+# core/export.py
+"""
+Streaming exports of ratings, votes and per-criteria aggregates.
+
+Rows are read with ``.iterator(chunk_size=CHUNK_SIZE)`` (a server-side
+cursor on Postgres) as plain tuples, and each writer yields one encoded
+chunk per batch. Memory stays at one batch whatever the row count, both
+for ``ExportViewSet`` (through StreamingHttpResponse) and for
+``manage.py export_results``.
+
+Formats: ``csv``, ``ndjson`` and ``parquet``. Parquet is columnar, written
+as one row group per batch, and needs the optional ``pyarrow`` package.
+"""
+import csv
+import io
+import json
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Project, ProjectCriteriaScore, Rating, Vote
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (column, ORM lookup, type); type drives the parquet schema
+DATASETS = {
+    "ratings": (Rating, [
+        ("id", "id", "int"),
+        ("project_id", "project_id", "int"),
+        ("project", "project__name", "str"),
+        ("category", "project__category", "str"),
+        ("criteria_id", "criteria_id", "int"),
+        ("criteria", "criteria__name", "str"),
+        ("user_id", "user_id", "int"),
+        ("score", "score", "int"),
+        ("created_at", "created_at", "datetime"),
+    ]),
+    "votes": (Vote, [
+        ("id", "id", "int"),
+        ("project_id", "project_id", "int"),
+        ("project", "project__name", "str"),
+        ("category", "project__category", "str"),
+        ("user_id", "user_id", "int"),
+        ("created_at", "created_at", "datetime"),
+    ]),
+    "criteria_scores": (ProjectCriteriaScore, [
+        ("project_id", "project_id", "int"),
+        ("project", "project__name", "str"),
+        ("category", "project__category", "str"),
+        ("criteria_id", "criteria_id", "int"),
+        ("criteria", "criteria__name", "str"),
+        ("weight", "criteria__weight", "int"),
+        ("rating_count", "rating_count", "int"),
+        ("score_sum", "score_sum", "int"),
+        *[(f"score_{n}", f"score_{n}", "int") for n in range(1, 11)],
+    ]),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _bound(value, name, end_of_day=False):
+    """A datetime from an ISO date or datetime string; a bare date covers that whole day."""
+    if value is None or isinstance(value, datetime):
+        return value
+    # Dates first: parse_datetime would read a bare date as midnight
+    day = parse_date(value)
+    if day is not None:
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ExportError(f"{name}: expected an ISO date or datetime, got '{value}'")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def columns(dataset):
+    return [name for name, _, _ in DATASETS[dataset][1]]
+
+
+def rows(dataset, category=None, since=None, until=None):
+    """Tuples of the dataset's columns, streamed from the database in CHUNK_SIZE batches."""
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}', expected one of {', '.join(DATASETS)}")
+    model, spec = DATASETS[dataset]
+    queryset = model.objects.all()
+    if category is not None:
+        if category not in dict(Project.CATEGORY_CHOICES):
+            raise ExportError(f"Unknown category '{category}'")
+        queryset = queryset.filter(project__category=category)
+    since, until = _bound(since, "since"), _bound(until, "until", end_of_day=True)
+    if since or until:
+        if dataset == "criteria_scores":
+            raise ExportError("criteria_scores are running totals; since/until only apply to ratings and votes")
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        if until:
+            queryset = queryset.filter(created_at__lte=until)
+    lookups = [lookup for _, lookup, _ in spec]
+    return queryset.order_by("pk").values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _batches(iterable, size=None):
+    size = size or CHUNK_SIZE
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_csv(dataset, records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns(dataset))
+    for batch in _batches(records):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def write_ndjson(dataset, records):
+    names = columns(dataset)
+    for batch in _batches(records):
+        yield "".join(json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + "\n" for row in batch).encode()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet export needs the optional 'pyarrow' package")
+    return pyarrow
+
+
+def write_parquet(dataset, records):
+    pa = _pyarrow()
+    types = {"int": pa.int64(), "str": pa.string(), "float": pa.float64(), "datetime": pa.timestamp("us", tz="UTC")}
+    schema = pa.schema([(name, types[kind]) for name, _, kind in DATASETS[dataset][1]])
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(sink, schema)
+    for batch in _batches(records):
+        writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, row)) for row in batch], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing out what was written since the last drain; tell() keeps counting."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        # ParquetWriter closes its sink; chunks still have to be drained after that
+        pass
+
+    def drain(self):
+        chunk = b"".join(self.parts)
+        self.parts = []
+        return chunk
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export(dataset, fmt, **filters):
+    """
+    Encoded chunks of a dataset in ``fmt``. Arguments are validated up
+    front, raising ExportError, so nothing has been sent when they're wrong.
+    """
+    if fmt not in WRITERS:
+        raise ExportError(f"Unknown format '{fmt}', expected one of {', '.join(WRITERS)}")
+    if fmt == "parquet":
+        _pyarrow()
+    return WRITERS[fmt](dataset, rows(dataset, **filters))
@@ -0,0 +1,168 @@
+# core/images.py
+"""
+Derivatives of uploaded project images.
+
+An upload is stored as is. Once its transaction commits, a
+``generate_image_derivatives`` task (or an inline call, with ``ASYNC``
+off) reads it back with Pillow and writes:
+
+* a thumbnail fitting ``THUMBNAIL_SIZE``, which is all list cards send
+* one variant per entry of ``WIDTHS`` narrower than the original, for
+  ``srcset`` on the detail page
+
+each in every format of ``FORMATS`` (WebP, with JPEG as the fallback),
+next to the original in storage. What was written goes into
+``ProjectImage.derivatives``, keyed by the upload it was made from, so a
+replaced upload is noticed and a late task for an older upload is
+dropped.
+
+Large JPEGs are decoded at reduced size (``Image.draft``) and each
+variant is resized from the next larger one, so a 20-megapixel upload
+is never fully decoded more than needed.
+"""
+import io
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_project
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ASYNC": False,
+    "THUMBNAIL_SIZE": (400, 300),
+    "WIDTHS": (640, 1280, 1920),
+    "FORMATS": ("webp", "jpeg"),
+    "QUALITY": 80,
+    "MAX_UPLOAD_BYTES": 10 * 1024 * 1024,
+}
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+def image_setting(name):
+    return getattr(settings, "IMAGE_DERIVATIVES", {}).get(name, DEFAULTS[name])
+
+
+def is_current(image):
+    """True when the stored derivatives were made from the current upload."""
+    return bool(image.image) and image.derivatives.get("source") == image.image.name
+
+
+def schedule_derivatives(image):
+    """Generate derivatives for ``image`` once its transaction commits, off-request when ASYNC is on."""
+    from .tasks import generate_image_derivatives
+
+    image_id = image.pk
+    if image_setting("ASYNC"):
+        transaction.on_commit(lambda: generate_image_derivatives.delay(image_id))
+    else:
+        transaction.on_commit(lambda: generate_image_derivatives(image_id))
+
+
+def _encode(picture, fmt):
+    buffer = io.BytesIO()
+    if fmt == "jpeg" and picture.mode != "RGB":
+        # No alpha in JPEG: flatten onto white rather than black
+        background = Image.new("RGB", picture.size, "white")
+        background.paste(picture, mask=picture.getchannel("A") if "A" in picture.getbands() else None)
+        picture = background
+    picture.save(buffer, format=fmt.upper(), quality=image_setting("QUALITY"), optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def _write(storage, source, label, picture):
+    """Save ``picture`` in every configured format; returns the entry stored in ``derivatives``."""
+    stem, _ = posixpath.splitext(source)
+    entry = {"width": picture.width, "height": picture.height}
+    for fmt in image_setting("FORMATS"):
+        entry[fmt] = storage.save(f"{stem}_{label}.{EXTENSIONS[fmt]}", _encode(picture, fmt))
+    return entry
+
+
+# EXIF orientations that turn the picture by 90 degrees
+TRANSPOSED = {5, 6, 7, 8}
+
+
+def _open(field):
+    """The upload, oriented and in RGB(A), and its oriented full size."""
+    with field.open("rb"):
+        picture = Image.open(field)
+        width, height = picture.size
+        if picture.getexif().get(0x0112) in TRANSPOSED:
+            width, height = height, width
+        # Decode no larger than the widest derivative needs (JPEG only; a no-op otherwise)
+        largest = max([w for w in image_setting("WIDTHS") if w < width] or image_setting("THUMBNAIL_SIZE"))
+        picture.draft("RGB", (largest, largest))
+        picture = ImageOps.exif_transpose(picture)
+        # Keep alpha for WebP; everything else (palette, CMYK, 16-bit) becomes RGB
+        mode = "RGBA" if "A" in picture.getbands() or "transparency" in picture.info else "RGB"
+        return picture.convert(mode), width, height
+
+
+def build(image):
+    """Write the derivatives of ``image.image`` and return the ``derivatives`` mapping."""
+    field = image.image
+    picture, width, height = _open(field)
+    variants = []
+    for target in sorted((w for w in image_setting("WIDTHS") if w < width), reverse=True):
+        picture = picture.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        variants.append(_write(field.storage, field.name, f"w{target}", picture))
+    picture.thumbnail(image_setting("THUMBNAIL_SIZE"), Image.LANCZOS)
+    thumbnail = _write(field.storage, field.name, "thumb", picture)
+    return {
+        "source": field.name,
+        "width": width,
+        "height": height,
+        "thumbnail": thumbnail,
+        # Narrowest first, as srcset lists them
+        "variants": variants[::-1],
+    }
+
+
+def derivative_files(derivatives):
+    entries = [derivatives.get("thumbnail") or {}, *derivatives.get("variants", ())]
+    return [entry[fmt] for entry in entries for fmt in EXTENSIONS if entry.get(fmt)]
+
+
+def delete_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete image derivative %s", name)
+
+
+def generate(image_id, force=False):
+    """
+    Build the derivatives of one image and store them, unless they are
+    current already (``force`` rebuilds them) or the upload changed
+    meanwhile. Returns True when they were stored.
+    """
+    from .models import ProjectImage
+
+    image = ProjectImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image or (is_current(image) and not force):
+        return False
+    try:
+        derivatives = build(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception("Could not generate derivatives of image %s (%s)", image_id, image.image.name)
+        return False
+    storage = image.image.storage
+    # update() rather than save(): no post_save, so no new task, and a
+    # replaced upload (different name) makes this a no-op
+    stored = ProjectImage.objects.filter(pk=image_id, image=image.image.name).update(
+        derivatives=derivatives, width=derivatives["width"], height=derivatives["height"],
+    )
+    if not stored:
+        delete_files(storage, derivative_files(derivatives))
+        return False
+    delete_files(storage, derivative_files(image.derivatives))
+    invalidate_project(image.project_id)
+    return True
@@ -0,0 +1,337 @@
+# core/instrumentation.py
+"""
+Per-request performance instrumentation.
+
+``InstrumentationMiddleware`` profiles a random ``SAMPLE_RATE`` share of
+requests. For each sampled request it collects:
+
+* total time, DB query count and DB time (through a connection execute
+  wrapper, so async views running the ORM in worker threads count too)
+* serializer time: top-level ``to_representation`` calls of serializers
+  using ``TimedRepresentationMixin``, minus the queries they run
+* repeated queries: SQL is fingerprinted (literals and ``IN`` lists
+  collapsed), and any fingerprint run ``DUPLICATE_QUERY_THRESHOLD`` times
+  or more is logged as a likely N+1
+
+The results go out as a ``Server-Timing`` header and are added to counters
+in the shared cache, the same way ``pipeline_metrics`` keeps its counters.
+``/api/metrics/`` renders those counters in the Prometheus text format.
+Metrics are labelled by view action, e.g. ``ProjectViewSet.vote``, taken
+from the resolved DRF viewset rather than the URL.
+
+Requests that aren't sampled cost one random draw here, plus one context
+variable lookup per query and per top-level serializer call.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {"SAMPLE_RATE": 0.05, "SERVER_TIMING": True, "DUPLICATE_QUERY_THRESHOLD": 10, "METRICS_TOKEN": None}
+
+METRIC_KEY = "nexus:perf:{}:{}"
+# Labels are logged like vote_buffer's dirty projects: one key per slot
+# plus an atomic sequence, so concurrent registrations can't overwrite each
+# other. The per-label key holds the label's slot.
+LABEL_KEY = "nexus:perf:label:{}"
+LABEL_SLOT_KEY = "nexus:perf:labels:{}"
+LABEL_SEQ_KEY = "nexus:perf:labels"
+# Upper bounds of the latency histogram, in milliseconds
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Integer counters per label; durations are kept in microseconds so cache.incr works
+COUNTERS = ("requests", "duration_us", "db_queries", "db_us", "serialize_us", "duplicate_queries")
+
+_current = ContextVar("nexus_request_profile", default=None)
+
+
+def instrumentation_setting(name):
+    return getattr(settings, "INSTRUMENTATION", {}).get(name, DEFAULTS[name])
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists collapsed, so the same query with other values matches."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"IN \((?:%s|\?)(?:, (?:%s|\?))*\)", "IN (...)", sql)
+    return re.sub(r"\s+", " ", sql.replace("%s", "?")).strip()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.fingerprints = Counter()
+
+    def add_query(self, sql, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        """``{fingerprint: count}`` of the queries repeated often enough to look like an N+1."""
+        threshold = instrumentation_setting("DUPLICATE_QUERY_THRESHOLD")
+        return {sql: count for sql, count in self.fingerprints.items() if count >= threshold}
+
+    def server_timing(self):
+        entries = [
+            f"total;dur={self.duration * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f"serialize;dur={self.serialize_time * 1000:.1f}",
+        ]
+        duplicates = self.duplicates()
+        if duplicates:
+            entries.append(f'nplusone;desc="{len(duplicates)} repeated, {max(duplicates.values())}x max"')
+        return ", ".join(entries)
+
+
+def current_profile():
+    """The profile of the request being handled, or ``None`` when it isn't sampled."""
+    return _current.get()
+
+
+def profile_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def install(wrapper_connection=None):
+    """Add the query profiler to a connection (the current thread's by default), once."""
+    target = wrapper_connection or connection
+    if profile_query not in target.execute_wrappers:
+        target.execute_wrappers.append(profile_query)
+
+
+@receiver(connection_created)
+def _connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+@contextmanager
+def timed_serialization():
+    """
+    Add the enclosed block's time, minus its queries, to the request
+    profile's serializer time. Only the outermost block counts, so nested
+    serializers and ``many=True`` items are not counted twice.
+    """
+    profile = _current.get()
+    if profile is None or profile.serializing:
+        yield
+        return
+    profile.serializing = True
+    started, db_before = time.perf_counter(), profile.db_time
+    try:
+        yield
+    finally:
+        profile.serializing = False
+        profile.serialize_time += time.perf_counter() - started - (profile.db_time - db_before)
+
+
+# Serializer mixin adding its to_representation time to the request profile.
+# A comment, not a docstring: drf-spectacular would show an inherited
+# docstring as every serializer's schema description.
+class TimedRepresentationMixin:
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
+
+
+def view_label(request):
+    """``Viewset.action`` for DRF views, the view's qualified name otherwise."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    func = match.func
+    cls = getattr(func, "cls", None)
+    if cls is None:
+        return getattr(func, "__qualname__", match.view_name)
+    actions = getattr(func, "actions", None)
+    if actions:
+        return f"{cls.__name__}.{actions.get(request.method.lower(), request.method.lower())}"
+    return f"{cls.__name__}.{request.method.lower()}"
+
+
+def _incr(key, amount):
+    """Add to a shared counter; True if this created it."""
+    if cache.add(key, amount, timeout=None):
+        return True
+    cache.incr(key, amount)
+    return False
+
+
+def _next_slot():
+    try:
+        return cache.incr(LABEL_SEQ_KEY)
+    except ValueError:
+        if cache.add(LABEL_SEQ_KEY, 1, timeout=None):
+            return 1
+        return cache.incr(LABEL_SEQ_KEY)
+
+
+def _register(label):
+    slot = cache.get(LABEL_KEY.format(label))
+    if slot is not None and cache.get(LABEL_SLOT_KEY.format(slot)) == label:
+        return
+    # Two processes racing here both log the label; readers list it once
+    slot = _next_slot()
+    cache.set(LABEL_SLOT_KEY.format(slot), label, timeout=None)
+    cache.set(LABEL_KEY.format(label), slot, timeout=None)
+
+
+def labels():
+    """Every label registered so far, in registration order."""
+    count = cache.get(LABEL_SEQ_KEY) or 0
+    keys = [LABEL_SLOT_KEY.format(n) for n in range(1, count + 1)]
+    logged = cache.get_many(keys)
+    return list(dict.fromkeys(logged[key] for key in keys if key in logged))
+
+
+def record(label, profile):
+    """Add one sampled request to the shared counters and log likely N+1s."""
+    duplicates = profile.duplicates()
+    for sql, count in duplicates.items():
+        logger.warning("%s ran the same query %d times: %s", label, count, sql)
+    values = {
+        "duration_us": int(profile.duration * 1e6),
+        "db_queries": profile.queries,
+        "db_us": int(profile.db_time * 1e6),
+        "serialize_us": int(profile.serialize_time * 1e6),
+        "duplicate_queries": sum(count - 1 for count in duplicates.values()),
+    }
+    # A new request counter means a new label, or counters lost to a cache flush
+    if _incr(METRIC_KEY.format(label, "requests"), 1):
+        _register(label)
+    for name, value in values.items():
+        if value:
+            _incr(METRIC_KEY.format(label, name), value)
+    duration_ms = profile.duration * 1000
+    bucket = next((f"le_{bound}" for bound in BUCKETS_MS if duration_ms <= bound), "le_inf")
+    _incr(METRIC_KEY.format(label, bucket), 1)
+
+
+def request_metrics():
+    """``{label: {counter: value}}`` of everything recorded so far, across processes."""
+    registered = labels()
+    names = [*COUNTERS, *(f"le_{bound}" for bound in BUCKETS_MS), "le_inf"]
+    found = cache.get_many([METRIC_KEY.format(label, name) for label in registered for name in names])
+    return {
+        label: {name: found.get(METRIC_KEY.format(label, name), 0) for name in names}
+        for label in registered
+    }
+
+
+def _escape(label):
+    return label.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text():
+    """All request metrics, plus the stats pipeline counters, in the Prometheus text format."""
+    from .pipeline import pipeline_metrics
+
+    metrics = request_metrics()
+    lines = [
+        "# HELP nexus_request_sample_rate Share of requests that are profiled; the counters below cover only those.",
+        "# TYPE nexus_request_sample_rate gauge",
+        f"nexus_request_sample_rate {instrumentation_setting('SAMPLE_RATE')}",
+        "# HELP nexus_request_duration_seconds Latency of sampled requests by view action.",
+        "# TYPE nexus_request_duration_seconds histogram",
+    ]
+    for label, values in metrics.items():
+        view = f'view="{_escape(label)}"'
+        cumulative = 0
+        for bound in BUCKETS_MS:
+            cumulative += values[f"le_{bound}"]
+            lines.append(f'nexus_request_duration_seconds_bucket{{{view},le="{bound / 1000}"}} {cumulative}')
+        lines.append(f'nexus_request_duration_seconds_bucket{{{view},le="+Inf"}} {cumulative + values["le_inf"]}')
+        lines.append(f"nexus_request_duration_seconds_sum{{{view}}} {values['duration_us'] / 1e6}")
+        lines.append(f"nexus_request_duration_seconds_count{{{view}}} {values['requests']}")
+    for name, counter, scale, help_text in (
+        ("nexus_db_queries_total", "db_queries", 1, "SQL queries run by sampled requests."),
+        ("nexus_db_duration_seconds_total", "db_us", 1e6, "Time sampled requests spent in SQL."),
+        ("nexus_serializer_duration_seconds_total", "serialize_us", 1e6,
+         "Time sampled requests spent in serializers, excluding their queries."),
+        ("nexus_duplicate_queries_total", "duplicate_queries", 1,
+         "Queries that repeated an earlier query of the same request (likely N+1)."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        lines += [
+            f'{name}{{view="{_escape(label)}"}} {values[counter] / scale if scale != 1 else values[counter]}'
+            for label, values in metrics.items()
+        ]
+    pipeline = pipeline_metrics()
+    lines += ["# HELP nexus_stats_pipeline_total Stats pipeline events, coalesced events and task runs.",
+              "# TYPE nexus_stats_pipeline_total counter"]
+    lines += [f'nexus_stats_pipeline_total{{kind="{name}"}} {pipeline[name]}' for name in ("events", "coalesced", "runs")]
+    lines += ["# HELP nexus_stats_pipeline_lag_seconds Queue lag of the stats pipeline, last and max.",
+              "# TYPE nexus_stats_pipeline_lag_seconds gauge"]
+    lines += [f'nexus_stats_pipeline_lag_seconds{{kind="{name}"}} {pipeline[f"lag_{name}"]}' for name in ("last", "max")]
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentationMiddleware:
+    """Profile sampled requests; put first in MIDDLEWARE to include the other middleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= instrumentation_setting("SAMPLE_RATE"):
+            return self.get_response(request)
+        install()
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if random.random() >= instrumentation_setting("SAMPLE_RATE"):
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        profile.duration = time.perf_counter() - profile.started
+        if instrumentation_setting("SERVER_TIMING"):
+            response["Server-Timing"] = profile.server_timing()
+        try:
+            record(view_label(request), profile)
+        except Exception:
+            # Metrics must never fail the request they describe
+            logger.exception("Could not record request metrics")
+        return response
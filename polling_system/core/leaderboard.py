@@ -0,0 +1,54 @@
+# core/leaderboard.py
+"""
+"Overall Top Project" and "Best in Category" rankings.
+
+Rankings are read straight off ``Project.weighted_score``, which the Rating
+signals keep current from the per-criteria aggregates. A top-K read is an
+index scan over (category, status, -weighted_score) and never touches the
+Rating table.
+"""
+from .models import Project
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+ENTRY_FIELDS = ("id", "name", "category", "weighted_score", "average_score", "rating_count", "vote_count")
+
+
+def _ranking(category, limit):
+    projects = Project.objects.filter(status="published", rating_count__gt=0)
+    if category is not None:
+        projects = projects.filter(category=category)
+    return projects.only(*ENTRY_FIELDS).order_by("-weighted_score", "id")[:limit]
+
+
+def _ranked(projects):
+    for rank, project in enumerate(projects, start=1):
+        project.rank = rank
+    return projects
+
+
+def top_projects(category=None, limit=DEFAULT_LIMIT):
+    """The ``limit`` best rated published projects, overall or within a category, with ``rank`` set."""
+    return _ranked(list(_ranking(category, limit)))
+
+
+async def atop_projects(category=None, limit=DEFAULT_LIMIT):
+    """``top_projects`` for async views."""
+    return _ranked([project async for project in _ranking(category, limit).aiterator()])
+
+
+def leaderboard(limit=DEFAULT_LIMIT):
+    """Overall top-K plus the top-K of every category."""
+    return {
+        "overall": top_projects(limit=limit),
+        "categories": {key: top_projects(key, limit) for key, _ in Project.CATEGORY_CHOICES},
+    }
+
+
+async def aleaderboard(limit=DEFAULT_LIMIT):
+    """``leaderboard`` for async views."""
+    return {
+        "overall": await atop_projects(limit=limit),
+        "categories": {key: await atop_projects(key, limit) for key, _ in Project.CATEGORY_CHOICES},
+    }
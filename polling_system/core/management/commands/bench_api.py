@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import benchmarks
+from core.cache import invalidate_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API hot paths in-process at several dataset sizes and fail on any "
+        "query-count, p95 latency or memory budget overrun. The generated data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", choices=list(benchmarks.SIZES), default=["small", "medium"])
+        parser.add_argument("--runs", type=int, default=30)
+        parser.add_argument("--scenarios", nargs="+", choices=list(benchmarks.SCENARIOS))
+        parser.add_argument("--budgets", default=str(benchmarks.BUDGETS_FILE))
+        parser.add_argument("--json", dest="as_json", action="store_true", help="Print the raw results as JSON.")
+        parser.add_argument("--update-budgets", action="store_true",
+                            help="Write budgets derived from this run instead of checking.")
+
+    def handle(self, *args, sizes, runs, scenarios, budgets, as_json, update_budgets, **options):
+        if runs < 2:
+            raise CommandError("--runs must be at least 2: the first run is the warm-up.")
+        measured = {}
+        for size in sizes:
+            with transaction.atomic():
+                data = benchmarks.build_dataset(size, runs)
+                measured[size] = benchmarks.measure(data, runs, scenarios)
+                transaction.set_rollback(True)
+            invalidate_all()
+            self.report(size, measured[size])
+
+        if as_json:
+            self.stdout.write(json.dumps(measured, indent=2))
+        if update_budgets:
+            with open(budgets, "w") as out:
+                json.dump(benchmarks.suggest_budgets(measured.values()), out, indent=2, sort_keys=True)
+                out.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Budgets written to {budgets}"))
+            return
+
+        committed = benchmarks.load_budgets(budgets)
+        failures = [line for size in sizes for line in benchmarks.check(measured[size], committed, size)]
+        if failures:
+            raise CommandError("Over budget:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All scenarios within budget."))
+
+    def report(self, size, results):
+        self.stdout.write(f"\n{size}:")
+        self.stdout.write(f"  {'scenario':<16} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'peak KiB':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"  {name:<16} {result['queries']:>7} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+                f"{result['peak_kb']:>9}"
+            )
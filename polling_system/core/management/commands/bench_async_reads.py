@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from statistics import median, quantiles
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+ENDPOINTS = ["projects/", "criteria/", "leaderboard/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync read endpoints served WSGI-style (one thread per in-flight request) "
+        "with the /api/async/ endpoints on one event loop, at the same concurrency. "
+        "Runs in process through the test clients, so compare the two lines, not absolute numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=20, help="Requests per concurrent client.")
+        parser.add_argument("--path", action="append", help="Path below /api/, repeatable. Default: the hot reads.")
+
+    def handle(self, *args, concurrency, requests, path, **options):
+        # The test clients send "Host: testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            self.run(path or ENDPOINTS, concurrency, requests)
+
+    def run(self, paths, concurrency, requests):
+        # Warm the response cache and the criteria registry once for both runs
+        warm = Client()
+        for p in paths:
+            warm.get(f"/api/{p}")
+
+        for label, runner in (("wsgi", self.run_wsgi), ("asgi", self.run_asgi)):
+            tracemalloc.start()
+            started = time.perf_counter()
+            self.peak_threads = threading.active_count()
+            latencies = runner(paths, concurrency, requests)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            p95 = quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            self.stdout.write(
+                f"{label}: {len(latencies) / elapsed:,.0f} req/s, p50 {median(latencies) * 1000:.1f}ms, "
+                f"p95 {p95 * 1000:.1f}ms, peak {peak / 2**20:.1f} MiB "
+                f"({peak / concurrency / 1024:.0f} KiB per in-flight request), "
+                f"{self.peak_threads} threads (stacks not included in peak)"
+            )
+
+    def run_wsgi(self, paths, concurrency, requests):
+        latencies = []
+
+        def client_loop():
+            client = Client()
+            try:
+                for i in range(requests):
+                    started = time.perf_counter()
+                    client.get(f"/api/{paths[i % len(paths)]}")
+                    latencies.append(time.perf_counter() - started)
+                    self.peak_threads = max(self.peak_threads, threading.active_count())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies
+
+    def run_asgi(self, paths, concurrency, requests):
+        latencies = []
+
+        async def client_loop():
+            client = AsyncClient()
+            for i in range(requests):
+                started = time.perf_counter()
+                await client.get(f"/api/async/{paths[i % len(paths)]}")
+                latencies.append(time.perf_counter() - started)
+                self.peak_threads = max(self.peak_threads, threading.active_count())
+
+        async def main():
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+        asyncio.run(main())
+        return latencies
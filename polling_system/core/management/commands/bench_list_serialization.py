@@ -0,0 +1,98 @@
+import time
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from core.models import Project, ProjectImage, User
+from core.renderers import ORJSONRenderer, orjson
+from core.serializers import ProjectListReader, ProjectListSerializer
+
+PREFIX = "bench-list"
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-item cost of a project list page: ProjectListSerializer against ProjectListReader, "
+        "and JSONRenderer against ORJSONRenderer. The generated data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100, help="Projects per page.")
+        parser.add_argument("--images", type=int, default=2, help="Images per project.")
+        parser.add_argument("--rounds", type=int, default=30)
+
+    def handle(self, *args, items, images, rounds, **options):
+        if items < 1 or rounds < 1:
+            raise CommandError("--items and --rounds must be positive.")
+        # Image URLs are made absolute against the request's host
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            ids = self.seed(items, images)
+            results = self.measure(ids, rounds)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{items} projects x {images} images, median of {rounds} rounds, microseconds per item:")
+        self.stdout.write(f"  {'step':<26} {'serializer':>10} {'fast path':>10} {'speedup':>8}")
+        for step, (slow, fast) in results.items():
+            self.stdout.write(
+                f"  {step:<26} {slow / items * 1e6:>10.1f} {fast / items * 1e6:>10.1f} {slow / fast:>7.1f}x"
+            )
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed, so ORJSONRenderer used JSONRenderer."))
+
+    def seed(self, items, images):
+        owner = User.objects.create(username=PREFIX, email=f"{PREFIX}@example.com")
+        projects = Project.objects.bulk_create(
+            Project(name=f"{PREFIX} {n}", description="A project " * 20, creator=owner, status="published")
+            for n in range(items)
+        )
+        derivatives = {
+            "source": "projects/bench.jpg", "width": 1600, "height": 900,
+            "thumbnail": {"width": 400, "height": 225, "webp": "projects/bench_thumb.webp",
+                          "jpeg": "projects/bench_thumb.jpg"},
+            "variants": [],
+        }
+        ProjectImage.objects.bulk_create(
+            ProjectImage(project=project, image="projects/bench.jpg", caption=f"Image {n}", order=n,
+                         width=1600, height=900, derivatives=derivatives)
+            for project in projects for n in range(images)
+        )
+        return [project.pk for project in projects]
+
+    def measure(self, ids, rounds):
+        request = Request(RequestFactory().get("/api/projects/"))
+        context = {"request": request, "shared_payload": True}
+        queryset = Project.objects.filter(pk__in=ids).order_by("-created_at", "-id")
+        timings = {"serialize (CPU only)": ([], []), "fetch + serialize": ([], []), "render JSON": ([], [])}
+
+        def timed(step, slow, fast):
+            for column, run in zip(timings[step], (slow, fast)):
+                started = time.perf_counter()
+                result = run()
+                column.append(time.perf_counter() - started)
+            return result
+
+        for _ in range(rounds):
+            instances = list(queryset.select_related("creator").prefetch_related("images"))
+            reader = ProjectListReader(context)
+            rows = list(ProjectListReader.values(queryset))
+            grouped = reader.group_images(rows, list(reader.image_rows(rows)))
+            timed(
+                "serialize (CPU only)",
+                lambda: ProjectListSerializer(instances, many=True, context=context).data,
+                lambda: reader.represent(rows, grouped),
+            )
+            data = timed(
+                "fetch + serialize",
+                lambda: ProjectListSerializer(
+                    queryset.select_related("creator").prefetch_related("images"), many=True, context=context
+                ).data,
+                lambda: reader.data(list(ProjectListReader.values(queryset))),
+            )
+            timed("render JSON", lambda: JSONRenderer().render(data), lambda: ORJSONRenderer().render(data))
+        return {step: (median(slow), median(fast)) for step, (slow, fast) in timings.items()}
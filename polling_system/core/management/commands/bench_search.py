@@ -0,0 +1,72 @@
+import random
+import time
+from statistics import median, quantiles
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.models import Project, User
+
+PREFIX = "bench-search"
+
+VOCABULARY = (
+    "poll vote ballot survey election campus student club movie film review rating shop cart "
+    "catalogue payment social feed friend post job career resume hiring match score ranking "
+    "realtime analytics dashboard mobile web api cloud secure fast simple open community event"
+).split()
+
+QUERIES = ["vote", "movie review", "shop cart", "student election", "realtime dashboard", "job", "feed frie"]
+
+
+class Command(BaseCommand):
+    help = "Seed N throwaway projects and report ?q= search latency (p50/p95) on the project list."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=100_000)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--keep", action="store_true", help="Leave the generated projects in place.")
+
+    def handle(self, *args, projects, requests, batch_size, keep, **options):
+        rng = random.Random(42)
+        owner, _ = User.objects.get_or_create(username=PREFIX, defaults={"email": f"{PREFIX}@example.com"})
+        started = time.perf_counter()
+        for offset in range(0, projects, batch_size):
+            Project.objects.bulk_create(
+                Project(
+                    name=f"{PREFIX} " + " ".join(rng.sample(VOCABULARY, 3)),
+                    description=" ".join(rng.choices(VOCABULARY, k=30)),
+                    creator=owner,
+                    status="published",
+                    category=rng.choice(Project.CATEGORY_CHOICES)[0],
+                    vote_count=rng.randint(0, 500),
+                    average_score=round(rng.uniform(0, 10), 2),
+                )
+                for _ in range(offset, min(offset + batch_size, projects))
+            )
+        self.stdout.write(f"Seeded {projects} projects in {time.perf_counter() - started:.1f}s")
+
+        try:
+            # Measure the query, not the response cache
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                client = Client()
+                for q in QUERIES:
+                    client.get("/api/projects/", {"q": q})  # warm up
+                timings = []
+                for i in range(requests):
+                    started = time.perf_counter()
+                    response = client.get("/api/projects/", {"q": QUERIES[i % len(QUERIES)]})
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        self.stderr.write(self.style.ERROR(f"HTTP {response.status_code}: {response.content[:200]}"))
+                        return
+            p95 = quantiles(timings, n=20)[-1]
+            self.stdout.write(self.style.SUCCESS(
+                f"{requests} searches: p50 {median(timings) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms"
+            ))
+        finally:
+            if not keep:
+                Project.objects.filter(creator=owner).delete()
+                owner.delete()
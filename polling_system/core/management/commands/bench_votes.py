@@ -0,0 +1,71 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from core import vote_buffer
+from core.models import Project, User, Vote
+
+PREFIX = "bench-votes"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the vote path: concurrent voters on a few hot projects, "
+        "with the vote buffer off and on (on needs a shared cache). Creates and removes its own data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--voters", type=int, default=500)
+        parser.add_argument("--projects", type=int, default=3)
+        parser.add_argument("--threads", type=int, default=16)
+
+    def handle(self, *args, voters, projects, threads, **options):
+        owner = User.objects.create_user(username=f"{PREFIX}-owner", email=f"{PREFIX}-owner@example.com")
+        users = User.objects.bulk_create(
+            User(username=f"{PREFIX}-{i}", email=f"{PREFIX}-{i}@example.com") for i in range(voters)
+        )
+        hot = Project.objects.bulk_create(
+            Project(name=f"{PREFIX} {i}", creator=owner, status="published") for i in range(projects)
+        )
+        pairs = [(user.pk, project.pk) for user in users for project in hot]
+        try:
+            for enabled in (False, True):
+                with override_settings(VOTE_BUFFER={"ENABLED": enabled}):
+                    if enabled and not vote_buffer.is_enabled():
+                        self.stdout.write(self.style.WARNING("buffered: skipped, the cache is per-process"))
+                        continue
+                    elapsed = self.run_load(pairs, threads)
+                    flushed = vote_buffer.flush() if enabled else 0
+                counts = dict(Project.objects.filter(pk__in=[p.pk for p in hot]).values_list("pk", "vote_count"))
+                label = "buffered" if enabled else "direct"
+                self.stdout.write(
+                    f"{label:>8}: {len(pairs)} votes in {elapsed:.2f}s "
+                    f"({len(pairs) / elapsed:,.0f} votes/s, {flushed} flush UPDATEs)"
+                )
+                if set(counts.values()) != {voters}:
+                    self.stderr.write(self.style.ERROR(f"{label}: vote counts drifted: {counts}"))
+                Vote.objects.filter(project__in=hot).delete()
+                Project.objects.filter(pk__in=[p.pk for p in hot]).update(vote_count=0)
+        finally:
+            Project.objects.filter(pk__in=[p.pk for p in hot]).delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    @staticmethod
+    def run_load(pairs, threads):
+        def worker(chunk):
+            try:
+                for user_id, project_id in chunk:
+                    Vote.cast(user_id, project_id)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(pairs[i::threads],)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - started
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import DATASETS, WRITERS, ExportError, export
+
+
+class Command(BaseCommand):
+    help = "Stream ratings, votes or per-criteria aggregates to a CSV, NDJSON or Parquet file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(DATASETS))
+        parser.add_argument("--format", dest="fmt", choices=list(WRITERS), default="csv")
+        parser.add_argument("--category")
+        parser.add_argument("--since", help="ISO date or datetime, inclusive.")
+        parser.add_argument("--until", help="ISO date or datetime, inclusive; a date covers the whole day.")
+        parser.add_argument("--output", "-o", help="File to write; stdout when omitted.")
+
+    def handle(self, *args, dataset, fmt, category, since, until, output, **options):
+        try:
+            chunks = export(dataset, fmt, category=category, since=since, until=until)
+        except ExportError as exc:
+            raise CommandError(exc)
+
+        written = 0
+        stream = open(output, "wb") if output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if output:
+                stream.close()
+            else:
+                stream.flush()
+        if output:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes of {dataset} to {output}."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core.images import generate, is_current
+from core.models import ProjectImage
+from core.tasks import generate_image_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate thumbnails and width variants for project images that have none yet, "
+        "such as uploads from before the derivative pipeline or after a settings change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", dest="projects",
+                            help="Only images of this project id; repeatable.")
+        parser.add_argument("--force", action="store_true", help="Rebuild derivatives that are current too.")
+        parser.add_argument("--enqueue", action="store_true",
+                            help="Queue one Celery task per image instead of processing them here.")
+
+    def handle(self, *args, projects, force, enqueue, **options):
+        images = ProjectImage.objects.exclude(image="").only("pk", "image", "derivatives").order_by("pk")
+        if projects:
+            images = images.filter(project_id__in=projects)
+        pending = [image.pk for image in images.iterator() if force or not is_current(image)]
+        if enqueue:
+            for image_id in pending:
+                generate_image_derivatives.delay(image_id)
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(pending)} images."))
+            return
+        done = sum(generate(image_id, force=force) for image_id in pending)
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} of {len(pending)} images."))
+        if done < len(pending):
+            self.stdout.write(self.style.WARNING(f"{len(pending) - done} failed or changed meanwhile; see the log."))
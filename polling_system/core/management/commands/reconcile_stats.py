@@ -0,0 +1,117 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from core import vote_buffer
+from core.cache import invalidate_all
+from core.models import Project, ProjectCriteriaScore, Rating, Vote
+
+COUNTER_FIELDS = ["vote_count", "rating_count", "rating_sum", "average_score"]
+AGGREGATE_FIELDS = ["rating_count", "score_sum", *ProjectCriteriaScore.HISTOGRAM_FIELDS]
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cached project stats from the Vote and Rating tables and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted projects without writing.")
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        buffered = vote_buffer.is_enabled()
+        if buffered and not dry_run:
+            vote_buffer.flush()
+        # Both modes detect drift the same way; a real run then rewrites
+        # only what drifted.
+        aggregates = self.drifted_aggregates()
+        counters, weighted, checked = self.drifted_projects(batch_size, buffered)
+
+        if not dry_run:
+            self.repair(counters, aggregates, weighted, batch_size)
+
+        drifted = len(aggregates | weighted | {project.pk for project in counters})
+        verb = "Would reconcile" if dry_run else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {drifted} of {checked} projects "
+            f"({len(counters)} counters, {len(aggregates)} criteria aggregates, {len(weighted)} weighted scores)."
+        ))
+
+    @staticmethod
+    def drifted_aggregates():
+        """Ids of the projects whose ProjectCriteriaScore rows differ from the Rating table."""
+        buckets = {f"score_{n}": Count("id", filter=Q(score=n)) for n in range(1, 11)}
+        expected = {
+            (row.pop("project"), row.pop("criteria")): row
+            for row in Rating.objects.order_by().values("project", "criteria")
+            .annotate(rating_count=Count("id"), score_sum=Sum("score"), **buckets)
+        }
+        stored = {
+            (row.pop("project"), row.pop("criteria")): row
+            for row in ProjectCriteriaScore.objects.values("project", "criteria", *AGGREGATE_FIELDS).iterator()
+        }
+        # A row of zeros stands for no ratings as well as a missing row does
+        empty = dict.fromkeys(AGGREGATE_FIELDS, 0)
+        return {
+            project_id for project_id, criteria_id in expected.keys() | stored.keys()
+            if expected.get((project_id, criteria_id), empty) != stored.get((project_id, criteria_id), empty)
+        }
+
+    @staticmethod
+    def drifted_projects(batch_size, buffered):
+        """
+        Projects whose counters drifted (with the expected values set on
+        them), ids of those whose weighted_score disagrees with their
+        criteria aggregates, and the number of projects checked.
+        """
+        # One grouped pass per table instead of one aggregate per project.
+        votes = dict(
+            Vote.objects.order_by().values("project").annotate(n=Count("id")).values_list("project", "n")
+        )
+        ratings = {
+            row["project"]: (row["n"], row["total"])
+            for row in Rating.objects.order_by().values("project").annotate(n=Count("id"), total=Sum("score"))
+        }
+
+        counters, weighted, checked = [], set(), 0
+        projects = (
+            Project.objects.only(*COUNTER_FIELDS, "weighted_score")
+            .annotate(expected_weighted_score=Project.weighted_score_expression())
+            .order_by("pk").iterator(chunk_size=batch_size)
+        )
+        while chunk := list(islice(projects, batch_size)):
+            # A delta still buffered (not flushed, or its log slot lost) is in
+            # the Vote table already and lands on vote_count when flushed
+            pending = vote_buffer.pending([project.pk for project in chunk]) if buffered else {}
+            for project in chunk:
+                checked += 1
+                rating_count, rating_sum = ratings.get(project.pk, (0, 0))
+                expected = {
+                    "vote_count": votes.get(project.pk, 0) - pending.get(project.pk, 0),
+                    "rating_count": rating_count,
+                    "rating_sum": rating_sum,
+                    "average_score": round(rating_sum / rating_count, 2) if rating_count else 0,
+                }
+                if any(getattr(project, field) != value for field, value in expected.items()):
+                    for field, value in expected.items():
+                        setattr(project, field, value)
+                    counters.append(project)
+                if project.weighted_score != project.expected_weighted_score:
+                    weighted.add(project.pk)
+        return counters, weighted, checked
+
+    @staticmethod
+    def repair(counters, aggregates, weighted, batch_size):
+        if not (counters or aggregates or weighted):
+            return
+        with transaction.atomic():
+            Project.objects.bulk_update(counters, COUNTER_FIELDS, batch_size=batch_size)
+            aggregates = sorted(aggregates)
+            for start in range(0, len(aggregates), batch_size):
+                ProjectCriteriaScore.rebuild(aggregates[start:start + batch_size])
+            # Rebuilt aggregates move the weighted score too
+            rescore = sorted(weighted.union(aggregates))
+            for start in range(0, len(rescore), batch_size):
+                Project.refresh_weighted_scores(Project.objects.filter(pk__in=rescore[start:start + batch_size]))
+        invalidate_all()
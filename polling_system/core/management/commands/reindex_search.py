@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Project
+from core.search import search_setting
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the Postgres search_vector trigger function and recompute every project's vector "
+        'in the current PROJECT_SEARCH["CONFIG"], e.g. after changing it.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write("Nothing to do: the SQLite FTS5 index has no configuration to follow.")
+            return
+        with transaction.atomic():
+            count = Project.refresh_search_vectors()
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {count} projects in '{search_setting('CONFIG')}'."))
@@ -0,0 +1,187 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.cache import invalidate_all, invalidate_criteria
+from core.models import Criteria, Project, Rating, User, Vote
+
+VOCABULARY = (
+    "poll vote ballot survey election campus student club movie film review rating shop cart "
+    "catalogue payment social feed friend post job career resume hiring match score ranking "
+    "realtime analytics dashboard mobile web api cloud secure fast simple open community event"
+).split()
+
+# (name, weight) offered to categories that have no criteria yet
+CRITERIA = [
+    ("Design", 2), ("Usability", 2), ("Code Quality", 1), ("Innovation", 3),
+    ("Performance", 1), ("Documentation", 1), ("Accessibility", 1), ("Impact", 2),
+]
+
+# Share of generated projects per status; only published ones get votes and ratings
+STATUSES = [("published", 85), ("draft", 10), ("under_review", 4), ("rejected", 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, projects, criteria, votes and ratings at scale with bulk inserts "
+        "and Zipf-distributed popularity, then reconcile the project stats once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--projects-per-category", type=int, default=1_000)
+        parser.add_argument("--criteria-per-category", type=int, default=5,
+                            help="Only used for categories that have no criteria yet.")
+        parser.add_argument("--votes", type=int, default=200_000, help="Votes to draw; duplicates are dropped.")
+        parser.add_argument("--ratings", type=int, default=1_000_000,
+                            help="Ratings to draw, as full scorecards; duplicates are dropped.")
+        parser.add_argument("--zipf", type=float, default=1.1,
+                            help="Popularity exponent: the k-th most popular project draws ~1/k^s of the traffic.")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="seed", help="Username prefix marking the generated data.")
+        parser.add_argument("--clear", action="store_true", help="Remove previously seeded data first.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        prefix = options["prefix"]
+        seeded = User.objects.filter(username__startswith=f"{prefix}-")
+        if options["clear"]:
+            self.clear(seeded)
+        elif seeded.exists():
+            raise CommandError(f"Users prefixed '{prefix}-' already exist; pass --clear to replace them.")
+
+        started = time.perf_counter()
+        users = self.create_users(prefix, options["users"])
+        criteria = self.create_criteria(options["criteria_per_category"])
+        projects = self.create_projects(users, options["projects_per_category"])
+        published = [project for project in projects if project.status == "published"]
+        if not users or not published:
+            raise CommandError("Nothing to vote on: need at least one user and one published project.")
+
+        # Popularity rank is independent of category and creation order
+        self.rng.shuffle(published)
+        cum_weights = list(accumulate(1 / (rank ** options["zipf"]) for rank in range(1, len(published) + 1)))
+        quality = {project.pk: self.rng.uniform(3, 9) for project in published}
+        votes = self.create_votes(users, published, cum_weights, options["votes"])
+        ratings = self.create_ratings(users, published, cum_weights, criteria, quality, options["ratings"])
+        self.stdout.write(
+            f"Inserted {len(users)} users, {len(projects)} projects, {votes} votes and {ratings} ratings "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        # bulk_create sends no signals, so the counters are derived once here
+        started = time.perf_counter()
+        call_command("reconcile_stats", batch_size=self.batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Stats reconciled in {time.perf_counter() - started:.1f}s"))
+
+    def batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def clear(self, seeded):
+        projects = Project.objects.filter(creator__in=seeded)
+        # Raw deletes: the per-row stats signals would only be undone by the reconcile
+        with transaction.atomic():
+            for model in (Rating, Vote):
+                queryset = model.objects.filter(user__in=seeded)
+                queryset._raw_delete(queryset.db)
+                queryset = model.objects.filter(project__in=projects)
+                queryset._raw_delete(queryset.db)
+            removed, _ = projects.delete()
+            seeded.delete()
+        invalidate_all()
+        self.stdout.write(f"Cleared {removed} seeded rows")
+
+    def create_users(self, prefix, count):
+        # One hash for everyone; hashing per user would dominate the run
+        password = make_password(prefix)
+        users = []
+        for batch in self.batches(
+            User(username=f"{prefix}-{n}", email=f"{prefix}-{n}@example.com", password=password)
+            for n in range(count)
+        ):
+            users.extend(User.objects.bulk_create(batch))
+        return users
+
+    def create_criteria(self, per_category):
+        by_category = {}
+        for criteria in Criteria.objects.order_by("order", "pk"):
+            by_category.setdefault(criteria.project_category, []).append(criteria)
+        missing = [
+            Criteria(project_category=category, name=name, weight=weight, order=order)
+            for category, _ in Project.CATEGORY_CHOICES if category not in by_category
+            for order, (name, weight) in enumerate(CRITERIA[:per_category])
+        ]
+        # bulk_create skips criteria_changed: the reconcile refreshes the
+        # weighted scores, but the registries need the criteria version bumped
+        for criteria in Criteria.objects.bulk_create(missing):
+            by_category.setdefault(criteria.project_category, []).append(criteria)
+        if missing:
+            invalidate_criteria()
+        return by_category
+
+    def create_projects(self, users, per_category):
+        statuses, weights = zip(*STATUSES)
+
+        def generate():
+            for category, _ in Project.CATEGORY_CHOICES:
+                for _ in range(per_category):
+                    yield Project(
+                        name=" ".join(self.rng.sample(VOCABULARY, 3)).title(),
+                        description=" ".join(self.rng.choices(VOCABULARY, k=30)),
+                        creator=self.rng.choice(users) if users else None,
+                        category=category,
+                        status=self.rng.choices(statuses, weights)[0],
+                        is_featured=self.rng.random() < 0.02,
+                    )
+
+        projects = []
+        for batch in self.batches(generate()):
+            projects.extend(Project.objects.bulk_create(batch))
+        return projects
+
+    def draw(self, users, projects, cum_weights, count):
+        """Distinct (user, project) pairs per batch: Zipf-popular projects, uniform users."""
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            picked = self.rng.choices(projects, cum_weights=cum_weights, k=size)
+            yield list({(self.rng.choice(users).pk, project): None for project in picked})
+
+    def create_votes(self, users, projects, cum_weights, count):
+        before = Vote.objects.count()
+        for pairs in self.draw(users, projects, cum_weights, count):
+            Vote.objects.bulk_create(
+                [Vote(user_id=user_id, project_id=project.pk) for user_id, project in pairs],
+                ignore_conflicts=True,
+            )
+        return Vote.objects.count() - before
+
+    def create_ratings(self, users, projects, cum_weights, criteria, quality, count):
+        # Each draw is one judge's full scorecard for a project
+        per_card = max(1, round(sum(map(len, criteria.values())) / max(1, len(criteria))))
+        before = Rating.objects.count()
+        for pairs in self.draw(users, projects, cum_weights, count // per_card):
+            ratings = [
+                Rating(
+                    user_id=user_id, project_id=project.pk, criteria_id=item.pk,
+                    score=min(10, max(1, round(self.rng.gauss(quality[project.pk], 1.5)))),
+                )
+                for user_id, project in pairs
+                for item in criteria.get(project.category, ())
+            ]
+            for batch in self.batches(ratings):
+                Rating.objects.bulk_create(batch, ignore_conflicts=True)
+        return Rating.objects.count() - before
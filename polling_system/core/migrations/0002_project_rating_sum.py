@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:52
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Rating = apps.get_model('core', 'Rating')
+    totals = (
+        Rating.objects.filter(project=OuterRef('pk'))
+        .order_by().values('project')
+        .annotate(total=Sum('score')).values('total')
+    )
+    Project.objects.update(rating_sum=Coalesce(Subquery(totals), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    Comment = apps.get_model('core', 'Comment')
+    Project = apps.get_model('core', 'Project')
+    # Keyset pagination compares average_score, so it can't be NULL
+    Project.objects.filter(average_score__isnull=True).update(average_score=0)
+
+    parents = dict(Comment.objects.filter(parent__isnull=False).values_list('id', 'parent_id'))
+    updates = []
+    for comment_id, parent_id in parents.items():
+        root = parent_id
+        while root in parents:
+            root = parents[root]
+        updates.append(Comment(id=comment_id, thread_id=root))
+    Comment.objects.bulk_update(updates, ['thread'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_project_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='thread',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='core.comment'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='average_score',
+            field=models.FloatField(blank=True, db_index=True, default=0, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
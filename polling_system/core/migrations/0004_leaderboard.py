@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+
+def backfill(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Rating = apps.get_model('core', 'Rating')
+    ProjectCriteriaScore = apps.get_model('core', 'ProjectCriteriaScore')
+
+    totals = Rating.objects.order_by().values('project', 'criteria').annotate(n=Count('id'), total=Sum('score'))
+    ProjectCriteriaScore.objects.bulk_create(
+        [ProjectCriteriaScore(project_id=row['project'], criteria_id=row['criteria'],
+                              rating_count=row['n'], score_sum=row['total']) for row in totals],
+        batch_size=1000,
+    )
+    per_criteria = Cast('score_sum', FloatField()) / F('rating_count')
+    scores = (
+        ProjectCriteriaScore.objects.filter(project=OuterRef('pk'), rating_count__gt=0)
+        .order_by().values('project')
+        .annotate(score=Sum(F('criteria__weight') * per_criteria) / NullIf(Sum('criteria__weight'), Value(0)))
+        .values('score')
+    )
+    Project.objects.update(weighted_score=Coalesce(Round(Subquery(scores), 2), Value(0.0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_keyset_pagination'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCriteriaScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='weighted_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-weighted_score'], name='core_projec_status_a0478b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['category', 'status', '-weighted_score'], name='core_projec_categor_867f6b_idx'),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='criteria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_scores', to='core.criteria'),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='criteria_scores', to='core.project'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='projectcriteriascore',
+            unique_together={('project', 'criteria')},
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
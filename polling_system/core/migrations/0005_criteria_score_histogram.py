@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Rating = apps.get_model('core', 'Rating')
+    ProjectCriteriaScore = apps.get_model('core', 'ProjectCriteriaScore')
+
+    def bucket(score):
+        counts = (
+            Rating.objects.filter(project=OuterRef('project'), criteria=OuterRef('criteria'), score=score)
+            .order_by().values('project').annotate(n=Count('id')).values('n')
+        )
+        return Coalesce(Subquery(counts), Value(0))
+
+    ProjectCriteriaScore.objects.update(**{f'score_{n}': bucket(n) for n in range(1, 11)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_10',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_6',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_7',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_8',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectcriteriascore',
+            name='score_9',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+GIN_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_project_search_gin')
+
+# External-content FTS5 index over core_project, synced by triggers
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE core_project_fts USING fts5("
+    "name, description, content='core_project', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER core_project_fts_ai AFTER INSERT ON core_project BEGIN "
+    "INSERT INTO core_project_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER core_project_fts_ad AFTER DELETE ON core_project BEGIN "
+    "INSERT INTO core_project_fts(core_project_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER core_project_fts_au AFTER UPDATE OF name, description ON core_project BEGIN "
+    "INSERT INTO core_project_fts(core_project_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO core_project_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    # bm25 column weights for the rank column: name hits count more than description hits
+    "INSERT INTO core_project_fts(core_project_fts, rank) VALUES ('rank', 'bm25(10.0, 3.0)')",
+    "INSERT INTO core_project_fts(core_project_fts) VALUES ('rebuild')",
+]
+
+FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_project_fts_ai",
+    "DROP TRIGGER IF EXISTS core_project_fts_ad",
+    "DROP TRIGGER IF EXISTS core_project_fts_au",
+    "DROP TABLE IF EXISTS core_project_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+
+        schema_editor.add_index(Project, GIN_INDEX)
+        Project.objects.update(
+            search_vector=SearchVector('name', weight='A', config='english')
+            + SearchVector('description', weight='B', config='english')
+        )
+    elif vendor == 'sqlite':
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(Project, GIN_INDEX)
+    elif vendor == 'sqlite':
+        for sql in FTS_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_criteria_score_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # GIN only exists on Postgres; other backends get the index in state only
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='project', index=GIN_INDEX)],
+            database_operations=[migrations.RunPython(create_search_index, drop_search_index)],
+        ),
+        migrations.CreateModel(
+            name='ProjectSearchIndex',
+            fields=[
+                ('project', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='core.project')),
+                ('document', models.TextField(db_column='core_project_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'core_project_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:53
+
+import core.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_project_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', core.models.UserManager()),
+            ],
+        ),
+    ]
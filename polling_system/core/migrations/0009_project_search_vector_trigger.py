@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:00
+
+from django.db import migrations
+
+from core.search import search_backfill_sql, search_function_sql
+
+# Fill search_vector in the INSERT/UPDATE itself, as the FTS5 triggers of
+# 0006 do on SQLite. The function indexes in PROJECT_SEARCH["CONFIG"], and
+# the vectors 0006 stored in english are recomputed in it; reindex_search
+# does both again after a change.
+TRIGGER_SQL = [
+    "CREATE TRIGGER core_project_search_vector_bi BEFORE INSERT ON core_project "
+    "FOR EACH ROW EXECUTE FUNCTION core_project_search_vector()",
+    "CREATE TRIGGER core_project_search_vector_bu BEFORE UPDATE OF name, description ON core_project "
+    "FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD.description IS DISTINCT FROM NEW.description) "
+    "EXECUTE FUNCTION core_project_search_vector()",
+]
+
+TRIGGER_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_project_search_vector_bu ON core_project",
+    "DROP TRIGGER IF EXISTS core_project_search_vector_bi ON core_project",
+    "DROP FUNCTION IF EXISTS core_project_search_vector()",
+]
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in [search_function_sql(), *TRIGGER_SQL, search_backfill_sql()]:
+            schema_editor.execute(sql)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in TRIGGER_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_project_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
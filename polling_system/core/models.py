@@ -1,13 +1,45 @@
 # core/models.py
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, connection, models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg, Count
+from django.db.models import Avg, Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
 
+from .cache import (
+    forget_user, invalidate_all, invalidate_comments, invalidate_criteria, invalidate_project, invalidate_stats,
+)
+from .images import delete_files, derivative_files, is_current, schedule_derivatives
+from .pipeline import current_batch, is_async, schedule_stats, stats_batch
+from .search import search_function_sql, search_vector
+from . import events, vote_buffer
 
-class User(AbstractUser):
+
+class StatsBatchQuerySet(models.QuerySet):
+    """Bulk deletes recompute the stats of the affected projects once, not per cascaded row."""
+
+    def delete(self):
+        with stats_batch():
+            return super().delete()
+
+
+class StatsBatchDeleteMixin:
+    """``delete()`` of a row whose cascade reaches votes or ratings, batched the same way."""
+
+    def delete(self, *args, **kwargs):
+        with stats_batch():
+            return super().delete(*args, **kwargs)
+
+
+class UserManager(DjangoUserManager.from_queryset(StatsBatchQuerySet)):
+    pass
+
+
+class User(StatsBatchDeleteMixin, AbstractUser):
     email = models.EmailField(unique=True, blank=False)
     username = models.CharField(max_length=150, unique=True)
     first_name = models.CharField(max_length=150, blank=True)
@@ -17,11 +49,13 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    objects = UserManager()
+
     def __str__(self):
         return self.email
 
 
-class Project(models.Model):
+class Project(StatsBatchDeleteMixin, models.Model):
     CATEGORY_CHOICES = [
         ("poll", "Online Polling"),
         ("movie", "Movie Recommendation"),
@@ -49,10 +83,20 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    # Cached stats
+    # Cached stats, maintained incrementally by the Vote/Rating signals below
     vote_count = models.PositiveIntegerField(default=0, editable=False)
-    average_score = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    average_score = models.FloatField(default=0, null=True, blank=True, editable=False, db_index=True)
     rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # Criteria.weight-weighted mean of the per-criteria averages, the leaderboard key
+    weighted_score = models.FloatField(default=0, editable=False)
+    # Postgres full-text document over name/description (see core/search.py);
+    # SQLite indexes the same text in an FTS5 table instead
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    STATS_FIELDS = ("vote_count", "average_score", "rating_count", "rating_sum", "weighted_score")
+
+    objects = StatsBatchQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
@@ -61,17 +105,189 @@ class Project(models.Model):
             models.Index(fields=["-vote_count"]),
             models.Index(fields=["-average_score"]),
             models.Index(fields=["-created_at"]),
+            models.Index(fields=["status", "-weighted_score"]),
+            models.Index(fields=["category", "status", "-weighted_score"]),
+            # Created on Postgres only, by migration 0006
+            GinIndex(fields=["search_vector"], name="core_project_search_gin"),
         ]
 
     def __str__(self):
         return f"{self.name} by {self.creator}"
 
+    def save(self, *args, **kwargs):
+        # The stats columns are owned by the counter updates below. A plain
+        # save() of a loaded instance would write back stale counts and lose
+        # concurrent increments, so leave them out unless asked explicitly.
+        # search_vector is filled in by a database trigger (migration 0009).
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.STATS_FIELDS and f.name != "search_vector"
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def refresh_search_vectors(cls, queryset=None):
+        """
+        Recompute ``search_vector`` in one UPDATE, after recreating the
+        trigger function so later writes index in the same
+        ``PROJECT_SEARCH["CONFIG"]``. Writes are indexed by the triggers
+        otherwise; this is for a CONFIG change. A no-op off Postgres.
+        """
+        if connection.vendor != "postgresql":
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(search_function_sql())
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(search_vector=search_vector())
+
     def recalculate_stats(self):
-        agg = self.ratings.aggregate(avg=Avg("score"), count=Count("id"))
+        """Repair path: rebuild the cached stats from the Vote/Rating tables."""
+        if vote_buffer.is_enabled():
+            # Buffered deltas would be added again on top of the recount
+            vote_buffer.flush([self.pk])
+        agg = self.ratings.aggregate(avg=Avg("score"), count=Count("id"), total=Sum("score"))
         self.average_score = round(agg["avg"] or 0, 2)
         self.rating_count = agg["count"] or 0
+        self.rating_sum = agg["total"] or 0
         self.vote_count = self.votes.count()
-        self.save(update_fields=["average_score", "rating_count", "vote_count"])
+        ProjectCriteriaScore.rebuild([self.pk])
+        self.weighted_score = Project.objects.filter(pk=self.pk).values_list(
+            self.weighted_score_expression(), flat=True
+        ).get()
+        self.save(update_fields=list(self.STATS_FIELDS))
+        invalidate_stats(self.pk)
+        events.project_changed(self.pk)
+
+    @classmethod
+    def refresh_stats(cls, project_ids):
+        """
+        Set-based ``recalculate_stats`` for many projects: per-criteria
+        aggregates rebuilt in one pass, then every counter derived in one
+        UPDATE. Used when a ``stats_batch`` commits.
+        """
+        project_ids = list(project_ids)
+        if vote_buffer.is_enabled():
+            # Buffered deltas would be added again on top of the recount
+            vote_buffer.flush(project_ids)
+        votes = (
+            Vote.objects.filter(project=OuterRef("pk")).order_by().values("project")
+            .annotate(n=Count("id")).values("n")
+        )
+        ratings = Rating.objects.filter(project=OuterRef("pk")).order_by().values("project")
+        rating_count = Coalesce(Subquery(ratings.annotate(n=Count("id")).values("n")), Value(0))
+        rating_sum = Coalesce(Subquery(ratings.annotate(total=Sum("score")).values("total")), Value(0))
+        with transaction.atomic():
+            ProjectCriteriaScore.rebuild(project_ids)
+            cls.objects.filter(pk__in=project_ids).update(
+                vote_count=Coalesce(Subquery(votes), Value(0)),
+                rating_count=rating_count,
+                rating_sum=rating_sum,
+                average_score=Coalesce(
+                    Round(Cast(rating_sum, FloatField()) / NullIf(rating_count, Value(0)), 2), Value(0.0)
+                ),
+                weighted_score=cls.weighted_score_expression(),
+            )
+        for project_id in project_ids:
+            invalidate_stats(project_id)
+            events.project_changed(project_id)
+
+    @staticmethod
+    def weighted_score_expression():
+        """
+        Weighted mean of per-criteria averages, read from ProjectCriteriaScore
+        (O(criteria) rows) rather than the Rating table.
+        """
+        per_criteria = Cast("score_sum", FloatField()) / F("rating_count")
+        scores = (
+            ProjectCriteriaScore.objects.filter(project=OuterRef("pk"), rating_count__gt=0)
+            .order_by().values("project")
+            # No score rather than a division by zero when every rated criteria weighs 0
+            .annotate(score=Sum(F("criteria__weight") * per_criteria) / NullIf(Sum("criteria__weight"), Value(0)))
+            .values("score")
+        )
+        return Coalesce(Round(Subquery(scores), 2), Value(0.0))
+
+    @classmethod
+    def refresh_weighted_scores(cls, queryset=None):
+        """Recompute weighted_score in one UPDATE, e.g. after a Criteria.weight change."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        invalidate_all()
+        return queryset.update(weighted_score=cls.weighted_score_expression())
+
+    @classmethod
+    def apply_vote_delta(cls, project_id, delta, buffered=None):
+        """
+        Atomically shift ``vote_count`` by ``delta`` without reading the row.
+        Returns the new count (``None`` if the project is gone).
+
+        With the vote buffer enabled the delta is queued in the shared cache
+        once the transaction commits and flushed later by
+        ``vote_buffer.flush``; the returned count then includes the pending
+        deltas, read without locking the row.
+        """
+        if buffered is None:
+            buffered = vote_buffer.is_enabled()
+        if buffered:
+            stored = cls.objects.filter(pk=project_id).values_list("vote_count", flat=True).first()
+            if stored is None:
+                return None
+            transaction.on_commit(lambda: vote_buffer.add(project_id, delta))
+            # The count is unchanged in the row, but personalize() merges the pending delta
+            invalidate_stats(project_id)
+            events.project_changed(project_id)
+            return stored + vote_buffer.pending([project_id]).get(project_id, 0) + delta
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET vote_count = vote_count + %s WHERE id = %s RETURNING vote_count",
+                [delta, project_id],
+            )
+            row = cursor.fetchone()
+        invalidate_stats(project_id)
+        events.project_changed(project_id)
+        return row[0] if row else None
+
+    @classmethod
+    def apply_rating_delta(cls, project_id, score_delta, count_delta):
+        """
+        Atomically shift the running rating sum/count and derive the new
+        average in the same UPDATE. Column references on the right-hand side
+        see the pre-update values, so the deltas are applied inline. The
+        weighted score is re-derived from ProjectCriteriaScore, so apply the
+        per-criteria delta first.
+        """
+        new_sum = F("rating_sum") + score_delta
+        new_count = F("rating_count") + count_delta
+        average = Round(Cast(new_sum, FloatField()) / NullIf(new_count, Value(0)), 2)
+        invalidate_stats(project_id)
+        events.project_changed(project_id)
+        return cls.objects.filter(pk=project_id).update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            average_score=Coalesce(average, Value(0.0)),
+            weighted_score=cls.weighted_score_expression(),
+        )
+
+
+class ProjectSearchIndex(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over Project name/description,
+    created and kept in sync by triggers in migration 0006. Only exists on
+    SQLite; Postgres searches Project.search_vector instead.
+    """
+    project = models.OneToOneField(
+        Project, primary_key=True, db_column="rowid", db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name="search_index",
+    )
+    # FTS5 hidden columns: "<table> = 'query'" runs a full-text match, and
+    # rank is bm25 with the column weights configured in the migration
+    document = models.TextField(db_column="core_project_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "core_project_fts"
 
 
 class ProjectImage(models.Model):
@@ -79,18 +295,24 @@ class ProjectImage(models.Model):
     image = models.ImageField(upload_to="projects/%Y/%m/%d/")
     caption = models.CharField(max_length=200, blank=True)
     order = models.PositiveSmallIntegerField(default=0)
+    # Filled in by core.images once the upload has been processed
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["order"]
 
 
-class Criteria(models.Model):
+class Criteria(StatsBatchDeleteMixin, models.Model):
     project_category = models.CharField(max_length=20, choices=Project.CATEGORY_CHOICES)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     weight = models.PositiveSmallIntegerField(default=1)
     order = models.PositiveSmallIntegerField(default=0)
 
+    objects = StatsBatchQuerySet.as_manager()
+
     class Meta:
         unique_together = ("project_category", "name")
         ordering = ["project_category", "order"]
@@ -104,9 +326,44 @@ class Vote(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="votes")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = StatsBatchQuerySet.as_manager()
+
     class Meta:
         unique_together = ("user", "project")
 
+    # The API write path. These issue the INSERT/DELETE and the counter
+    # update directly, so the model signals (kept for admin and ORM writes)
+    # don't fire and nothing is counted twice.
+    @classmethod
+    def cast(cls, user_id, project_id):
+        """Record a vote idempotently. Returns the new vote_count, or ``None`` if it already existed."""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, project_id, created_at) VALUES (%s, %s, %s) "
+                    "ON CONFLICT (user_id, project_id) DO NOTHING",
+                    [user_id, project_id, now],
+                )
+                if cursor.rowcount == 0:
+                    return None
+            return Project.apply_vote_delta(project_id, 1)
+
+    @classmethod
+    def retract(cls, user_id, project_id):
+        """Remove a vote. Returns the new vote_count, or ``None`` if there was no vote."""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE user_id = %s AND project_id = %s",
+                    [user_id, project_id],
+                )
+                if cursor.rowcount == 0:
+                    return None
+            return Project.apply_vote_delta(project_id, -1)
+
 
 class Rating(models.Model):
     user = models.ForeignKey('User', on_delete=models.CASCADE, related_name="ratings")
@@ -115,20 +372,204 @@ class Rating(models.Model):
     score = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(10)])
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = StatsBatchQuerySet.as_manager()
+
     class Meta:
         unique_together = ("user", "project", "criteria")
         indexes = [models.Index(fields=["project", "criteria"])]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the score already counted in the project stats so an edit
+        # can be applied as a delta.
+        instance._counted_score = instance.__dict__.get("score")
+        instance._counted_criteria_id = instance.__dict__.get("criteria_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or current_batch() is not None or is_async():
+            return super().save(*args, **kwargs)
+        # The stats delta of an edit is taken against the stored row, locked
+        # until commit: two edits from the same loaded score would otherwise
+        # both subtract it.
+        with transaction.atomic():
+            stored = Rating.objects.select_for_update().filter(pk=self.pk).values_list("score", "criteria_id").first()
+            if stored is not None:
+                self._counted_score, self._counted_criteria_id = stored
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def submit_scorecard(cls, user_id, project_id, scores):
+        """
+        Upsert one judge's scores for several criteria at once (``scores``
+        maps criteria id to score) and apply the stats change in a single
+        pass. The per-row signals don't fire. Returns ``(created, updated)``
+        counts; resubmitted unchanged scores are in neither.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Only the rows this INSERT wrote are new. A concurrent first
+                # submission that got there first turns ours into a conflict,
+                # which the update below then sees committed.
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, project_id, criteria_id, score, created_at) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s)"] * len(scores))
+                    + " ON CONFLICT (user_id, project_id, criteria_id) DO NOTHING RETURNING criteria_id",
+                    [value for criteria_id, score in scores.items()
+                     for value in (user_id, project_id, criteria_id, score, now)],
+                )
+                created = {criteria_id for criteria_id, in cursor.fetchall()}
+            existing = [criteria_id for criteria_id in scores if criteria_id not in created]
+            previous = dict(
+                cls.objects.select_for_update()
+                .filter(user_id=user_id, project_id=project_id, criteria_id__in=existing)
+                .values_list("criteria_id", "score")
+            ) if existing else {}
+            updated = {criteria_id: scores[criteria_id] for criteria_id, old in previous.items()
+                       if old != scores[criteria_id]}
+            if updated:
+                cls.objects.filter(user_id=user_id, project_id=project_id, criteria_id__in=updated).update(
+                    score=Case(*(When(criteria_id=criteria_id, then=Value(score))
+                                 for criteria_id, score in updated.items()))
+                )
+            changes = [(criteria_id, scores[criteria_id], None) for criteria_id in created] + [
+                (criteria_id, score, previous[criteria_id]) for criteria_id, score in updated.items()
+            ]
+            if changes and is_async():
+                schedule_stats(project_id)
+            elif changes:
+                ProjectCriteriaScore.apply_deltas(project_id, changes)
+                Project.apply_rating_delta(
+                    project_id,
+                    sum(score - (old or 0) for _, score, old in changes),
+                    sum(old is None for _, _, old in changes),
+                )
+        return len(created), len(updated)
+
     def clean(self):
         if self.project.category != self.criteria.project_category:
             from django.core.exceptions import ValidationError
             raise ValidationError("Criteria does not match project category")
 
 
+class ProjectCriteriaScore(models.Model):
+    """
+    Running per-project, per-criteria rating aggregate with a 1-10 score
+    histogram, maintained by the Rating signals.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="criteria_scores")
+    criteria = models.ForeignKey(Criteria, on_delete=models.CASCADE, related_name="project_scores")
+    rating_count = models.PositiveIntegerField(default=0)
+    score_sum = models.PositiveIntegerField(default=0)
+    score_1 = models.PositiveIntegerField(default=0)
+    score_2 = models.PositiveIntegerField(default=0)
+    score_3 = models.PositiveIntegerField(default=0)
+    score_4 = models.PositiveIntegerField(default=0)
+    score_5 = models.PositiveIntegerField(default=0)
+    score_6 = models.PositiveIntegerField(default=0)
+    score_7 = models.PositiveIntegerField(default=0)
+    score_8 = models.PositiveIntegerField(default=0)
+    score_9 = models.PositiveIntegerField(default=0)
+    score_10 = models.PositiveIntegerField(default=0)
+
+    HISTOGRAM_FIELDS = tuple(f"score_{n}" for n in range(1, 11))
+
+    class Meta:
+        unique_together = ("project", "criteria")
+
+    @property
+    def mean(self):
+        return round(self.score_sum / self.rating_count, 2) if self.rating_count else 0
+
+    @property
+    def histogram(self):
+        """Rating counts for scores 1..10."""
+        return [getattr(self, field) for field in self.HISTOGRAM_FIELDS]
+
+    @staticmethod
+    def _deltas(added=None, removed=None):
+        """Column increments for counting a rating of score ``added`` in and/or ``removed`` out."""
+        deltas = {
+            "rating_count": (added is not None) - (removed is not None),
+            "score_sum": (added or 0) - (removed or 0),
+        }
+        if added is not None:
+            deltas[f"score_{added}"] = 1
+        if removed is not None:
+            deltas[f"score_{removed}"] = deltas.get(f"score_{removed}", 0) - 1
+        return deltas
+
+    @classmethod
+    def apply_delta(cls, project_id, criteria_id, added=None, removed=None):
+        """Count a rating of score ``added`` in and/or one of score ``removed`` out."""
+        changes = {field: F(field) + delta for field, delta in cls._deltas(added, removed).items()}
+        rows = cls.objects.filter(project_id=project_id, criteria_id=criteria_id)
+        # Removals never create a row: the criteria or project may be mid-cascade
+        if rows.update(**changes) or added is None:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    project_id=project_id, criteria_id=criteria_id,
+                    rating_count=1, score_sum=added, **{f"score_{added}": 1},
+                )
+        except IntegrityError:
+            # Lost the race with a concurrent first rating
+            rows.update(**changes)
+
+    @classmethod
+    def apply_deltas(cls, project_id, changes):
+        """
+        Batch form of apply_delta for several criteria of one project;
+        ``changes`` holds ``(criteria_id, added, removed)`` triples.
+        """
+        criteria_ids = [criteria_id for criteria_id, _, _ in changes]
+        cls.objects.bulk_create(
+            [cls(project_id=project_id, criteria_id=criteria_id) for criteria_id in criteria_ids],
+            ignore_conflicts=True,
+        )
+        rows = {
+            row.criteria_id: row
+            for row in cls.objects.filter(project_id=project_id, criteria_id__in=criteria_ids).only("criteria_id")
+        }
+        deltas = {criteria_id: cls._deltas(added, removed) for criteria_id, added, removed in changes}
+        fields = sorted({field for delta in deltas.values() for field in delta})
+        for criteria_id, delta in deltas.items():
+            for field in fields:
+                setattr(rows[criteria_id], field, F(field) + delta.get(field, 0))
+        cls.objects.bulk_update(rows.values(), fields)
+
+    @classmethod
+    def rebuild(cls, project_ids=None):
+        """Replace the aggregates of the given projects (all when ``None``) from the Rating table."""
+        ratings, existing = Rating.objects.all(), cls.objects.all()
+        if project_ids is not None:
+            ratings, existing = ratings.filter(project__in=project_ids), existing.filter(project__in=project_ids)
+        buckets = {f"score_{n}": Count("id", filter=Q(score=n)) for n in range(1, 11)}
+        totals = (
+            ratings.order_by().values("project", "criteria")
+            .annotate(rating_count=Count("id"), score_sum=Sum("score"), **buckets)
+        )
+        with transaction.atomic():
+            existing.delete()
+            cls.objects.bulk_create(
+                [cls(project_id=row.pop("project"), criteria_id=row.pop("criteria"), **row) for row in totals],
+                batch_size=1000,
+            )
+
+
 class Comment(models.Model):
     user = models.ForeignKey('User', on_delete=models.CASCADE, related_name="comments")
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="comments")
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies")
+    # Root comment of the thread (NULL for roots), so a page of threads can be
+    # loaded with one ``thread__in`` query
+    thread = models.ForeignKey(
+        "self", null=True, blank=True, editable=False, on_delete=models.CASCADE, related_name="thread_comments"
+    )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -137,12 +578,115 @@ class Comment(models.Model):
         ordering = ["-created_at"]
         indexes = [models.Index(fields=["project", "-created_at"])]
 
+    def save(self, *args, **kwargs):
+        if self.parent_id is not None and self.thread_id is None:
+            self.thread_id = self.parent.thread_id or self.parent_id
+        super().save(*args, **kwargs)
+
 
 # Signals
-@receiver([post_save, post_delete], sender=Vote)
-@receiver([post_save, post_delete], sender=Rating)
-def update_project_stats(sender, instance, **kwargs):
-    if isinstance(instance, Vote):
-        instance.project.recalculate_stats()
-    elif isinstance(instance, Rating):
+@receiver(post_save, sender=Vote)
+def vote_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    batch = current_batch()
+    if batch is not None:
+        batch.add(instance.project_id)
+    else:
+        Project.apply_vote_delta(instance.project_id, 1)
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, **kwargs):
+    batch = current_batch()
+    if batch is not None:
+        batch.add(instance.project_id)
+    else:
+        Project.apply_vote_delta(instance.project_id, -1)
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_counted_score", None)
+    previous_criteria_id = getattr(instance, "_counted_criteria_id", None)
+    batch = current_batch()
+    if batch is not None:
+        batch.add(instance.project_id)
+    elif is_async():
+        schedule_stats(instance.project_id)
+    elif created:
+        ProjectCriteriaScore.apply_delta(instance.project_id, instance.criteria_id, added=instance.score)
+        Project.apply_rating_delta(instance.project_id, instance.score, 1)
+    elif previous is None:
+        # Saved without having been loaded, so the old score is unknown.
         instance.project.recalculate_stats()
+    elif (previous_criteria_id, previous) != (instance.criteria_id, instance.score):
+        if previous_criteria_id == instance.criteria_id:
+            ProjectCriteriaScore.apply_delta(
+                instance.project_id, instance.criteria_id, added=instance.score, removed=previous
+            )
+        else:
+            ProjectCriteriaScore.apply_delta(instance.project_id, previous_criteria_id, removed=previous)
+            ProjectCriteriaScore.apply_delta(instance.project_id, instance.criteria_id, added=instance.score)
+        Project.apply_rating_delta(instance.project_id, instance.score - previous, 0)
+    instance._counted_score = instance.score
+    instance._counted_criteria_id = instance.criteria_id
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    score = getattr(instance, "_counted_score", None) or instance.score
+    criteria_id = getattr(instance, "_counted_criteria_id", None) or instance.criteria_id
+    batch = current_batch()
+    if batch is not None:
+        batch.add(instance.project_id)
+        return
+    if is_async():
+        schedule_stats(instance.project_id)
+        return
+    ProjectCriteriaScore.apply_delta(instance.project_id, criteria_id, removed=score)
+    Project.apply_rating_delta(instance.project_id, -score, -1)
+
+
+@receiver([post_save, post_delete], sender=Criteria)
+def criteria_changed(sender, instance, **kwargs):
+    invalidate_criteria()
+    # Weights feed every weighted score in the category
+    Project.refresh_weighted_scores(Project.objects.filter(category=instance.project_category))
+
+
+# Response cache invalidation; counter updates bump the stats generations in Project.apply_*_delta
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, instance, update_fields=None, **kwargs):
+    # Saves of the stats columns alone (recalculate_stats) bump the stats generations instead
+    if update_fields is None or not set(update_fields) <= set(Project.STATS_FIELDS):
+        invalidate_project(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=ProjectImage)
+def image_uploaded(sender, instance, **kwargs):
+    # A new or replaced upload; caption and order edits leave the derivatives alone
+    if instance.image and not is_current(instance):
+        schedule_derivatives(instance)
+
+
+@receiver(post_delete, sender=ProjectImage)
+def image_deleted(sender, instance, **kwargs):
+    storage, names = instance.image.storage, derivative_files(instance.derivatives)
+    if names:
+        transaction.on_commit(lambda: delete_files(storage, names))
+
+
+@receiver([post_save, post_delete], sender=ProjectImage)
+def project_content_changed(sender, instance, **kwargs):
+    invalidate_project(instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_comments(instance.project_id)
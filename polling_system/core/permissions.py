@@ -6,7 +6,8 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.creator == request.user
+        # Images belong to whoever owns their project
+        return getattr(obj, "project", obj).creator == request.user
 
 
 class IsAuthenticatedAndOwner(permissions.BasePermission):
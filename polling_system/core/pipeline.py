@@ -0,0 +1,138 @@
+# core/pipeline.py
+"""
+Deferred stats pipeline.
+
+With ``STATS_PIPELINE["ASYNC"]`` on, rating writes no longer update project
+stats inside the request. They record a stats event for the project, and
+the first event in a window enqueues one ``refresh_project_stats`` task,
+delayed by ``WINDOW_SECONDS``. Any further events for that project before
+the task starts are folded into it. The task rebuilds the project's stats,
+per-criteria aggregates and weighted score once for the whole burst.
+
+Vote counters stay synchronous in either mode, since the vote endpoints
+return the new count.
+
+Counters for events, coalesced events, task runs and queue lag (time from
+the first event of a window to its recalculation) are kept in the shared
+cache; see ``pipeline_metrics``.
+
+Independently of that, ``stats_batch()`` defers stats work for many rows
+at once. Inside it the Vote and Rating signals only collect the affected
+project ids. When the transaction commits, each project is recomputed
+once with ``Project.refresh_stats``, or scheduled once in async mode.
+Cascading and bulk deletes of users, projects, criteria, votes and
+ratings enter it on their own.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import invalidate_stats
+
+DEFAULTS = {"ASYNC": False, "WINDOW_SECONDS": 2}
+
+PENDING_KEY = "nexus:stats:pending:{}"
+METRIC_KEY = "nexus:stats:metrics:{}"
+COUNTERS = ("events", "coalesced", "runs")
+
+
+def pipeline_setting(name):
+    return getattr(settings, "STATS_PIPELINE", {}).get(name, DEFAULTS[name])
+
+
+def is_async():
+    return pipeline_setting("ASYNC")
+
+
+def _count(name, amount=1):
+    key = METRIC_KEY.format(name)
+    if not cache.add(key, amount, timeout=None):
+        cache.incr(key, amount)
+
+
+def schedule_stats(project_id):
+    """Record a stats event for a project; enqueue its recalculation unless one is pending."""
+    from .tasks import refresh_project_stats
+
+    window = pipeline_setting("WINDOW_SECONDS")
+    _count("events")
+    # The counters change later, but has_rated already has
+    invalidate_stats(project_id)
+    first_event = time.time()
+
+    def enqueue():
+        # Taken once the event is committed, so a rolled back write leaves no
+        # marker behind. It outlives the window generously so a slow queue
+        # can't cause a second task; the task removes it before recalculating.
+        if cache.add(PENDING_KEY.format(project_id), first_event, timeout=max(window * 30, 60)):
+            refresh_project_stats.apply_async((project_id,), countdown=window)
+        else:
+            _count("coalesced")
+
+    transaction.on_commit(enqueue)
+
+
+_batch = ContextVar("nexus_stats_batch", default=None)
+
+
+def current_batch():
+    """The set collecting project ids inside ``stats_batch()``, ``None`` outside one."""
+    return _batch.get()
+
+
+def _refresh_batch(project_ids):
+    from .models import Project
+
+    if is_async():
+        for project_id in sorted(project_ids):
+            schedule_stats(project_id)
+    else:
+        Project.refresh_stats(project_ids)
+
+
+@contextmanager
+def stats_batch():
+    """
+    Collect stats changes instead of applying them row by row, and
+    recompute the affected projects once the transaction commits. Nested
+    scopes join the outermost one.
+    """
+    if _batch.get() is not None:
+        yield _batch.get()
+        return
+    project_ids = set()
+    token = _batch.set(project_ids)
+    try:
+        yield project_ids
+    finally:
+        _batch.reset(token)
+    if project_ids:
+        transaction.on_commit(lambda: _refresh_batch(project_ids))
+
+
+def claim(project_id):
+    """Take the pending marker; returns the time of the first coalesced event, if any."""
+    key = PENDING_KEY.format(project_id)
+    first_event = cache.get(key)
+    cache.delete(key)
+    return first_event
+
+
+def record_run(first_event):
+    _count("runs")
+    if first_event is None:
+        return
+    lag = time.time() - first_event
+    cache.set(METRIC_KEY.format("lag_last"), lag, timeout=None)
+    if lag > (cache.get(METRIC_KEY.format("lag_max")) or 0):
+        cache.set(METRIC_KEY.format("lag_max"), lag, timeout=None)
+
+
+def pipeline_metrics():
+    names = [*COUNTERS, "lag_last", "lag_max"]
+    found = cache.get_many([METRIC_KEY.format(name) for name in names])
+    return {name: found.get(METRIC_KEY.format(name), 0) for name in names}
@@ -0,0 +1,79 @@
+# core/registry.py
+"""
+In-process criteria registry.
+
+Criteria change a handful of times per event, but were queried on every
+detail view, rating validation and criteria listing. Each process keeps
+them in memory, grouped by project category, and reloads them only when
+the shared ``criteria`` generation (see ``core.cache``) moves, which
+happens on every Criteria write in any worker.
+"""
+import threading
+from collections import defaultdict
+
+from .cache import agenerations, generations
+from .models import Criteria
+
+
+class CriteriaRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._all = []
+        self._by_id = {}
+        self._by_category = {}
+
+    def _load(self):
+        version = generations("criteria")[0]
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._store(version, list(Criteria.objects.all()))
+
+    async def _aload(self):
+        version = (await agenerations("criteria"))[0]
+        if version == self._version:
+            return
+        # Fetched outside the lock, which must not be held across an await
+        criteria = [item async for item in Criteria.objects.all()]
+        with self._lock:
+            if version != self._version:
+                self._store(version, criteria)
+
+    def _store(self, version, criteria):
+        by_category = defaultdict(list)
+        for item in criteria:
+            by_category[item.project_category].append(item)
+        self._all, self._by_category = criteria, dict(by_category)
+        self._by_id = {item.pk: item for item in criteria}
+        self._version = version
+
+    def all(self):
+        self._load()
+        return self._all
+
+    def for_category(self, category):
+        """Criteria of a project category, in display order. Treat them as read-only."""
+        self._load()
+        return self._by_category.get(category, [])
+
+    def get(self, pk):
+        self._load()
+        return self._by_id.get(pk)
+
+    async def aall(self):
+        await self._aload()
+        return self._all
+
+    async def afor_category(self, category):
+        await self._aload()
+        return self._by_category.get(category, [])
+
+    async def aget(self, pk):
+        await self._aload()
+        return self._by_id.get(pk)
+
+
+criteria_registry = CriteriaRegistry()
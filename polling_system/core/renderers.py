@@ -0,0 +1,58 @@
+# core/renderers.py
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional; JSONRenderer's stdlib encoder is used instead
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson, several times faster on list
+    pages. For the payloads this API sends, the output is the same bytes
+    JSONRenderer produces in its default compact, unicode mode. Datetimes
+    and any type orjson doesn't know go through DRF's encoder. Indented
+    output (the browsable API, or ``; indent=`` in Accept) and anything
+    orjson can't encode, such as non-string keys, fall back to
+    JSONRenderer, as does a missing orjson.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encoders.JSONEncoder().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer too, so the payload is safe inside <script>
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class ExportRenderer(JSONRenderer):
+    """
+    Content negotiation target for ExportViewSet (``?format=`` or Accept).
+    Exports are streamed by the view itself; this only renders error
+    payloads, as JSON, for a request that asked for the export format.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, None, renderer_context)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class ParquetRenderer(ExportRenderer):
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
@@ -0,0 +1,125 @@
+# core/search.py
+"""
+Full-text project search, ``?q=`` on the project list.
+
+* Postgres: ``Project.search_vector`` (name weighted A, description B)
+  under a GIN index, filled in by triggers on every insert and on updates
+  of name or description (migration 0009), bulk writes included; relevance
+  is ``ts_rank_cd``. The triggers index in ``CONFIG`` as it was when they
+  were installed; after changing it, run ``manage.py reindex_search``.
+* SQLite: the FTS5 table ``core_project_fts`` (migration 0006, read
+  through ``ProjectSearchIndex``), an external-content index over
+  ``core_project`` kept in sync by triggers; relevance is ``bm25`` with
+  name hits weighted above description hits.
+* Anything else: ``icontains`` on name/description with flat relevance.
+
+Relevance is blended with the project's standing so that, among similar
+matches, well rated and much voted projects come first::
+
+    search_score = relevance * (1 + SCORE_WEIGHT * average_score / 10
+                                  + VOTE_WEIGHT * ln(1 + vote_count))
+
+Results are ordered by ``-search_score`` unless ``ordering`` is given and
+page through KeysetCursorPagination like the plain list.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce, Ln
+from rest_framework.filters import BaseFilterBackend
+
+DEFAULTS = {"CONFIG": "english", "SCORE_WEIGHT": 0.5, "VOTE_WEIGHT": 0.1}
+
+
+def search_setting(name):
+    return getattr(settings, "PROJECT_SEARCH", {}).get(name, DEFAULTS[name])
+
+
+def search_vector():
+    """The document indexed for a project, as stored in ``Project.search_vector``."""
+    config = search_setting("CONFIG")
+    return SearchVector("name", weight="A", config=config) + SearchVector("description", weight="B", config=config)
+
+
+def _document_sql(row):
+    """``search_vector()`` as Postgres SQL over the columns of ``row``, in the current ``CONFIG``."""
+    config = search_setting("CONFIG")
+    # Spliced into SQL that can't take parameters (a function body)
+    if not re.fullmatch(r"\w+(\.\w+)?", config):
+        raise ValueError(f"Invalid text search configuration {config!r}")
+    return (
+        f"setweight(to_tsvector('{config}'::regconfig, COALESCE({row}.name, '')), 'A') "
+        f"|| setweight(to_tsvector('{config}'::regconfig, COALESCE({row}.description, '')), 'B')"
+    )
+
+
+def search_function_sql():
+    """
+    ``CREATE OR REPLACE`` of the Postgres function behind the
+    ``search_vector`` triggers (migration 0009), indexing in the current
+    ``CONFIG``.
+    """
+    return (
+        "CREATE OR REPLACE FUNCTION core_project_search_vector() RETURNS trigger AS $$ BEGIN "
+        f"NEW.search_vector := {_document_sql('NEW')}; RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+
+
+def search_backfill_sql():
+    """An UPDATE recomputing every stored ``search_vector`` in the current ``CONFIG``."""
+    return f"UPDATE core_project SET search_vector = {_document_sql('core_project')}"
+
+
+def fts_query(text):
+    """
+    An FTS5 MATCH expression for free text: every word must match, the last
+    one as a prefix (search-as-you-type). ``None`` if there are no words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _relevance(queryset, text):
+    """``queryset`` narrowed to matches of ``text``, annotated with ``relevance``."""
+    if connection.vendor == "postgresql":
+        query = SearchQuery(text, search_type="websearch", config=search_setting("CONFIG"))
+        return queryset.filter(search_vector=query).annotate(
+            relevance=SearchRank(F("search_vector"), query, cover_density=True)
+        )
+    if connection.vendor == "sqlite":
+        match = fts_query(text)
+        if match is None:
+            return queryset.annotate(relevance=Value(0.0, output_field=FloatField())).none()
+        # Joined, so bm25 is computed once per match during the index scan
+        return queryset.filter(search_index__document=match).annotate(relevance=-F("search_index__rank"))
+    return queryset.filter(Q(name__icontains=text) | Q(description__icontains=text)).annotate(
+        relevance=Value(1.0, output_field=FloatField())
+    )
+
+
+def search(queryset, text):
+    """Projects matching ``text``, annotated with ``search_score``."""
+    standing = (
+        Value(1.0)
+        + Value(search_setting("SCORE_WEIGHT") / 10) * Coalesce(F("average_score"), Value(0.0))
+        + Value(search_setting("VOTE_WEIGHT")) * Ln(Cast(F("vote_count"), FloatField()) + Value(1.0))
+    )
+    return _relevance(queryset, text).annotate(search_score=F("relevance") * standing)
+
+
+class ProjectSearchFilter(BaseFilterBackend):
+    """``?q=`` full-text search. List it before OrderingFilter."""
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        return search(queryset, text)
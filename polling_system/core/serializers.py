@@ -1,25 +1,107 @@
 # core/serializers.py
 from rest_framework import serializers
-from .models import Project, ProjectImage, Criteria, Vote, Rating, Comment
+from rest_framework.reverse import reverse
+from .models import Project, ProjectImage, Criteria, Vote, Rating, Comment, ProjectCriteriaScore
+from .images import image_setting
+from .instrumentation import TimedRepresentationMixin, timed_serialization
+from .pagination import KeysetCursorPagination
+from .registry import criteria_registry
+from .threads import attach_thread, load_threads
 
 
-class ProjectImageSerializer(serializers.ModelSerializer):
+def _media_url(name, request):
+    if not name:
+        return None
+    url = ProjectImage.image.field.storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _derivative(entry, request):
+    return {
+        "url": _media_url(entry.get("jpeg") or entry.get("webp"), request),
+        "webp": _media_url(entry.get("webp"), request),
+        "width": entry["width"],
+        "height": entry["height"],
+    }
+
+
+def thumbnail_payload(image_name, width, height, derivatives, request=None):
+    """The ``thumbnail`` of an image, from its stored columns."""
+    thumbnail = derivatives.get("thumbnail")
+    if thumbnail is None:
+        # Not processed yet: the upload itself, until the task has run
+        return {"url": _media_url(image_name, request), "webp": None, "width": width, "height": height}
+    return _derivative(thumbnail, request)
+
+
+class ProjectImageThumbnailSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """What list cards need: the thumbnail and its size, not the upload."""
+    thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = ProjectImage
-        fields = ["id", "image", "caption", "order"]
+        fields = ["id", "caption", "order", "thumbnail"]
+
+    def get_thumbnail(self, obj):
+        return thumbnail_payload(obj.image.name, obj.width, obj.height, obj.derivatives, self.context.get("request"))
 
 
-class CriteriaSerializer(serializers.ModelSerializer):
+class ProjectImageSerializer(ProjectImageThumbnailSerializer):
+    variants = serializers.SerializerMethodField()
+
+    class Meta(ProjectImageThumbnailSerializer.Meta):
+        fields = ["id", "image", "caption", "order", "width", "height", "thumbnail", "variants"]
+        read_only_fields = ["width", "height"]
+
+    def validate_image(self, value):
+        limit = image_setting("MAX_UPLOAD_BYTES")
+        if value.size > limit:
+            raise serializers.ValidationError(f"Images may be at most {limit // (1024 * 1024)} MB.")
+        return value
+
+    def get_variants(self, obj):
+        """Width variants, narrowest first, for srcset; empty until processed."""
+        request = self.context.get("request")
+        return [_derivative(entry, request) for entry in obj.derivatives.get("variants", ())]
+
+
+class CriteriaSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Criteria
         fields = ["id", "name", "description", "weight"]
 
 
-class RatingSerializer(serializers.ModelSerializer):
+class CriteriaScoreSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     criteria = CriteriaSerializer(read_only=True)
-    criteria_id = serializers.PrimaryKeyRelatedField(
-        queryset=Criteria.objects.all(), source="criteria", write_only=True
-    )
+    mean = serializers.FloatField(read_only=True)
+    histogram = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = ProjectCriteriaScore
+        fields = ["criteria", "rating_count", "score_sum", "mean", "histogram"]
+
+
+class CriteriaRegistryField(serializers.PrimaryKeyRelatedField):
+    """Resolves criteria ids through the in-process registry instead of a query."""
+
+    def get_queryset(self):
+        return Criteria.objects.all()
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            criteria = criteria_registry.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if criteria is None:
+            self.fail("does_not_exist", pk_value=data)
+        return criteria
+
+
+class RatingSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    criteria = CriteriaSerializer(read_only=True)
+    criteria_id = CriteriaRegistryField(source="criteria", write_only=True)
 
     class Meta:
         model = Rating
@@ -36,58 +118,243 @@ class RatingSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class ScoreEntrySerializer(TimedRepresentationMixin, serializers.Serializer):
+    criteria_id = serializers.IntegerField()
+    score = serializers.IntegerField(min_value=1, max_value=10)
+
+
+class ScorecardSerializer(TimedRepresentationMixin, serializers.Serializer):
+    """A judge's full set of criteria scores for one project."""
+    scores = ScoreEntrySerializer(many=True, allow_empty=False)
+
+    def validate_scores(self, entries):
+        project = self.context["project"]
+        scores = {entry["criteria_id"]: entry["score"] for entry in entries}
+        if len(scores) != len(entries):
+            raise serializers.ValidationError("Each criteria can only be scored once")
+        valid = {criteria.pk for criteria in criteria_registry.for_category(project.category)}
+        invalid = sorted(set(scores) - valid)
+        if invalid:
+            raise serializers.ValidationError(
+                f"Criteria {invalid} do not apply to {project.get_category_display()} projects"
+            )
+        return scores
+
+
+class CommentSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """
+    Renders the reply tree prepared by ``core.threads``. ``reply_count`` is
+    the total number of direct replies; when fewer are included, the rest
+    are fetched from the comment's ``replies`` action with ``replies_cursor``.
+    """
     replies = serializers.SerializerMethodField()
+    reply_count = serializers.SerializerMethodField()
+    replies_cursor = serializers.SerializerMethodField()
     user = serializers.StringRelatedField(read_only=True)
 
     class Meta:
         model = Comment
-        fields = ["id", "user", "content", "created_at", "updated_at", "parent", "replies"]
+        fields = ["id", "user", "content", "created_at", "updated_at", "parent",
+                  "replies", "reply_count", "replies_cursor"]
         read_only_fields = ["user", "created_at", "updated_at"]
 
+    def validate_parent(self, parent):
+        # A comment's thread is fixed when it is created; moving it would
+        # leave its subtree filed under the old root
+        if self.instance is not None and parent != self.instance.parent:
+            raise serializers.ValidationError("A comment can't be moved to another parent")
+        view = self.context.get("view")
+        if parent is not None and view is not None and str(parent.project_id) != str(view.kwargs.get("project_pk")):
+            raise serializers.ValidationError("The parent comment belongs to another project")
+        return parent
+
+    def _thread(self, obj):
+        if not hasattr(obj, "thread_replies"):
+            attach_thread(obj)
+        return obj
+
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.all(), many=True, context=self.context).data
-        return []
+        return CommentSerializer(self._thread(obj).thread_replies, many=True, context=self.context).data
+
+    def get_reply_count(self, obj):
+        return self._thread(obj).reply_count
 
+    def get_replies_cursor(self, obj):
+        return self._thread(obj).replies_cursor
 
-class ProjectListSerializer(serializers.ModelSerializer):
+
+class LeaderboardEntrySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    rank = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Project
+        fields = ["rank", "id", "name", "category", "weighted_score", "average_score", "rating_count", "vote_count"]
+
+
+class ProjectListSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     creator = serializers.StringRelatedField()
     category_display = serializers.CharField(source="get_category_display", read_only=True)
     has_voted = serializers.SerializerMethodField()
     has_rated = serializers.SerializerMethodField()
-    images = ProjectImageSerializer(many=True, read_only=True)
+    images = ProjectImageThumbnailSerializer(many=True, read_only=True)
 
     class Meta:
         model = Project
         fields = [
             "id", "name", "description", "category", "category_display",
             "creator", "status", "is_featured", "created_at",
-            "vote_count", "average_score", "rating_count",
+            "vote_count", "average_score", "rating_count", "weighted_score",
             "has_voted", "has_rated", "images"
         ]
 
+    # Shared (cached) payloads leave the per-user flags False; ProjectViewSet
+    # overlays them for the whole page in two queries. The lookups below
+    # only serve single-object responses such as create/update.
     def get_has_voted(self, obj):
         user = self.context["request"].user
-        if user.is_authenticated:
-            return obj.votes.filter(user=user).exists()
-        return False
+        if self.context.get("shared_payload") or not user.is_authenticated:
+            return False
+        return obj.votes.filter(user=user).exists()
 
     def get_has_rated(self, obj):
         user = self.context["request"].user
-        if user.is_authenticated:
-            return obj.ratings.filter(user=user).exists()
-        return False
+        if self.context.get("shared_payload") or not user.is_authenticated:
+            return False
+        return obj.ratings.filter(user=user).exists()
+
+
+class ProjectListReader:
+    """
+    Read path of ``ProjectListSerializer`` for list pages: the same payload,
+    built from ``.values()`` rows plus one query for the images of the
+    whole page. ModelSerializer runs field lookup, ``get_attribute`` and
+    ``to_representation`` per field and item; here an item is a dict built
+    in one pass. Writes and the OpenAPI schema keep using the serializer,
+    and ``core.tests`` checks that both produce the same output.
+    """
+    # StringRelatedField renders str(User), which is the email
+    columns = [
+        "id", "name", "description", "category", "creator__email", "status", "is_featured", "created_at",
+        "vote_count", "average_score", "rating_count", "weighted_score",
+    ]
+    image_columns = ["id", "project_id", "caption", "order", "image", "width", "height", "derivatives"]
+
+    def __init__(self, context):
+        self.context = context
+        self.categories = dict(Project.CATEGORY_CHOICES)
+        # DRF's own field, for its timezone handling and date format
+        self.datetime = serializers.DateTimeField()
+
+    @classmethod
+    def values(cls, queryset):
+        """``queryset`` as rows; annotations stay, since the pagination may order by them."""
+        return queryset.values(*cls.columns, *queryset.query.annotations)
+
+    def image_rows(self, rows):
+        return (
+            ProjectImage.objects.filter(project_id__in=[row["id"] for row in rows])
+            .order_by("order", "pk").values_list(*self.image_columns)
+        )
+
+    def group_images(self, rows, image_rows):
+        request = self.context.get("request")
+        images = {row["id"]: [] for row in rows}
+        for pk, project_id, caption, order, name, width, height, derivatives in image_rows:
+            images[project_id].append({
+                "id": pk, "caption": caption, "order": order,
+                "thumbnail": thumbnail_payload(name, width, height, derivatives, request),
+            })
+        return images
+
+    def _user_flags(self, rows):
+        user = self.context["request"].user
+        if self.context.get("shared_payload") or not user.is_authenticated or not rows:
+            return set(), set()
+        ids = [row["id"] for row in rows]
+        return (
+            set(Vote.objects.filter(user=user, project_id__in=ids).values_list("project_id", flat=True)),
+            set(Rating.objects.filter(user=user, project_id__in=ids).values_list("project_id", flat=True)),
+        )
+
+    def represent(self, rows, images):
+        voted, rated = self._user_flags(rows)
+        categories, datetime = self.categories, self.datetime
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "description": row["description"],
+                "category": row["category"],
+                "category_display": categories.get(row["category"], row["category"]),
+                "creator": row["creator__email"],
+                "status": row["status"],
+                "is_featured": row["is_featured"],
+                "created_at": datetime.to_representation(row["created_at"]),
+                "vote_count": row["vote_count"],
+                "average_score": None if row["average_score"] is None else float(row["average_score"]),
+                "rating_count": row["rating_count"],
+                "weighted_score": float(row["weighted_score"]),
+                "has_voted": row["id"] in voted,
+                "has_rated": row["id"] in rated,
+                "images": images[row["id"]],
+            }
+            for row in rows
+        ]
+
+    def data(self, rows):
+        """The page's items; ``rows`` come from ``values()``."""
+        with timed_serialization():
+            image_rows = self.image_rows(rows) if rows else ()
+            return self.represent(rows, self.group_images(rows, image_rows))
+
+    async def adata(self, rows):
+        """``data`` for async views; list payloads are shared, so only the images are fetched."""
+        image_rows = [image async for image in self.image_rows(rows)] if rows else ()
+        with timed_serialization():
+            return self.represent(rows, self.group_images(rows, image_rows))
 
 
 class ProjectDetailSerializer(ProjectListSerializer):
-    ratings = RatingSerializer(many=True, read_only=True)
+    images = ProjectImageSerializer(many=True, read_only=True)
+    # O(criteria) per-criteria breakdown in place of the full ratings list
+    score_breakdown = serializers.SerializerMethodField()
     criteria = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
 
     class Meta(ProjectListSerializer.Meta):
-        fields = ProjectListSerializer.Meta.fields + ["ratings", "criteria", "comments"]
+        fields = ProjectListSerializer.Meta.fields + ["score_breakdown", "criteria", "comments", "comments_next"]
+
+    def _category_criteria(self, obj):
+        return criteria_registry.for_category(obj.category)
+
+    def get_score_breakdown(self, obj):
+        scores = {score.criteria_id: score for score in obj.criteria_scores.all()}
+        breakdown = []
+        for criteria in self._category_criteria(obj):
+            # Criteria nobody has rated yet show up with zero counts
+            score = scores.get(criteria.pk) or ProjectCriteriaScore(project=obj)
+            score.criteria = criteria
+            breakdown.append(score)
+        return CriteriaScoreSerializer(breakdown, many=True).data
 
     def get_criteria(self, obj):
-        criteria = Criteria.objects.filter(project_category=obj.category)
-        return CriteriaSerializer(criteria, many=True).data
\ No newline at end of file
+        return CriteriaSerializer(self._category_criteria(obj), many=True).data
+
+    def _comment_page(self, obj):
+        # Async views load it up front (threads.aload_threads)
+        if not hasattr(obj, "comment_page"):
+            obj.comment_page = load_threads(obj.pk, limit=KeysetCursorPagination.page_size)
+        return obj.comment_page
+
+    def get_comments(self, obj):
+        threads, _ = self._comment_page(obj)
+        return CommentSerializer(threads, many=True, context=self.context).data
+
+    def get_comments_next(self, obj) -> str | None:
+        # The comments endpoint's page after the threads shown here
+        threads, more = self._comment_page(obj)
+        if not more:
+            return None
+        url = reverse("project-comments-list", kwargs={"project_pk": obj.pk}, request=self.context.get("request"))
+        return KeysetCursorPagination().link_after(url, threads[-1])
\ No newline at end of file
@@ -0,0 +1,30 @@
+# core/tasks.py
+from celery import shared_task
+
+from .models import Project
+from . import images, vote_buffer
+from .pipeline import claim, record_run
+
+
+@shared_task(ignore_result=True)
+def refresh_project_stats(project_id):
+    """Recalculate one project's stats for every event coalesced since it was scheduled."""
+    # Claim before recalculating: events arriving from here on schedule a new run
+    first_event = claim(project_id)
+    project = Project.objects.filter(pk=project_id).first()
+    if project is not None:
+        project.recalculate_stats()
+    record_run(first_event)
+
+
+@shared_task(ignore_result=True)
+def flush_vote_buffer():
+    """Move buffered vote_count deltas into the Project rows (run by Celery beat)."""
+    if vote_buffer.is_enabled():
+        vote_buffer.flush()
+
+
+@shared_task(ignore_result=True)
+def generate_image_derivatives(image_id):
+    """Write the thumbnail and width variants of an uploaded ProjectImage."""
+    images.generate(image_id)
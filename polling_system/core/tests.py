@@ -1,3 +1,1619 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import json
+import pickle
+import shutil
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from io import StringIO
+from statistics import median
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient
+from PIL import Image
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from polling_system.celery import app as celery_app
+
+from .cache import expire_lagged, response_cache_stats_lag, user_key
+from .models import User, Project, ProjectImage, Criteria, Vote, Rating, Comment, ProjectCriteriaScore
+from .pipeline import PENDING_KEY, pipeline_metrics, stats_batch
+from .registry import criteria_registry
+from .search import search_backfill_sql, search_function_sql
+from .renderers import ORJSONRenderer
+from .serializers import ProjectListReader, ProjectListSerializer
+from .tasks import refresh_project_stats
+from .viewsets import ProjectViewSet
+from . import authentication, benchmarks, events, instrumentation, vote_buffer
+
+
+# A cache all processes share, for code that refuses a per-process one
+SHARED_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="nexus-cache-"),
+    }
+}
+
+
+class NexusTestCase(TestCase):
+    """Shared fixtures: a couple of users, a published project and its criteria."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pw")
+        cls.judge = User.objects.create_user(username="judge", email="judge@example.com", password="pw")
+        cls.project = Project.objects.create(name="Nexus", creator=cls.owner, category="poll", status="published")
+        cls.design = Criteria.objects.create(project_category="poll", name="Design", weight=2, order=0)
+        cls.code = Criteria.objects.create(project_category="poll", name="Code Quality", weight=1, order=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def stats(self, project=None):
+        project = project or self.project
+        return Project.objects.values("vote_count", "rating_count", "rating_sum", "average_score").get(pk=project.pk)
+
+
+class IncrementalStatsTests(NexusTestCase):
+    def test_votes_adjust_counter(self):
+        vote = Vote.objects.create(user=self.judge, project=self.project)
+        Vote.objects.create(user=self.owner, project=self.project)
+        self.assertEqual(self.stats()["vote_count"], 2)
+        vote.delete()
+        self.assertEqual(self.stats()["vote_count"], 1)
+
+    def test_rating_create_update_delete(self):
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=8)
+        Rating.objects.create(user=self.owner, project=self.project, criteria=self.design, score=5)
+        self.assertEqual(self.stats(), {"vote_count": 0, "rating_count": 2, "rating_sum": 13, "average_score": 6.5})
+
+        rating = Rating.objects.get(user=self.judge)
+        rating.score = 10
+        rating.save()
+        self.assertEqual(self.stats()["rating_sum"], 15)
+        self.assertEqual(self.stats()["average_score"], 7.5)
+
+        rating.delete()
+        Rating.objects.get(user=self.owner).delete()
+        self.assertEqual(self.stats(), {"vote_count": 0, "rating_count": 0, "rating_sum": 0, "average_score": 0})
+
+    def test_edits_from_the_same_loaded_score(self):
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=4)
+        # Two requests loaded the rating before either saved
+        first, second = Rating.objects.get(user=self.judge), Rating.objects.get(user=self.judge)
+        first.score = 6
+        first.save()
+        second.score = 9
+        second.save()
+        self.assertEqual(self.stats(), {"vote_count": 0, "rating_count": 1, "rating_sum": 9, "average_score": 9.0})
+        self.assertEqual(ProjectCriteriaScore.objects.get(project=self.project).histogram, [0] * 8 + [1, 0])
+
+    def test_rating_write_does_not_aggregate(self):
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=4)
+        # INSERT, UPDATE of the per-criteria aggregate, UPDATE of the project row
+        with self.assertNumQueries(3):
+            Rating.objects.create(user=self.owner, project=self.project, criteria=self.design, score=6)
+
+    def test_project_save_keeps_counters(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        Vote.objects.create(user=self.judge, project=self.project)
+        stale.name = "Renamed"
+        stale.save()
+        self.assertEqual(self.stats()["vote_count"], 1)
+
+    def test_reconcile_stats_repairs_drift(self):
+        Vote.objects.create(user=self.judge, project=self.project)
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.code, score=9)
+        Project.objects.filter(pk=self.project.pk).update(vote_count=7, rating_sum=0, average_score=1)
+        call_command("reconcile_stats", stdout=StringIO())
+        self.assertEqual(self.stats(), {"vote_count": 1, "rating_count": 1, "rating_sum": 9, "average_score": 9})
+
+    def test_reconcile_stats_finds_the_same_drift_in_both_modes(self):
+        other = Project.objects.create(name="Other", creator=self.owner, category="poll", status="published")
+        for project in (self.project, other):
+            Rating.objects.create(user=self.judge, project=project, criteria=self.code, score=6)
+        untouched = ProjectCriteriaScore.objects.get(project=other)
+        # Only aggregates and the weighted score drift; the counters are right
+        ProjectCriteriaScore.objects.filter(project=self.project).update(score_6=0, score_5=1)
+        Project.objects.filter(pk=self.project.pk).update(weighted_score=1.5)
+
+        out = StringIO()
+        call_command("reconcile_stats", "--dry-run", stdout=out)
+        self.assertIn("Would reconcile 1 of 2 projects (0 counters, 1 criteria aggregates, 1 weighted scores)",
+                      out.getvalue())
+        self.assertEqual(Project.objects.get(pk=self.project.pk).weighted_score, 1.5)
+
+        call_command("reconcile_stats", stdout=out)
+        self.assertIn("Reconciled 1 of 2 projects", out.getvalue())
+        self.assertEqual(ProjectCriteriaScore.objects.get(project=self.project).histogram[4:6], [0, 1])
+        self.assertEqual(Project.objects.get(pk=self.project.pk).weighted_score, 6.0)
+        # Projects that didn't drift are left alone
+        self.assertTrue(ProjectCriteriaScore.objects.filter(pk=untouched.pk).exists())
+
+        out = StringIO()
+        call_command("reconcile_stats", "--dry-run", stdout=out)
+        self.assertIn("Would reconcile 0 of 2", out.getvalue())
+
+
+class VoteEndpointTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.judge)
+        self.url = f"/api/projects/{self.project.pk}/"
+
+    def test_vote_and_unvote_return_count(self):
+        response = self.client.post(self.url + "vote/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["vote_count"], 1)
+
+        response = self.client.post(self.url + "vote/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stats()["vote_count"], 1)
+
+        response = self.client.delete(self.url + "unvote/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["vote_count"], 0)
+        self.assertFalse(Vote.objects.exists())
+
+        response = self.client.delete(self.url + "unvote/")
+        self.assertEqual(response.status_code, 400)
+
+    def test_vote_query_budget(self):
+        # project lookup, savepoint, INSERT ... ON CONFLICT, UPDATE ... RETURNING, release
+        with self.assertNumQueries(5):
+            self.client.post(self.url + "vote/")
+        with self.assertNumQueries(5):
+            self.client.delete(self.url + "unvote/")
+
+
+class ProjectListQueryTests(NexusTestCase):
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/projects/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_user_flags_do_not_scale_with_page(self):
+        self.client.force_authenticate(self.judge)
+        _, baseline = self.list_queries()
+
+        for i in range(5):
+            project = Project.objects.create(name=f"P{i}", creator=self.owner, status="published")
+            Vote.objects.create(user=self.judge, project=project)
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=7)
+
+        response, queries = self.list_queries()
+        self.assertEqual(queries, baseline)
+        flags = {p["name"]: (p["has_voted"], p["has_rated"]) for p in response.data["results"]}
+        self.assertEqual(flags["Nexus"], (False, True))
+        self.assertEqual(flags["P0"], (True, False))
+
+    def test_anonymous_flags_are_false(self):
+        response, _ = self.list_queries()
+        [project] = response.data["results"]
+        self.assertFalse(project["has_voted"])
+        self.assertFalse(project["has_rated"])
+
+
+class ListScalingBenchmark(NexusTestCase):
+    """List latency and memory must track page size, not vote volume."""
+
+    PROJECTS = 10
+    VOTERS = 400
+
+    def measure(self, runs=5):
+        timings, peaks = [], []
+        for _ in range(runs):
+            cache.clear()
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = self.client.get("/api/projects/")
+            timings.append(time.perf_counter() - started)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(response.status_code, 200)
+        return median(timings), median(peaks)
+
+    def test_list_flat_as_votes_grow(self):
+        projects = Project.objects.bulk_create(
+            Project(name=f"Hot {i}", creator=self.owner, status="published") for i in range(self.PROJECTS)
+        )
+        self.client.force_authenticate(self.judge)
+        cold_time, cold_memory = self.measure()
+
+        voters = User.objects.bulk_create(
+            User(username=f"voter{i}", email=f"voter{i}@example.com") for i in range(self.VOTERS)
+        )
+        Vote.objects.bulk_create(Vote(user=u, project=p) for u in voters for p in projects)
+        Project.objects.update(vote_count=self.VOTERS)
+
+        hot_time, hot_memory = self.measure()
+        # 4000 votes on the page; prefetching them would blow both of these up
+        self.assertLess(hot_memory, cold_memory * 1.5)
+        self.assertLess(hot_time, cold_time * 3 + 0.05)
+
+
+@override_settings(COMMENT_THREADS={"MAX_DEPTH": 2, "REPLY_LIMIT": 3})
+class CommentThreadTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        def comment(parent=None):
+            return Comment.objects.create(user=self.judge, project=self.project, parent=parent, content="...")
+
+        self.root = comment()
+        self.replies = [comment(self.root) for _ in range(5)]
+        # depth 2 under the newest reply, depth 3 below that
+        self.deep = comment(comment(self.replies[-1]))
+        self.url = f"/api/projects/{self.project.pk}/comments/"
+
+    def test_thread_page_loads_in_two_queries(self):
+        # page of roots + their threads
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        [root] = response.data["results"]
+        self.assertEqual(root["reply_count"], 5)
+        self.assertEqual(len(root["replies"]), 3)
+        self.assertIsNotNone(root["replies_cursor"])
+
+        # MAX_DEPTH cuts the tree below depth 2 but still reports the count
+        newest = root["replies"][0]
+        self.assertEqual(newest["id"], self.replies[-1].pk)
+        child = newest["replies"][0]
+        self.assertEqual(child["replies"], [])
+        self.assertEqual(child["reply_count"], 1)
+
+    def test_load_more_replies(self):
+        root = self.client.get(self.url).data["results"][0]
+        response = self.client.get(f"{self.url}{self.root.pk}/replies/", {"cursor": root["replies_cursor"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["id"] for c in response.data["results"]], [self.replies[1].pk, self.replies[0].pk])
+        self.assertIsNone(response.data["next_cursor"])
+
+        response = self.client.get(f"{self.url}{self.root.pk}/replies/", {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_replies_load_only_their_thread(self):
+        other = Comment.objects.create(user=self.judge, project=self.project, content="...")
+        Comment.objects.create(user=self.judge, project=self.project, parent=other, content="...")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"{self.url}{self.root.pk}/replies/")
+        self.assertEqual(len(response.data["results"]), 3)
+        # the comment, then its thread
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIn('"thread_id" =', ctx.captured_queries[-1]["sql"])
+
+    def test_project_detail_renders_root_threads(self):
+        response = self.client.get(f"/api/projects/{self.project.pk}/")
+        self.assertEqual([c["id"] for c in response.data["comments"]], [self.root.pk])
+        self.assertIsNone(response.data["comments_next"])
+
+    def test_project_detail_renders_first_page_of_threads(self):
+        Comment.objects.bulk_create(
+            Comment(user=self.judge, project=self.project, content=f"{i}") for i in range(20)
+        )
+        roots = list(Comment.objects.filter(parent=None).order_by("-created_at", "-id").values_list("id", flat=True))
+        response = self.client.get(f"/api/projects/{self.project.pk}/")
+        self.assertEqual([c["id"] for c in response.data["comments"]], roots[:20])
+        rest = self.client.get(response.data["comments_next"]).data
+        self.assertEqual([c["id"] for c in rest["results"]], roots[20:])
+
+    def test_parent_is_fixed_and_from_the_same_project(self):
+        self.client.force_authenticate(self.judge)
+        other_root = Comment.objects.create(user=self.judge, project=self.project, content="...")
+        reply = self.replies[0]
+        url = f"{self.url}{reply.pk}/"
+        response = self.client.patch(url, {"parent": other_root.pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent", response.data)
+        # Editing the content alone, or resending the same parent, is fine
+        self.assertEqual(self.client.patch(url, {"content": "edited"}, format="json").status_code, 200)
+        self.assertEqual(self.client.patch(url, {"parent": self.root.pk}, format="json").status_code, 200)
+        reply.refresh_from_db()
+        self.assertEqual((reply.parent_id, reply.thread_id), (self.root.pk, self.root.pk))
+
+        elsewhere = Project.objects.create(name="Elsewhere", creator=self.owner, status="published")
+        foreign = Comment.objects.create(user=self.judge, project=elsewhere, content="...")
+        response = self.client.post(self.url, {"content": "hi", "parent": foreign.pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Comment.objects.filter(project=self.project, parent=foreign).exists())
+
+
+class KeysetPaginationTests(NexusTestCase):
+    def walk(self, url, params):
+        ids, response = [], self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            if not response.data["next"]:
+                return ids, response
+            response = self.client.get(response.data["next"])
+
+    def test_pages_are_stable_across_ties(self):
+        Project.objects.bulk_create(
+            Project(name=f"P{i}", creator=self.owner, status="published", vote_count=i % 3) for i in range(10)
+        )
+        ids, last = self.walk("/api/projects/", {"ordering": "-vote_count", "page_size": 3})
+        expected = list(
+            Project.objects.filter(status="published").order_by("-vote_count", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+        # 11 projects: the last page holds two, the one before it three
+        previous = self.client.get(last.data["previous"]).data
+        self.assertEqual([row["id"] for row in previous["results"]], expected[6:9])
+
+    def test_timestamps_within_a_millisecond(self):
+        Project.objects.bulk_create(Project(name=f"P{i}", status="published") for i in range(11))
+        base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        for i, pk in enumerate(Project.objects.order_by("id").values_list("id", flat=True)):
+            Project.objects.filter(pk=pk).update(created_at=base + datetime.timedelta(microseconds=i * 10))
+
+        for ordering in ("-created_at", "created_at"):
+            ids, last = self.walk("/api/projects/", {"ordering": ordering, "page_size": 5})
+            expected = list(Project.objects.order_by(ordering, f"{ordering[:-10]}id").values_list("id", flat=True))
+            self.assertEqual(ids, expected)
+
+            backwards, response = [], last
+            while response.data["previous"]:
+                response = self.client.get(response.data["previous"])
+                backwards = [row["id"] for row in response.data["results"]] + backwards
+            self.assertEqual(backwards, expected[:len(backwards)])
+            self.assertEqual(len(backwards) + len(last.data["results"]), len(expected))
+
+    def test_each_page_is_one_range_query(self):
+        Project.objects.bulk_create(Project(name=f"P{i}", status="published") for i in range(6))
+        first = self.client.get("/api/projects/", {"page_size": 2})
+        # page + images prefetch, the cursor becomes a WHERE clause instead of an OFFSET
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data["next"])
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertNotIn("OFFSET", ctx.captured_queries[0]["sql"])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/projects/", {"cursor": "nope"}).status_code, 404)
+        Project.objects.create(name="Other", status="published")
+        # a cursor is only valid for the ordering it was issued under
+        next_url = self.client.get("/api/projects/", {"page_size": 1}).data["next"]
+        response = self.client.get(next_url.replace("page_size=1", "ordering=vote_count&page_size=1"))
+        self.assertEqual(response.status_code, 404)
+
+
+class LeaderboardTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rival = Project.objects.create(name="Rival", creator=self.owner, category="poll", status="published")
+        # Nexus is strong on the heavier Design criterion, Rival on Code Quality
+        for project, design, code in ((self.project, 9, 3), (self.rival, 4, 10)):
+            Rating.objects.create(user=self.judge, project=project, criteria=self.design, score=design)
+            Rating.objects.create(user=self.judge, project=project, criteria=self.code, score=code)
+
+    def ranking(self, **params):
+        response = self.client.get("/api/leaderboard/", params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_weighted_scores(self):
+        self.project.refresh_from_db()
+        self.rival.refresh_from_db()
+        self.assertEqual(self.project.weighted_score, 7.0)  # (2*9 + 3) / 3
+        self.assertEqual(self.rival.weighted_score, 6.0)    # (2*4 + 10) / 3
+        # the unweighted mean would rank them the other way round
+        self.assertLess(self.project.average_score, self.rival.average_score)
+
+    def test_overall_and_category_rankings(self):
+        data = self.ranking().data
+        self.assertEqual([(e["rank"], e["name"]) for e in data["overall"]], [(1, "Nexus"), (2, "Rival")])
+        self.assertEqual(data["categories"]["movie"], [])
+
+        data = self.ranking(category="poll", limit=1).data
+        self.assertEqual([e["name"] for e in data["results"]], ["Nexus"])
+        self.assertEqual(self.client.get("/api/leaderboard/", {"category": "nope"}).status_code, 400)
+
+    def test_reweighting_reranks(self):
+        self.code.weight = 5
+        self.code.save()
+        self.assertEqual([e["name"] for e in self.ranking().data["overall"]], ["Rival", "Nexus"])
+
+    def test_zero_weight_criteria(self):
+        Criteria.objects.filter(project_category="poll").update(weight=0)
+        self.assertEqual(Project.refresh_weighted_scores(), 2)
+        self.assertEqual(set(Project.objects.values_list("weighted_score", flat=True)), {0.0})
+        out = StringIO()
+        call_command("reconcile_stats", stdout=out)
+        self.assertIn("Reconciled 0 of 2 projects", out.getvalue())
+
+    def test_rating_updates_are_incremental(self):
+        rating = Rating.objects.get(project=self.rival, criteria=self.design)
+        rating.score = 10
+        rating.save()
+        self.assertEqual(self.ranking().data["overall"][0]["name"], "Rival")
+
+    def test_reading_never_scans_ratings(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.ranking()
+        self.assertFalse(any("core_rating" in q["sql"] for q in ctx.captured_queries))
+
+
+class ScoreBreakdownTests(NexusTestCase):
+    def breakdown(self):
+        response = self.client.get(f"/api/projects/{self.project.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ratings", response.data)
+        return {row["criteria"]["name"]: row for row in response.data["score_breakdown"]}
+
+    def test_histogram_tracks_writes(self):
+        first = Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=8)
+        Rating.objects.create(user=self.owner, project=self.project, criteria=self.design, score=3)
+        rating = Rating.objects.get(pk=first.pk)
+        rating.score = 3
+        rating.save()
+
+        design = self.breakdown()["Design"]
+        self.assertEqual((design["rating_count"], design["score_sum"], design["mean"]), (2, 6, 3.0))
+        self.assertEqual(design["histogram"], [0, 0, 2, 0, 0, 0, 0, 0, 0, 0])
+
+        rating.delete()
+        self.assertEqual(self.breakdown()["Design"]["histogram"], [0, 0, 1, 0, 0, 0, 0, 0, 0, 0])
+
+    def test_unrated_criteria_are_zero(self):
+        code = self.breakdown()["Code Quality"]
+        self.assertEqual((code["rating_count"], code["mean"]), (0, 0))
+        self.assertEqual(code["histogram"], [0] * 10)
+
+    def test_payload_does_not_grow_with_ratings(self):
+        voters = User.objects.bulk_create(
+            User(username=f"j{i}", email=f"j{i}@example.com") for i in range(30)
+        )
+        for voter in voters:
+            Rating.objects.create(user=voter, project=self.project, criteria=self.code, score=7)
+        self.assertEqual(len(self.breakdown()), 2)
+        self.assertEqual(self.breakdown()["Code Quality"]["histogram"][6], 30)
+
+
+class ScorecardTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.judge)
+        self.url = f"/api/projects/{self.project.pk}/ratings/"
+
+    def submit(self, **scores):
+        entries = [{"criteria_id": getattr(self, name).pk, "score": score} for name, score in scores.items()]
+        return self.client.post(self.url + "bulk/", {"scores": entries}, format="json")
+
+    def test_scorecard_upserts_and_updates_stats_once(self):
+        response = self.submit(design=8, code=6)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["updated"]), (2, 0))
+
+        # The unchanged code score is neither created nor updated
+        response = self.submit(design=10, code=6)
+        self.assertEqual((response.data["created"], response.data["updated"]), (0, 1))
+        self.assertEqual(Rating.objects.get(criteria=self.design).score, 10)
+        response = self.submit(design=10, code=6)
+        self.assertEqual((response.data["created"], response.data["updated"]), (0, 0))
+
+        def aggregates():
+            fields = ["criteria", "rating_count", "score_sum", *ProjectCriteriaScore.HISTOGRAM_FIELDS]
+            return list(self.project.criteria_scores.order_by("criteria").values(*fields))
+
+        # the incremental result must match a rebuild from scratch
+        live, live_scores = self.stats(), aggregates()
+        call_command("reconcile_stats", stdout=StringIO())
+        self.assertEqual(self.stats(), live)
+        self.assertEqual(aggregates(), live_scores)
+        self.assertEqual(live["rating_sum"], 16)
+
+    def test_scorecard_query_budget(self):
+        # project, criteria check, savepoint, insert, aggregate rows
+        # (ensure, read, update), project stats, release
+        with self.assertNumQueries(9):
+            self.submit(design=8, code=6)
+        # Resubmitted: locking the existing ratings and updating the changed
+        # ones in place of the criteria check, now served by the registry
+        with self.assertNumQueries(10):
+            self.submit(design=9, code=6)
+
+    def test_conflicting_first_submission_counts_as_an_update(self):
+        # A concurrent first submission committed between our check and insert
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=3)
+        response = self.submit(design=8, code=6)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(self.stats()["rating_count"], 2)
+        self.assertEqual(self.stats()["rating_sum"], 14)
+
+    def test_scorecard_validation(self):
+        other = Criteria.objects.create(project_category="movie", name="Plot")
+        response = self.client.post(self.url + "bulk/", {"scores": [{"criteria_id": other.pk, "score": 5}]},
+                                    format="json")
+        self.assertEqual(response.status_code, 400)
+        duplicate = [{"criteria_id": self.design.pk, "score": 5}] * 2
+        self.assertEqual(self.client.post(self.url + "bulk/", {"scores": duplicate}, format="json").status_code, 400)
+        self.assertEqual(self.submit(design=11).status_code, 400)
+        self.assertFalse(Rating.objects.exists())
+
+    def test_single_rating_create(self):
+        response = self.client.post(self.url, {"criteria_id": self.code.pk, "score": 4}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stats()["rating_sum"], 4)
+
+
+class ResponseCacheTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Project.objects.create(name="Other", creator=self.owner, status="published")
+
+    def test_anonymous_hits_skip_the_database(self):
+        self.client.get("/api/projects/", {"ordering": "-vote_count"})
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/projects/", {"ordering": "-vote_count"})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.client.get("/api/criteria/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/criteria/")
+
+    def test_writes_bump_generations(self):
+        self.client.get("/api/projects/")
+        self.project.name = "Renamed"
+        self.project.save()
+        names = {p["name"] for p in self.client.get("/api/projects/").data["results"]}
+        self.assertEqual(names, {"Renamed", "Other"})
+
+        Criteria.objects.create(project_category="poll", name="UI/UX")
+        self.assertEqual(len(self.client.get("/api/criteria/").data), 3)
+
+    def test_counters_reach_lists_after_the_lag(self):
+        self.client.get("/api/projects/")
+        Vote.objects.create(user=self.judge, project=self.project)
+        Comment.objects.create(user=self.judge, project=self.project, content="Nice")
+        # Neither invalidates the cached page...
+        with self.assertNumQueries(0):
+            counts = {p["name"]: p["vote_count"] for p in self.client.get("/api/projects/").data["results"]}
+        self.assertEqual(counts["Nexus"], 0)
+        # ...but the detail follows at once
+        self.assertEqual(self.client.get(f"/api/projects/{self.project.pk}/").data["vote_count"], 1)
+
+        expire_lagged("stats", response_cache_stats_lag())
+        counts = {p["name"]: p["vote_count"] for p in self.client.get("/api/projects/").data["results"]}
+        self.assertEqual(counts["Nexus"], 1)
+
+    def test_detail_only_invalidated_by_its_project(self):
+        url = f"/api/projects/{self.project.pk}/"
+        self.client.get(url)
+        Vote.objects.create(user=self.judge, project=self.other)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Comment.objects.create(user=self.judge, project=self.project, content="Nice")
+        self.assertEqual(len(self.client.get(url).data["comments"]), 1)
+
+    def test_user_flags_overlay_shared_payload(self):
+        Vote.objects.create(user=self.judge, project=self.project)
+        self.client.force_authenticate(self.judge)
+        self.client.get("/api/projects/")
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/projects/")
+        self.assertEqual({p["name"]: p["has_voted"] for p in response.data["results"]},
+                         {"Nexus": True, "Other": False})
+
+        self.client.force_authenticate(self.owner)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/projects/")
+        self.assertFalse(any(p["has_voted"] for p in response.data["results"]))
+
+
+class CriteriaRegistryTests(NexusTestCase):
+    def criteria_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300)
+        return [q["sql"] for q in ctx.captured_queries if 'FROM "core_criteria"' in q["sql"]]
+
+    def test_requests_do_not_query_criteria(self):
+        criteria_registry.all()  # warm, as after the first request of a worker
+        self.assertEqual(self.criteria_queries("get", f"/api/projects/{self.project.pk}/"), [])
+        self.assertEqual(self.criteria_queries("get", "/api/criteria/"), [])
+        self.client.force_authenticate(self.judge)
+        url = f"/api/projects/{self.project.pk}/ratings/"
+        self.assertEqual(self.criteria_queries("post", url, {"criteria_id": self.design.pk, "score": 6}), [])
+
+    def test_reloads_when_criteria_change(self):
+        self.assertEqual(len(criteria_registry.for_category("poll")), 2)
+        Criteria.objects.create(project_category="poll", name="UI/UX", order=2)
+        self.assertEqual([c.name for c in criteria_registry.for_category("poll")][-1], "UI/UX")
+
+    def test_rejects_unknown_and_foreign_criteria(self):
+        self.client.force_authenticate(self.judge)
+        url = f"/api/projects/{self.project.pk}/ratings/"
+        self.assertEqual(self.client.post(url, {"criteria_id": 999, "score": 6}).status_code, 400)
+        plot = Criteria.objects.create(project_category="movie", name="Plot")
+        self.assertEqual(self.client.post(url, {"criteria_id": plot.pk, "score": 6}).status_code, 400)
+
+
+@override_settings(STATS_PIPELINE={"ASYNC": True, "WINDOW_SECONDS": 0})
+class StatsPipelineTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        # namespaced config: the CELERY_ prefixed name is the one that sticks
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+
+    def tearDown(self):
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = False
+
+    def test_burst_is_coalesced_into_one_recalculation(self):
+        voters = User.objects.bulk_create(User(username=f"j{i}", email=f"j{i}@example.com") for i in range(5))
+        # Queue instead of running eagerly, as a worker would pick it up after the window
+        queued = []
+        apply_async = refresh_project_stats.apply_async
+        refresh_project_stats.apply_async = lambda args, **kwargs: queued.append(args)
+        try:
+            for voter in voters:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Rating.objects.create(user=voter, project=self.project, criteria=self.design, score=6)
+        finally:
+            refresh_project_stats.apply_async = apply_async
+        # nothing applied inside the requests
+        self.assertEqual(self.stats()["rating_count"], 0)
+        self.assertEqual(queued, [(self.project.pk,)])
+        refresh_project_stats(*queued[0])
+
+        self.assertEqual(self.stats(), {"vote_count": 0, "rating_count": 5, "rating_sum": 30, "average_score": 6.0})
+        self.assertEqual(self.project.criteria_scores.get().score_6, 5)
+        metrics = pipeline_metrics()
+        self.assertEqual((metrics["events"], metrics["coalesced"], metrics["runs"]), (5, 4, 1))
+
+    def test_events_after_a_run_schedule_another(self):
+        for score in (4, 8):
+            with self.captureOnCommitCallbacks(execute=True):
+                Rating.objects.update_or_create(
+                    user=self.judge, project=self.project, criteria=self.code, defaults={"score": score}
+                )
+        self.assertEqual(self.stats()["rating_sum"], 8)
+        self.assertEqual(pipeline_metrics()["runs"], 2)
+
+    def test_rolled_back_event_leaves_no_marker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Rating.objects.create(user=self.judge, project=self.project, criteria=self.code, score=4)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertIsNone(cache.get(PENDING_KEY.format(self.project.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=self.judge, project=self.project, criteria=self.code, score=8)
+        self.assertEqual(self.stats()["rating_sum"], 8)
+        metrics = pipeline_metrics()
+        self.assertEqual((metrics["events"], metrics["coalesced"], metrics["runs"]), (2, 0, 1))
+
+    def test_scorecard_is_deferred_too(self):
+        self.client.force_authenticate(self.judge)
+        scores = [{"criteria_id": self.design.pk, "score": 9}, {"criteria_id": self.code.pk, "score": 3}]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/projects/{self.project.pk}/ratings/bulk/", {"scores": scores}, format="json")
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.weighted_score, 7.0)
+        self.assertEqual(pipeline_metrics()["runs"], 1)
+
+
+@override_settings(VOTE_BUFFER={"ENABLED": True}, CACHES=SHARED_CACHE)
+class VoteBufferTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.voters = User.objects.bulk_create(
+            User(username=f"v{i}", email=f"v{i}@example.com") for i in range(20)
+        )
+
+    def cast_all(self, project=None):
+        project = project or self.project
+        counts = []
+        with CaptureQueriesContext(connection) as ctx:
+            for voter in self.voters:
+                # one request per vote, so each commit reaches the buffer
+                with self.captureOnCommitCallbacks(execute=True):
+                    counts.append(Vote.cast(voter.pk, project.pk))
+        return counts, [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+
+    def test_votes_are_buffered_then_flushed(self):
+        counts, updates = self.cast_all()
+        self.assertEqual(counts, list(range(1, 21)))
+        self.assertEqual(updates, [])
+        self.assertEqual(self.stats()["vote_count"], 0)
+        self.assertEqual(Vote.objects.count(), 20)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(vote_buffer.flush(), 1)
+        self.assertEqual(self.stats()["vote_count"], 20)
+        self.assertEqual(vote_buffer.pending([self.project.pk]), {})
+        self.assertEqual(vote_buffer.flush(), 0)
+
+    def test_reads_merge_pending_votes(self):
+        self.client.get("/api/projects/")  # warm the cached page
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.judge.pk, self.project.pk)
+            Vote.retract(self.judge.pk, self.project.pk)
+            Vote.cast(self.owner.pk, self.project.pk)
+
+        [listed] = self.client.get("/api/projects/").data["results"]
+        self.assertEqual(listed["vote_count"], 1)
+        self.assertEqual(self.client.get(f"/api/projects/{self.project.pk}/").data["vote_count"], 1)
+
+        vote_buffer.flush()
+        [listed] = self.client.get("/api/projects/").data["results"]
+        self.assertEqual(listed["vote_count"], 1)
+
+    def test_votes_after_a_flush_are_logged_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.judge.pk, self.project.pk)
+        vote_buffer.flush()
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.owner.pk, self.project.pk)
+        vote_buffer.flush()
+        self.assertEqual(self.stats()["vote_count"], 2)
+
+    def test_flush_between_slot_number_and_slot(self):
+        key = vote_buffer.PENDING_KEY.format(self.project.pk)
+        # add() has taken a slot number but not written the slot yet
+        vote_buffer._incr(key, 1)
+        cache.add(vote_buffer.MARKER_KEY.format(self.project.pk), 1)
+        slot = vote_buffer._incr(vote_buffer.SEQ_KEY, 1)
+        self.assertEqual(vote_buffer.flush(), 0)
+        cache.set(vote_buffer.SLOT_KEY.format(slot), self.project.pk)
+        self.assertEqual(vote_buffer.flush(), 1)
+        self.assertEqual(self.stats()["vote_count"], 1)
+
+    def test_lost_slot_is_not_counted_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.judge.pk, self.project.pk)
+        # Its writer died before writing the slot: skipped on the second cycle
+        cache.delete(vote_buffer.SLOT_KEY.format(1))
+        self.assertEqual((vote_buffer.flush(), vote_buffer.flush()), (0, 0))
+        call_command("reconcile_stats", stdout=StringIO())
+        self.assertEqual(self.stats()["vote_count"], 0)
+        self.assertEqual(vote_buffer.pending([self.project.pk]), {self.project.pk: 1})
+
+        # Once the marker expires the next vote logs the project again
+        cache.delete(vote_buffer.MARKER_KEY.format(self.project.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.owner.pk, self.project.pk)
+        self.assertEqual(vote_buffer.flush(), 1)
+        self.assertEqual(self.stats()["vote_count"], 2)
+
+    def test_per_process_cache_keeps_it_off(self):
+        self.assertTrue(vote_buffer.is_enabled())
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertFalse(vote_buffer.is_enabled())
+
+    def test_rolled_back_vote_is_not_buffered(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Vote.cast(self.judge.pk, self.project.pk)
+        self.assertEqual(len(callbacks), 3)  # buffer the delta, bump the stats version, announce the change
+        self.assertEqual(vote_buffer.pending([self.project.pk]), {})
+
+    def test_hot_row_writes_benchmark(self):
+        """Twenty votes cost twenty row UPDATEs unbuffered, one flush UPDATE buffered."""
+        hot = Project.objects.create(name="Hot", creator=self.owner, status="published")
+        with override_settings(VOTE_BUFFER={"ENABLED": False}):
+            _, direct = self.cast_all()
+        _, buffered = self.cast_all(hot)
+        with CaptureQueriesContext(connection) as ctx:
+            vote_buffer.flush()
+        self.assertEqual((len(direct), len(buffered), len(ctx.captured_queries)), (20, 0, 1))
+        self.assertEqual(self.stats(hot)["vote_count"], 20)
+
+
+class AsyncReadTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=8)
+        Vote.objects.create(user=self.judge, project=self.project)
+        root = Comment.objects.create(user=self.judge, project=self.project, content="Nice")
+        Comment.objects.create(user=self.owner, project=self.project, parent=root, content="Thanks")
+        for i in range(3):
+            Project.objects.create(name=f"P{i}", creator=self.owner, status="published")
+
+    async def both(self, path, **headers):
+        """The async endpoint's payload, then the sync one's, each built from a cold cache."""
+        await cache.aclear()
+        response = await self.async_client.get(f"/api/async/{path}", headers=headers)
+        await cache.aclear()
+        client = APIClient(headers=headers)
+        expected = await sync_to_async(client.get)(f"/api/{path}")
+        self.assertEqual(response.status_code, expected.status_code)
+        # pagination links point back at the endpoint that served the page
+        self.assertEqual(response.content.decode().replace("/api/async/", "/api/"), expected.content.decode())
+        return response.json()
+
+    async def test_payloads_match_sync_endpoints(self):
+        await self.both("projects/")
+        await self.both("projects/?ordering=-vote_count&page_size=2")
+        detail = await self.both(f"projects/{self.project.pk}/")
+        self.assertEqual(detail["comments"][0]["replies"][0]["content"], "Thanks")
+        await self.both("criteria/")
+        await self.both(f"criteria/{self.design.pk}/")
+        await self.both("leaderboard/")
+        await self.both("leaderboard/?category=poll&limit=1")
+
+    async def test_cursor_pages_match(self):
+        page = await self.both("projects/?page_size=2")
+        cursor = page["next"].split("cursor=")[1].split("&")[0]
+        await self.both(f"projects/?page_size=2&cursor={cursor}")
+
+    async def test_user_flags(self):
+        token = await sync_to_async(AccessToken.for_user)(self.judge)
+        page = await self.both("projects/", Authorization=f"Bearer {token}")
+        flags = {p["name"]: (p["has_voted"], p["has_rated"]) for p in page["results"]}
+        self.assertEqual(flags["Nexus"], (True, True))
+        self.assertEqual(flags["P0"], (False, False))
+
+    async def test_errors(self):
+        await self.both("projects/999999/")
+        await self.both("criteria/999999/")
+        await self.both("leaderboard/?category=nope")
+        await self.both("projects/?cursor=garbage")
+        response = await self.async_client.get("/api/async/projects/", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post("/api/async/projects/")
+        self.assertEqual(response.status_code, 405)
+
+    async def test_permissions_and_throttles(self):
+        class OnePerMinute(AnonRateThrottle):
+            rate = "1/min"
+
+        classes = ProjectViewSet.permission_classes, ProjectViewSet.throttle_classes
+        ProjectViewSet.permission_classes, ProjectViewSet.throttle_classes = [IsAuthenticated], []
+        try:
+            self.assertEqual((await self.async_client.get("/api/async/projects/")).status_code, 401)
+            ProjectViewSet.permission_classes, ProjectViewSet.throttle_classes = [AllowAny], [OnePerMinute]
+            self.assertEqual((await self.async_client.get("/api/async/projects/")).status_code, 200)
+            self.assertEqual((await self.async_client.get("/api/async/projects/")).status_code, 429)
+        finally:
+            ProjectViewSet.permission_classes, ProjectViewSet.throttle_classes = classes
+
+    def test_cached_payloads_are_served_without_queries(self):
+        url = f"/api/async/projects/{self.project.pk}/"
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.json(), second.json())
+
+
+@override_settings(LIVE_EVENTS={"BACKEND": "inprocess", "COALESCE_SECONDS": 0.01, "KEEPALIVE_SECONDS": 5})
+class LiveStreamTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        self.rival = Project.objects.create(name="Rival", creator=self.owner, category="poll", status="published")
+
+    def write(self, action, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            action(*args, **kwargs)
+
+    async def disconnect(self, frames):
+        # What the ASGI handler does when the client goes away: cancel the pending read
+        read = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0.05)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+
+    async def open(self, query=""):
+        response = await self.async_client.get(f"/api/stream/{query}")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return response.streaming_content
+
+    async def next_event(self, frames):
+        frame = await asyncio.wait_for(anext(frames), 2)
+        frame = frame.decode() if isinstance(frame, bytes) else frame
+        event, data = frame.strip().split("\n")
+        return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    async def test_project_stream_pushes_vote_counts(self):
+        frames = await self.open(f"?project={self.project.pk}")
+        self.assertEqual(await self.next_event(frames), ("snapshot", {
+            "id": self.project.pk, "name": "Nexus", "category": "poll", "vote_count": 0, "average_score": 0.0,
+            "weighted_score": 0.0, "rating_count": 0, "rank": None, "category_rank": None,
+        }))
+        await sync_to_async(self.write)(Vote.cast, self.judge.pk, self.project.pk)
+        event, data = await self.next_event(frames)
+        self.assertEqual((event, data["vote_count"]), ("update", 1))
+        await self.disconnect(frames)
+        self.assertEqual(events.hub.subscriber_count(), 0)
+
+    async def test_leaderboard_subscribers_share_one_update_with_ranks(self):
+        streams = [await self.open(), await self.open("?category=poll")]
+        for frames in streams:
+            event, _ = await self.next_event(frames)
+            self.assertEqual(event, "snapshot")
+        await sync_to_async(self.write)(Rating.objects.create, user=self.judge, project=self.rival,
+                                        criteria=self.design, score=6)
+        for frames in streams:
+            _, data = await self.next_event(frames)
+            self.assertEqual((data["name"], data["rank"], data["category_rank"]), ("Rival", 1, 1))
+        await sync_to_async(self.write)(Rating.objects.create, user=self.judge, project=self.project,
+                                        criteria=self.design, score=9)
+        for frames in streams:
+            updates = {}
+            while len(updates) < 2:
+                _, data = await self.next_event(frames)
+                updates[data["name"]] = (data["rank"], data["category_rank"], data["average_score"])
+            # Nexus took over, and the rival's demotion came with it
+            self.assertEqual(updates, {"Nexus": (1, 1, 9.0), "Rival": (2, 2, 6.0)})
+            await self.disconnect(frames)
+
+    async def test_other_channels_are_not_notified(self):
+        frames = await self.open(f"?project={self.rival.pk}")
+        await self.next_event(frames)
+        await sync_to_async(self.write)(Vote.cast, self.judge.pk, self.project.pk)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(anext(frames), 0.2)
+        # the timeout cancelled the read, like a disconnect
+        self.assertEqual(events.hub.subscriber_count(), 0)
+
+    def test_snapshot_ranks_a_batch_in_one_query(self):
+        third = Project.objects.create(name="Third", creator=self.owner, category="movie", status="published")
+        for project, score in ((self.project, 5), (self.rival, 8), (third, 7)):
+            Rating.objects.create(user=self.judge, project=project, criteria=self.design, score=score)
+        ids = [self.project.pk, self.rival.pk, third.pk]
+        # the rows, then the ranks
+        with self.assertNumQueries(2):
+            rows = async_to_sync(events.snapshot)(ids)
+        self.assertEqual([(rows[pk]["rank"], rows[pk]["category_rank"]) for pk in ids], [(3, 2), (1, 1), (2, 1)])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/api/stream/?category=nope").status_code, 400)
+        self.assertEqual(self.client.get("/api/stream/?project=x").status_code, 400)
+        self.assertEqual(self.client.get("/api/stream/?project=999999").status_code, 404)
+        self.assertEqual(events.hub.subscriber_count(), 0)
+
+
+class ProjectSearchTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make("Voting Booth", "Anonymous ballots for student councils")
+        self.make("Film Finder", "Movie recommendations from your voting history", category="movie")
+        self.make("Shop Front", "A catalogue with carts")
+
+    def make(self, name, description, **fields):
+        return Project.objects.create(name=name, description=description, creator=self.owner,
+                                      status="published", **fields)
+
+    def names(self, q, **params):
+        response = self.client.get("/api/projects/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [project["name"] for project in response.data["results"]]
+
+    def test_name_hits_rank_above_description_hits(self):
+        self.assertEqual(self.names("voting"), ["Voting Booth", "Film Finder"])
+        self.assertEqual(self.names("vote"), ["Voting Booth", "Film Finder"])  # stemmed
+        self.assertEqual(self.names("catalog"), ["Shop Front"])  # prefix of the last word
+        self.assertEqual(self.names("voting", category="movie"), ["Film Finder"])
+        self.assertEqual(self.names("!!"), [])
+        self.assertEqual(len(self.names("  ")), 4)  # blank q is no search
+
+    def test_trigger_function_follows_the_config(self):
+        with self.settings(PROJECT_SEARCH={"CONFIG": "simple"}):
+            sql = search_function_sql()
+            self.assertIn("to_tsvector('simple'::regconfig, COALESCE(NEW.name, ''))", sql)
+            self.assertNotIn("english", sql)
+            self.assertIn("to_tsvector('simple'", search_backfill_sql())
+        with self.settings(PROJECT_SEARCH={"CONFIG": "english'); DROP TABLE core_project; --"}):
+            with self.assertRaises(ValueError):
+                search_function_sql()
+        out = StringIO()
+        call_command("reindex_search", stdout=out)
+        self.assertIn("Nothing to do", out.getvalue())
+
+    def test_standing_breaks_ties_between_equal_matches(self):
+        first = self.make("Poll A", "quick polls")
+        self.make("Poll B", "quick polls")
+        self.assertEqual(self.names("quick"), ["Poll B", "Poll A"])  # equal scores, newest id first
+        Project.objects.filter(pk=first.pk).update(average_score=8.0, vote_count=20)
+        cache.clear()  # a raw update skips the response cache invalidation
+        self.assertEqual(self.names("quick"), ["Poll A", "Poll B"])
+        self.assertEqual(self.names("quick", ordering="-created_at"), ["Poll B", "Poll A"])
+
+    def test_index_follows_edits_and_deletes(self):
+        project = Project.objects.get(name="Shop Front")
+        project.name = "Market Square"
+        project.save()
+        self.assertEqual(self.names("market"), ["Market Square"])
+        self.assertEqual(self.names("shop"), [])
+        project.delete()
+        self.assertEqual(self.names("market"), [])
+
+    def test_search_pages_with_keyset_cursor(self):
+        for i in range(5):
+            project = self.make(f"Quiz {i}", "trivia night")
+            Project.objects.filter(pk=project.pk).update(vote_count=i * 10)
+        seen, url, params = [], "/api/projects/", {"q": "trivia", "page_size": 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen += [project["name"] for project in response.data["results"]]
+            url, params = response.data["next"], None
+        self.assertEqual(seen, [f"Quiz {i}" for i in reversed(range(5))])
+
+
+class ExportTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user(username="staff", email="staff@example.com", password="pw",
+                                              is_staff=True)
+        self.movie = Project.objects.create(name="Reel", creator=self.owner, category="movie", status="published")
+        Rating.objects.create(user=self.judge, project=self.project, criteria=self.design, score=7)
+        Rating.objects.create(user=self.owner, project=self.project, criteria=self.code, score=4)
+        Vote.objects.create(user=self.judge, project=self.project)
+        Vote.objects.create(user=self.judge, project=self.movie)
+        self.client.force_authenticate(self.staff)
+
+    def download(self, path, **params):
+        response = self.client.get(f"/api/exports/{path}/", params)
+        self.assertEqual(response.status_code, 200, getattr(response, "data", None))
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv_and_ndjson(self):
+        lines = self.download("ratings", format="csv").decode().splitlines()
+        self.assertEqual(lines[0], "id,project_id,project,category,criteria_id,criteria,user_id,score,created_at")
+        self.assertEqual([line.split(",")[7] for line in lines[1:]], ["7", "4"])
+
+        votes = [json.loads(line) for line in self.download("votes", format="ndjson").decode().splitlines()]
+        self.assertEqual({vote["project"] for vote in votes}, {"Nexus", "Reel"})
+        votes = self.download("votes", format="ndjson", category="movie").decode().splitlines()
+        self.assertEqual([json.loads(line)["project"] for line in votes], ["Reel"])
+
+    def test_date_range(self):
+        Rating.objects.filter(score=4).update(created_at="2020-01-01T12:00:00Z")
+        lines = self.download("ratings", format="csv", until="2020-01-01").decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        lines = self.download("ratings", format="csv", since="2021-01-01").decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[1].split(",")[7], "7")
+
+    def test_criteria_scores_parquet(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(self.download("criteria_scores", format="parquet")))
+        self.assertEqual(sorted(table.column("score_sum").to_pylist()), [4, 7])
+        self.assertEqual(table.column("weight").to_pylist(), [2, 1])
+
+    def test_one_chunk_per_batch(self):
+        from . import export as export_module
+
+        export_module.CHUNK_SIZE, size = 1, export_module.CHUNK_SIZE
+        try:
+            chunks = list(export_module.export("ratings", "ndjson"))
+        finally:
+            export_module.CHUNK_SIZE = size
+        self.assertEqual(len(chunks), 2)
+
+    def test_errors_and_permissions(self):
+        response = self.client.get("/api/exports/ratings/", {"format": "csv", "since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/exports/criteria_scores/", {"format": "csv", "since": "2020-01-01"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/exports/comments/").status_code, 404)
+        self.client.force_authenticate(self.judge)
+        self.assertEqual(self.client.get("/api/exports/ratings/", {"format": "csv"}).status_code, 403)
+
+    def test_command_writes_file(self):
+        out = StringIO()
+        path = f"/tmp/nexus-export-{self.staff.pk}.csv"
+        call_command("export_results", "votes", "--category", "poll", "-o", path, stderr=out)
+        with open(path) as exported:
+            self.assertEqual(len(exported.read().splitlines()), 2)
+        self.assertIn("Wrote", out.getvalue())
+
+
+class SeedCommandTests(NexusTestCase):
+    def seed(self, *args):
+        call_command(
+            "seed_nexus", "--users", "30", "--projects-per-category", "8", "--votes", "300", "--ratings", "600",
+            "--batch-size", "50", *args, stdout=StringIO(),
+        )
+
+    def test_seeds_consistent_stats(self):
+        self.assertEqual(criteria_registry.for_category("movie"), [])
+        self.seed()
+        seeded = Project.objects.filter(creator__username__startswith="seed-")
+        self.assertEqual(seeded.count(), 8 * len(Project.CATEGORY_CHOICES))
+        self.assertEqual(User.objects.filter(username__startswith="seed-").count(), 30)
+        # Existing criteria are reused, missing categories get a set of their own
+        self.assertEqual(Criteria.objects.filter(project_category="poll").count(), 2)
+        self.assertEqual(Criteria.objects.filter(project_category="movie").count(), 5)
+        self.assertEqual(len(criteria_registry.for_category("movie")), 5)
+        self.assertGreater(Vote.objects.count(), 100)
+        self.assertGreater(Rating.objects.count(), 200)
+        self.assertFalse(Vote.objects.exclude(project__status="published").exists())
+
+        out = StringIO()
+        call_command("reconcile_stats", "--dry-run", stdout=out)
+        self.assertIn("Would reconcile 0 of", out.getvalue())
+        counts = sorted(seeded.values_list("vote_count", flat=True), reverse=True)
+        self.assertGreater(counts[0], 4 * counts[len(counts) // 2])
+        self.assertTrue(ProjectCriteriaScore.objects.filter(project__in=seeded).exists())
+
+    def test_clear_replaces_seeded_data(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed("--clear", "--seed", "7")
+        self.assertEqual(User.objects.filter(username__startswith="seed-").count(), 30)
+        self.assertEqual(Project.objects.filter(creator__username__startswith="seed-").count(), 40)
+        self.assertTrue(Project.objects.filter(pk=self.project.pk).exists())
+
+
+class BenchmarkBudgetTests(NexusTestCase):
+    def test_hot_paths_within_query_budgets(self):
+        # Latency and memory budgets are machine-dependent; manage.py bench_api checks those
+        data = benchmarks.build_dataset("tiny", runs=2)
+        results = benchmarks.measure(data, runs=2, timing=False)
+        self.assertEqual(set(results), set(benchmarks.SCENARIOS))
+        self.assertEqual(benchmarks.check(results, benchmarks.load_budgets()), [])
+
+    def test_overrun_is_reported(self):
+        budgets = {"vote": {"queries": 5, "p95_ms": 10}}
+        results = {"vote": {"queries": 7, "p95_ms": 4}, "unvote": {"queries": 5}}
+        self.assertEqual(benchmarks.check(results, budgets, "small"), [
+            "vote@small: queries 7 > budget 5",
+            "unvote@small: no budget committed",
+        ])
+
+
+@override_settings(INSTRUMENTATION={"SAMPLE_RATE": 1.0, "METRICS_TOKEN": "scrape-me"})
+class InstrumentationTests(NexusTestCase):
+    def metrics(self, **headers):
+        return self.client.get("/api/metrics/", **headers)
+
+    def test_server_timing_and_action_labels(self):
+        self.client.force_authenticate(self.judge)
+        response = self.client.post(f"/api/projects/{self.project.pk}/vote/")
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="5 queries", serialize;dur=[\d.]+$')
+        self.client.get("/api/projects/")
+        self.client.get("/api/async/projects/")
+
+        metrics = instrumentation.request_metrics()
+        self.assertEqual(metrics["ProjectViewSet.vote"]["requests"], 1)
+        self.assertEqual(metrics["ProjectViewSet.vote"]["db_queries"], 5)
+        self.assertGreater(metrics["ProjectViewSet.list"]["serialize_us"], 0)
+        self.assertIn("ProjectViewSet.alist", metrics)
+
+    def test_repeated_queries_are_flagged(self):
+        def view(request):
+            for pk in range(12):
+                Project.objects.filter(pk=pk).exists()
+            return HttpResponse()
+
+        middleware = instrumentation.InstrumentationMiddleware(view)
+        with self.assertLogs("core.instrumentation", "WARNING") as logs:
+            response = middleware(RequestFactory().get("/"))
+        self.assertIn('nplusone;desc="1 repeated, 12x max"', response["Server-Timing"])
+        self.assertIn("ran the same query 12 times", logs.output[0])
+        self.assertEqual(instrumentation.request_metrics()["unresolved"]["duplicate_queries"], 11)
+        self.assertEqual(
+            instrumentation.fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s) AND name = 'x' LIMIT 21"),
+            "SELECT ? FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_labels_are_logged_once_and_relogged_when_lost(self):
+        for label in ("A.list", "B.list", "A.list"):
+            instrumentation._register(label)
+        self.assertEqual(instrumentation.labels(), ["A.list", "B.list"])
+        # Both sides of a race log the label; it is listed once
+        cache.delete(instrumentation.LABEL_KEY.format("B.list"))
+        instrumentation._register("B.list")
+        self.assertEqual(instrumentation.labels(), ["A.list", "B.list"])
+        # An evicted slot is logged again on the label's next registration
+        cache.delete(instrumentation.LABEL_SLOT_KEY.format(1))
+        self.assertEqual(instrumentation.labels(), ["B.list"])
+        instrumentation._register("A.list")
+        self.assertEqual(instrumentation.labels(), ["B.list", "A.list"])
+
+    def test_unsampled_requests_are_left_alone(self):
+        with self.settings(INSTRUMENTATION={"SAMPLE_RATE": 0}):
+            response = self.client.get("/api/criteria/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(instrumentation.request_metrics(), {})
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/criteria/")
+        self.assertEqual(self.metrics().status_code, 401)
+        self.client.force_authenticate(self.judge)
+        self.assertEqual(self.metrics().status_code, 403)
+        self.client.force_authenticate(None)
+
+        response = self.metrics(HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('nexus_request_duration_seconds_count{view="CriteriaViewSet.list"} 1', text)
+        self.assertIn('nexus_request_duration_seconds_bucket{view="CriteriaViewSet.list",le="+Inf"} 1', text)
+        self.assertIn('nexus_stats_pipeline_total{kind="events"} 0', text)
+
+
+class StatsBatchTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.others = Project.objects.bulk_create(
+            Project(name=f"Other {i}", creator=self.owner, category="poll", status="published") for i in range(4)
+        )
+
+    def judge_everything(self, judge, projects):
+        for project in projects:
+            Vote.objects.create(user=judge, project=project)
+            for criteria, score in ((self.design, 8), (self.code, 5)):
+                Rating.objects.create(user=judge, project=project, criteria=criteria, score=score)
+
+    def delete_queries(self, user):
+        with CaptureQueriesContext(connection) as captured:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.delete()
+        return len(captured)
+
+    def test_user_cascade_recomputes_each_project_once(self):
+        Rating.objects.create(user=self.owner, project=self.project, criteria=self.design, score=3)
+        casual = User.objects.create_user(username="casual", email="casual@example.com")
+        prolific = User.objects.create_user(username="prolific", email="prolific@example.com")
+        self.judge_everything(casual, [self.project])
+        self.judge_everything(prolific, [self.project, *self.others])
+
+        # Cost follows the number of tables touched, not the number of rows
+        self.assertEqual(self.delete_queries(prolific), self.delete_queries(casual))
+        self.assertEqual(self.stats(), {"vote_count": 0, "rating_count": 1, "rating_sum": 3, "average_score": 3.0})
+        self.assertEqual(self.stats(self.others[0])["rating_count"], 0)
+        self.assertEqual(self.project.criteria_scores.get().score_3, 1)
+        out = StringIO()
+        call_command("reconcile_stats", "--dry-run", stdout=out)
+        self.assertIn("Would reconcile 0 of", out.getvalue())
+
+    def test_bulk_queryset_delete_is_batched(self):
+        self.judge_everything(self.judge, [self.project, *self.others])
+        with CaptureQueriesContext(connection) as captured:
+            with self.captureOnCommitCallbacks(execute=True):
+                Rating.objects.filter(criteria=self.design).delete()
+        project_updates = [q["sql"] for q in captured if q["sql"].startswith('UPDATE "core_project"')]
+        self.assertEqual(len(project_updates), 1)
+        self.assertEqual(self.stats(self.others[3]), {
+            "vote_count": 1, "rating_count": 1, "rating_sum": 5, "average_score": 5.0,
+        })
+
+    def test_async_pipeline_schedules_each_project_once(self):
+        self.judge_everything(self.judge, [self.project, *self.others])
+        with self.settings(STATS_PIPELINE={"ASYNC": True, "WINDOW_SECONDS": 0}):
+            with self.captureOnCommitCallbacks(execute=True):
+                with stats_batch():
+                    Rating.objects.filter(user=self.judge).delete()
+                    Vote.objects.filter(user=self.judge).delete()
+        metrics = pipeline_metrics()
+        self.assertEqual((metrics["events"], metrics["coalesced"]), (5, 0))
+
+
+class CachedAuthenticationTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.judge)}")
+        self.url = f"/api/projects/{self.project.pk}/"
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len([q for q in captured if 'FROM "core_user"' in q["sql"]])
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_user_is_loaded_once(self):
+        self.assertEqual(self.user_queries(), 1)
+        self.assertEqual(self.user_queries(), 0)
+
+    def test_changes_to_the_user_apply_immediately(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.judge.is_active = False
+        self.judge.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "user_inactive")
+
+    def test_cached_user_has_no_password_hash(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        user, digest = cache.get(user_key(self.judge.pk))
+        self.assertNotIn("password", user.__dict__)
+        self.assertNotIn(self.judge.password.encode(), pickle.dumps(user))
+        self.assertEqual(digest, get_md5_hash_password(self.judge.password))
+        # A save through the cached copy doesn't touch the hash
+        user.first_name = "Renamed"
+        user.save()
+        self.judge.refresh_from_db()
+        self.assertTrue(self.judge.check_password("pw"))
+
+    def test_revoked_access_token(self):
+        token = AccessToken.for_user(self.judge)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertTrue(authentication.revoke(token))
+        self.assertFalse(authentication.revoke(token))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_rotated_refresh_token_is_blacklisted(self):
+        refresh = str(RefreshToken.for_user(self.judge))
+        response = self.client.post("/api/auth/jwt/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+        rotated = response.data["refresh"]
+        # The blacklist check itself needs no query
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/auth/jwt/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.client.post("/api/auth/jwt/refresh/", {"refresh": rotated}).status_code, 200)
+
+    def test_failed_refresh_leaves_the_token_usable(self):
+        refresh = str(RefreshToken.for_user(self.judge))
+        User.objects.filter(pk=self.judge.pk).update(is_active=False)
+        self.assertEqual(self.client.post("/api/auth/jwt/refresh/", {"refresh": refresh}).status_code, 401)
+        User.objects.filter(pk=self.judge.pk).update(is_active=True)
+        self.assertEqual(self.client.post("/api/auth/jwt/refresh/", {"refresh": refresh}).status_code, 200)
+
+
+def upload(name, size, fmt="JPEG", mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 40, 40, 128) if mode == "RGBA" else (200, 40, 40)).save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{fmt.lower()}")
+
+
+class ImageDerivativeTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client.force_authenticate(self.owner)
+        self.url = f"/api/projects/{self.project.pk}/images/"
+
+    def post(self, file, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"image": file, **data}, format="multipart")
+        self.assertEqual(response.status_code, 201, response.data)
+        return ProjectImage.objects.get(pk=response.data["id"])
+
+    def test_thumbnail_and_width_variants(self):
+        image = self.post(upload("wide.jpg", (1500, 750)), caption="Wide")
+        self.assertEqual((image.width, image.height), (1500, 750))
+        thumbnail = image.derivatives["thumbnail"]
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (400, 200))
+        # No upscaling: 1920 is wider than the upload
+        self.assertEqual([(v["width"], v["height"]) for v in image.derivatives["variants"]], [(640, 320), (1280, 640)])
+        with default_storage.open(thumbnail["webp"]) as webp, default_storage.open(thumbnail["jpeg"]) as jpeg:
+            self.assertEqual((Image.open(webp).format, Image.open(jpeg).format), ("WEBP", "JPEG"))
+
+        card = self.client.get("/api/projects/").data["results"][0]["images"][0]
+        self.assertEqual(set(card), {"id", "caption", "order", "thumbnail"})
+        self.assertEqual(card["thumbnail"]["width"], 400)
+        self.assertTrue(card["thumbnail"]["webp"].endswith(".webp"))
+        detail = self.client.get(f"/api/projects/{self.project.pk}/").data["images"][0]
+        self.assertEqual([variant["width"] for variant in detail["variants"]], [640, 1280])
+        self.assertTrue(detail["image"].endswith("wide.jpg"))
+
+    def test_transparent_png_and_small_upload(self):
+        image = self.post(upload("logo.png", (120, 80), fmt="PNG", mode="RGBA"))
+        self.assertEqual(image.derivatives["variants"], [])
+        thumbnail = image.derivatives["thumbnail"]
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (120, 80))
+        with default_storage.open(thumbnail["jpeg"]) as jpeg:
+            # Alpha flattened onto white, not black
+            self.assertGreater(Image.open(jpeg).convert("RGB").getpixel((0, 0))[1], 120)
+
+    def test_only_new_uploads_are_processed(self):
+        image = self.post(upload("first.jpg", (800, 600)))
+        old_files = [image.derivatives["thumbnail"]["jpeg"], image.derivatives["variants"][0]["webp"]]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"{self.url}{image.pk}/", {"caption": "Renamed"}, format="multipart")
+        self.assertEqual(ProjectImage.objects.get(pk=image.pk).derivatives, image.derivatives)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"{self.url}{image.pk}/", {"image": upload("second.jpg", (300, 300))}, format="multipart")
+        image.refresh_from_db()
+        self.assertEqual(image.derivatives["source"], image.image.name)
+        self.assertEqual((image.width, image.height), (300, 300))
+        self.assertFalse(any(default_storage.exists(name) for name in old_files))
+
+        files = [image.derivatives["thumbnail"]["webp"], image.derivatives["thumbnail"]["jpeg"]]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"{self.url}{image.pk}/")
+        self.assertFalse(any(default_storage.exists(name) for name in files))
+
+    @override_settings(IMAGE_DERIVATIVES={"ASYNC": True})
+    def test_async_mode_processes_in_the_task(self):
+        # Before the task runs, cards fall back to the upload itself
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(self.url, {"image": upload("later.jpg", (900, 600))}, format="multipart")
+        card = self.client.get("/api/projects/").data["results"][0]["images"][0]
+        self.assertTrue(card["thumbnail"]["url"].endswith("later.jpg"))
+        self.assertIsNone(card["thumbnail"]["webp"])
+
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, celery_app.conf, "CELERY_TASK_ALWAYS_EAGER", False)
+        call_command("generate_image_derivatives", "--enqueue", stdout=StringIO())
+        image = ProjectImage.objects.get(pk=response.data["id"])
+        self.assertEqual(image.derivatives["thumbnail"]["height"], 267)
+        # Nothing left to do, unless forced
+        out = StringIO()
+        call_command("generate_image_derivatives", stdout=out)
+        self.assertIn("Processed 0 of 0", out.getvalue())
+
+    @override_settings(IMAGE_DERIVATIVES={"MAX_UPLOAD_BYTES": 100})
+    def test_upload_size_limit(self):
+        response = self.client.post(self.url, {"image": upload("big.png", (300, 300), fmt="PNG")}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image", response.data)
+
+
+class ConditionalGetTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.judge)
+        self.url = f"/api/projects/{self.project.pk}/"
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_detail_is_not_modified_without_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("no-cache", first["Cache-Control"])
+        with self.assertNumQueries(0):
+            response = self.revalidate(self.url, first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+        # Personalized payloads: another user gets another tag
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.revalidate(self.url, first["ETag"]).status_code, 200)
+
+    def test_stats_and_content_writes_change_the_tag(self):
+        for write in (
+            lambda: Vote.cast(self.owner.pk, self.project.pk),
+            lambda: Rating.objects.create(user=self.owner, project=self.project, criteria=self.code, score=4),
+            lambda: Comment.objects.create(user=self.owner, project=self.project, content="Hi"),
+            lambda: Project.objects.filter(pk=self.project.pk).first().save(),
+        ):
+            etag = self.client.get(self.url)["ETag"]
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+    @override_settings(VOTE_BUFFER={"ENABLED": True}, CACHES=SHARED_CACHE)
+    def test_buffered_vote_changes_the_list_tag(self):
+        cache.clear()
+        etag = self.client.get("/api/projects/")["ETag"]
+        self.assertEqual(self.revalidate("/api/projects/", etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.owner.pk, self.project.pk)
+        self.assertEqual(self.client.get("/api/projects/").data["results"][0]["vote_count"], 1)
+        # The tag follows the counters once the lag is over
+        self.assertEqual(self.revalidate("/api/projects/", etag).status_code, 304)
+        expire_lagged("stats", response_cache_stats_lag())
+        response = self.revalidate("/api/projects/", etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["vote_count"], 1)
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.url)
+        # The last change is too recent to be told apart at one-second resolution
+        self.assertNotIn("Last-Modified", response)
+        cache.set_many({f"nexus:touched:{name}": time.time() - 60 for name in ("all", f"project:{self.project.pk}",
+                                                                               f"stats:{self.project.pk}")})
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.cast(self.owner.pk, self.project.pk)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_comments_and_criteria(self):
+        root = Comment.objects.create(user=self.owner, project=self.project, content="Root")
+        comments = f"/api/projects/{self.project.pk}/comments/"
+        replies = f"{comments}{root.pk}/replies/"
+        tags = {url: self.client.get(url)["ETag"] for url in (comments, replies, "/api/criteria/")}
+        for url, etag in tags.items():
+            self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        # Votes leave comment tags alone
+        Vote.cast(self.owner.pk, self.project.pk)
+        self.assertEqual(self.revalidate(comments, tags[comments]).status_code, 304)
+        Comment.objects.create(user=self.owner, project=self.project, parent=root, content="Reply")
+        self.assertEqual(self.revalidate(replies, tags[replies]).status_code, 200)
+        Criteria.objects.create(project_category="poll", name="Impact", weight=1, order=2)
+        self.assertEqual(self.revalidate("/api/criteria/", tags["/api/criteria/"]).status_code, 200)
+
+    async def test_async_endpoints(self):
+        client = AsyncClient()
+        url = f"/api/async/projects/{self.project.pk}/"
+        first = await client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("no-cache", first["Cache-Control"])
+        response = await client.get(url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+
+class FastListTests(NexusTestCase):
+    def setUp(self):
+        super().setUp()
+        orphan = Project.objects.create(name="Orphan", description="No creator \u2028 é", category="job",
+                                        status="published", is_featured=True)
+        Project.objects.filter(pk=orphan.pk).update(average_score=None, weighted_score=6.5, vote_count=3)
+        ProjectImage.objects.create(project=self.project, image="projects/raw.png", caption="Raw", order=1)
+        ProjectImage.objects.create(
+            project=self.project, image="projects/done.jpg", order=0, width=800, height=600,
+            derivatives={"source": "projects/done.jpg", "thumbnail": {
+                "width": 400, "height": 300, "webp": "projects/done_thumb.webp", "jpeg": "projects/done_thumb.jpg"}},
+        )
+        Vote.objects.create(user=self.judge, project=self.project)
+        Rating.objects.create(user=self.judge, project=orphan, criteria=self.code, score=7)
+
+    def context(self, shared):
+        request = RequestFactory().get("/api/projects/")
+        force_authenticate(request, self.judge)
+        return {"request": Request(request), "shared_payload": shared}
+
+    def test_reader_matches_the_serializer(self):
+        queryset = Project.objects.order_by("-created_at", "-id")
+        for shared in (True, False):
+            context = self.context(shared)
+            expected = ProjectListSerializer(
+                queryset.select_related("creator").prefetch_related("images"), many=True, context=context
+            ).data
+            with self.assertNumQueries(2 if shared else 4):
+                rows = ProjectListReader(context).data(list(ProjectListReader.values(queryset)))
+            # Same keys in the same order, and the same JSON
+            self.assertEqual([list(row) for row in rows], [list(item) for item in expected])
+            self.assertEqual(JSONRenderer().render(rows), JSONRenderer().render(expected))
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_list_endpoint(self):
+        self.client.force_authenticate(self.judge)
+        with self.assertNumQueries(4):  # page, images, the user's votes and ratings
+            response = self.client.get("/api/projects/", {"ordering": "-vote_count"})
+        results = response.json()["results"]
+        self.assertEqual([item["name"] for item in results], ["Orphan", "Nexus"])
+        self.assertEqual([image["caption"] for image in results[1]["images"]], ["", "Raw"])
+        self.assertEqual((results[0]["has_rated"], results[1]["has_voted"]), (True, True))
+        self.assertIsNone(results[0]["creator"])
+
+    def test_orjson_renderer_output(self):
+        project = Project.objects.get(name="Orphan")
+        payloads = [
+            {"results": ProjectListSerializer([project], many=True, context=self.context(True)).data},
+            {"when": project.created_at, "amount": Decimal("1.50"), "text": "\u2028\u2029 ✓", "nested": [[None]]},
+        ]
+        for payload in payloads:
+            self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+        # Left to JSONRenderer: non-string keys, indentation
+        self.assertEqual(ORJSONRenderer().render({1: "a"}), b'{"1":"a"}')
+        indented = ORJSONRenderer().render({"a": 1}, "application/json; indent=2")
+        self.assertEqual(indented, b'{\n  "a": 1\n}')
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("bench_list_serialization", items=5, images=1, rounds=2, stdout=out)
+        self.assertIn("serialize (CPU only)", out.getvalue())
+        self.assertIn("render JSON", out.getvalue())
+        self.assertFalse(Project.objects.filter(name__startswith="bench-list").exists())
@@ -0,0 +1,141 @@
+# core/threads.py
+"""
+Comment thread loading.
+
+A page of root comments is fetched in one query and their threads in one
+more (through ``Comment.thread``), and the reply trees are assembled in
+memory. Rendering is bounded by ``COMMENT_THREADS``:
+``MAX_DEPTH`` levels of nesting and ``REPLY_LIMIT`` replies per comment.
+Anything cut off is reachable through the ``replies`` action on
+``CommentViewSet`` using the ``replies_cursor`` of its parent; the
+replies of one comment are loaded from its thread alone.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Comment
+
+DEFAULTS = {"MAX_DEPTH": 5, "REPLY_LIMIT": 20}
+
+
+def thread_setting(name):
+    return getattr(settings, "COMMENT_THREADS", {}).get(name, DEFAULTS[name])
+
+
+def encode_cursor(comment):
+    raw = f"{comment.created_at.isoformat()}|{comment.pk}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, id)`` position of a cursor. Raises ValueError if malformed."""
+    try:
+        created_at, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _attach(node, children, depth, max_depth, reply_limit):
+    kids = children.get(node.pk, [])
+    node.reply_count = len(kids)
+    shown = kids[:reply_limit] if depth < max_depth else []
+    node.thread_replies = shown
+    node.replies_cursor = encode_cursor(shown[-1]) if 0 < len(shown) < len(kids) else None
+    for kid in shown:
+        _attach(kid, children, depth + 1, max_depth, reply_limit)
+
+
+def _ordered(comments):
+    return comments.select_related("user").order_by("-created_at", "-id")
+
+
+def _group(comments):
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_id].append(comment)
+    return children
+
+
+def _children_by_parent(comments):
+    return _group(_ordered(comments))
+
+
+def _roots(project_id, cursor, limit):
+    """Keyset page of a project's root comments, with one lookahead row when ``limit`` is set."""
+    roots = _ordered(Comment.objects.filter(project_id=project_id, parent=None))
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        roots = roots.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    return roots if limit is None else roots[:limit + 1]
+
+
+def _page(nodes, limit):
+    if limit is not None and len(nodes) > limit:
+        nodes = nodes[:limit]
+        return nodes, encode_cursor(nodes[-1])
+    return nodes, None
+
+
+def load_threads(project_id, cursor=None, limit=None):
+    """
+    Return ``(comments, next_cursor)`` for a page of the root comments of a
+    project, newest first: the roots in one query, their threads in one more.
+
+    Each returned comment, and every reply below it, carries
+    ``thread_replies``, ``reply_count`` and ``replies_cursor`` for
+    CommentSerializer to render without further queries.
+    """
+    roots, next_cursor = _page(list(_roots(project_id, cursor, limit)), limit)
+    return build_threads(roots), next_cursor
+
+
+async def aload_threads(project_id, cursor=None, limit=None):
+    """``load_threads`` for async views, fetching with the async ORM."""
+    roots, next_cursor = _page([root async for root in _roots(project_id, cursor, limit)], limit)
+    if roots:
+        replies = _ordered(Comment.objects.filter(thread__in=[root.pk for root in roots]))
+        _attach_all(roots, _group([reply async for reply in replies]))
+    return roots, next_cursor
+
+
+def load_replies(comment, cursor=None, limit=None):
+    """``load_threads`` for the replies of ``comment``, loading only its thread."""
+    children = _children_by_parent(Comment.objects.filter(thread_id=comment.thread_id or comment.pk))
+    return _select(children, comment.pk, cursor, limit)
+
+
+def _select(children, parent_id, cursor, limit):
+    nodes = children.get(parent_id, [])
+    if cursor:
+        position = decode_cursor(cursor)
+        nodes = [c for c in nodes if (c.created_at, c.pk) < position]
+    nodes, next_cursor = _page(nodes, limit)
+    return _attach_all(nodes, children), next_cursor
+
+
+def _attach_all(nodes, children):
+    max_depth, reply_limit = thread_setting("MAX_DEPTH"), thread_setting("REPLY_LIMIT")
+    for node in nodes:
+        _attach(node, children, 0, max_depth, reply_limit)
+    return nodes
+
+
+def build_threads(roots):
+    """
+    Attach reply trees to an already fetched page of root comments, loading
+    only those threads (one query via ``Comment.thread``).
+    """
+    if not roots:
+        return roots
+    return _attach_all(roots, _children_by_parent(Comment.objects.filter(thread__in=[root.pk for root in roots])))
+
+
+def attach_thread(comment):
+    """Load the reply tree below a single comment that didn't come from load_threads."""
+    children = _children_by_parent(Comment.objects.filter(thread_id=comment.thread_id or comment.pk))
+    _attach_all([comment], children)
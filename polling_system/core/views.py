@@ -1,3 +1,40 @@
-from django.shortcuts import render
+# core/views.py
+import hmac
 
-# Create your views here.
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .instrumentation import instrumentation_setting, prometheus_text
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """``Authorization: Bearer <INSTRUMENTATION["METRICS_TOKEN"]>`` for scrapers; anything else falls through."""
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        token = instrumentation_setting("METRICS_TOKEN")
+        header = request.headers.get("Authorization", "")
+        if token and hmac.compare_digest(header.encode(), f"{self.keyword} {token}".encode()):
+            return AnonymousUser(), "metrics"
+        return None
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class HasMetricsToken(BasePermission):
+    def has_permission(self, request, view):
+        return request.auth == "metrics"
+
+
+class MetricsView(APIView):
+    """Request and pipeline metrics in the Prometheus text format, for staff or the metrics token."""
+    authentication_classes = [MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [HasMetricsToken | IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,30 +1,154 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 # ✅ ADDED IsAuthenticated here
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny, IsAuthenticated
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny, IsAuthenticated, IsAdminUser
 from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from .models import Project, ProjectImage, Criteria, Vote, Rating, Comment
 from .serializers import (
-    ProjectListSerializer, ProjectDetailSerializer,
+    ProjectListSerializer, ProjectListReader, ProjectDetailSerializer,
     ProjectImageSerializer, RatingSerializer,
-    CommentSerializer, CriteriaSerializer
+    CommentSerializer, CriteriaSerializer,
+    LeaderboardEntrySerializer, ScorecardSerializer
 )
+from .leaderboard import DEFAULT_LIMIT, MAX_LIMIT, aleaderboard, atop_projects, leaderboard, top_projects
 from .permissions import IsOwnerOrReadOnly
+from .cache import CachedResponseMixin, ConditionalGetMixin, lagged, response_cache_stats_lag
+from . import vote_buffer
+from .registry import criteria_registry
+from .pagination import KeysetCursorPagination
+from .search import ProjectSearchFilter
+from .export import DATASETS, FORMATS, ExportError, export
+from .renderers import CSVRenderer, NDJSONRenderer, ParquetRenderer
+from .threads import aload_threads, build_threads, load_replies, thread_setting
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    queryset = Project.objects.filter(status="published").select_related("creator").prefetch_related("images", "votes")
+class ProjectViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = Project.objects.filter(status="published")
+    cache_query_params = ("category", "is_featured", "q", "ordering", "cursor", "page_size")
     
     # Default rule: Owners can edit, others can only read
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProjectSearchFilter, OrderingFilter]
     filterset_fields = ["category", "is_featured"]
     ordering_fields = ["created_at", "vote_count", "average_score"]
-    ordering = ["-created_at"]
+
+    @property
+    def ordering(self):
+        # Search results come best match first unless ?ordering= says otherwise
+        request = getattr(self, "request", None)
+        if request is not None and request.query_params.get(ProjectSearchFilter.search_param, "").strip():
+            return ["-search_score"]
+        return ["-created_at"]
+
+    def get_queryset(self):
+        # Load only what the serializer for this action renders. Votes are
+        # never prefetched: vote_count is cached on the row and has_voted is
+        # an EXISTS annotation, so popular projects cost the same as new ones.
+        queryset = super().get_queryset()
+        if self.action in ("vote", "unvote"):
+            # Only the existence check is needed, skip the joins and prefetches
+            return queryset.only("pk")
+        if self.action in ("update", "partial_update", "destroy"):
+            return queryset
+        if self.action == "list":
+            # ProjectListReader selects its own columns and fetches the images
+            return queryset
+        queryset = queryset.select_related("creator").prefetch_related("images")
+        if self.action == "retrieve":
+            # Comment threads are loaded by ProjectDetailSerializer in one query
+            queryset = queryset.prefetch_related("criteria_scores")
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # list/retrieve payloads are cached and shared between users;
+        # has_voted/has_rated are filled in per request by personalize()
+        context["shared_payload"] = self.action in ("list", "retrieve")
+        return context
+
+    def get_cache_generations(self):
+        if self.action == "retrieve":
+            return ["all", f"project:{self.kwargs['pk']}", f"stats:{self.kwargs['pk']}"]
+        # Counters reach cached lists at most every RESPONSE_CACHE_STATS_LAG seconds
+        return ["all", "projects", lagged("stats", response_cache_stats_lag())]
+
+    def _payload_projects(self, data):
+        if self.action == "retrieve":
+            return [data]
+        return data["results"] if isinstance(data, dict) else data
+
+    def _user_flag_querysets(self, projects):
+        # Two set-based lookups for the whole page
+        ids = [project["id"] for project in projects]
+        user = self.request.user
+        return (
+            Vote.objects.filter(user=user, project_id__in=ids).values_list("project_id", flat=True),
+            Rating.objects.filter(user=user, project_id__in=ids).values_list("project_id", flat=True).distinct(),
+        )
+
+    @staticmethod
+    def _set_user_flags(projects, voted, rated):
+        for project in projects:
+            project["has_voted"] = project["id"] in voted
+            project["has_rated"] = project["id"] in rated
+
+    def personalize(self, data):
+        projects = self._payload_projects(data)
+        # Buffered votes aren't in the cached payload yet
+        vote_buffer.merge(projects)
+        if not self.request.user.is_authenticated or not projects:
+            return data
+        voted, rated = self._user_flag_querysets(projects)
+        self._set_user_flags(projects, set(voted), set(rated))
+        return data
+
+    async def apersonalize(self, data):
+        projects = self._payload_projects(data)
+        await vote_buffer.amerge(projects)
+        if not self.request.user.is_authenticated or not projects:
+            return data
+        voted, rated = self._user_flag_querysets(projects)
+        self._set_user_flags(projects, {pk async for pk in voted}, {pk async for pk in rated})
+        return data
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: self.cached_response(request, self._list_page))
+
+    def _list_page(self):
+        queryset = ProjectListReader.values(self.filter_queryset(self.get_queryset()))
+        reader = ProjectListReader(self.get_serializer_context())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return reader.data(list(queryset))
+        return self.get_paginated_response(reader.data(page)).data
+
+    # Async read path, served by core.async_views under ASGI
+    async def alist(self, request):
+        async def build():
+            queryset = ProjectListReader.values(self.filter_queryset(self.get_queryset()))
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            data = await ProjectListReader(self.get_serializer_context()).adata(page)
+            return self.paginator.get_paginated_response(data).data
+        return await self.aconditional_response(request, lambda: self.acached_response(request, build))
+
+    async def aretrieve(self, request, pk=None):
+        async def build():
+            try:
+                project = await self.filter_queryset(self.get_queryset()).aget(pk=pk)
+            except (Project.DoesNotExist, ValueError):
+                raise Http404("No Project matches the given query.")
+            project.comment_page = await aload_threads(project.pk, limit=KeysetCursorPagination.page_size)
+            # Warm the criteria registry without blocking on its sync reload
+            await criteria_registry.aall()
+            return self.get_serializer(project).data
+        return await self.aconditional_response(request, lambda: self.acached_response(request, build))
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -38,31 +162,23 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def vote(self, request, pk=None):
         project = self.get_object()
-        vote, created = Vote.objects.get_or_create(user=request.user, project=project)
-        
-        if not created:
-            return Response({"detail": "Already voted"}, status=status.HTTP_400_BAD_REQUEST)
+        vote_count = Vote.cast(request.user.pk, project.pk)
 
-        # Count directly from DB
-        project.vote_count = Vote.objects.filter(project=project).count()
-        project.save(update_fields=["vote_count"])
+        if vote_count is None:
+            return Response({"detail": "Already voted"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"detail": "Voted successfully"}, status=status.HTTP_201_CREATED)
+        return Response({"detail": "Voted successfully", "vote_count": vote_count}, status=status.HTTP_201_CREATED)
 
     # ✅ FIX: Added permission_classes=[IsAuthenticated] here too
     @action(detail=True, methods=["delete"], permission_classes=[IsAuthenticated])
     def unvote(self, request, pk=None):
         project = self.get_object()
-        deleted, _ = Vote.objects.filter(user=request.user, project=project).delete()
-        
-        if deleted == 0:
-            return Response({"detail": "Not voted"}, status=status.HTTP_400_BAD_REQUEST)
+        vote_count = Vote.retract(request.user.pk, project.pk)
 
-        # Count directly from DB
-        project.vote_count = Vote.objects.filter(project=project).count()
-        project.save(update_fields=["vote_count"])
+        if vote_count is None:
+            return Response({"detail": "Not voted"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"detail": "Vote removed"}, status=status.HTTP_204_NO_CONTENT)
+        return Response({"detail": "Vote removed", "vote_count": vote_count}, status=status.HTTP_200_OK)
 
 
 class ProjectImageViewSet(viewsets.ModelViewSet):
@@ -84,25 +200,193 @@ class RatingViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Rating.objects.filter(project_id=self.kwargs["project_pk"], user=self.request.user)
 
+    def get_project(self):
+        if not hasattr(self, "_project"):
+            self._project = get_object_or_404(Project, pk=self.kwargs["project_pk"])
+        return self._project
+
+    def get_serializer_context(self):
+        # RatingSerializer validates criteria against the project's category
+        context = super().get_serializer_context()
+        if "project_pk" in self.kwargs:
+            context["project"] = self.get_project()
+        return context
+
     def perform_create(self, serializer):
-        project = Project.objects.get(pk=self.kwargs["project_pk"])
         with transaction.atomic():
-            serializer.save(user=self.request.user, project=project)
+            serializer.save(user=self.request.user, project=self.get_project())
+
+    # One request for a judge's whole scorecard instead of one per criterion
+    @action(detail=False, methods=["post"], url_path="bulk", serializer_class=ScorecardSerializer)
+    def bulk(self, request, project_pk=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        scores = serializer.validated_data["scores"]
+        created, updated = Rating.submit_scorecard(request.user.pk, self.get_project().pk, scores)
+        return Response({"detail": "Scorecard saved", "created": created, "updated": updated})
+
+    # Keep the write and the project stats delta in one transaction
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        return Comment.objects.filter(project_id=self.kwargs["project_pk"], parent=None)
+        return Comment.objects.filter(project_id=self.kwargs["project_pk"]).select_related("user")
+
+    def get_cache_generations(self):
+        return [f"comments:{self.kwargs['project_pk']}"]
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self._list_threads)
+
+    def _list_threads(self):
+        # Keyset page of root comments, then their threads in one more query
+        roots = self.paginate_queryset(self.get_queryset().filter(parent=None))
+        return self.get_paginated_response(self.get_serializer(build_threads(roots), many=True).data)
+
+    # "Load more" for replies cut off by COMMENT_THREADS limits
+    @action(detail=True, methods=["get"])
+    def replies(self, request, project_pk=None, pk=None):
+        return self.conditional_response(request, lambda: self._load_replies(request))
+
+    def _load_replies(self, request):
+        comment = self.get_object()
+        try:
+            replies, next_cursor = load_replies(
+                comment, cursor=request.query_params.get("cursor"), limit=thread_setting("REPLY_LIMIT"),
+            )
+        except ValueError:
+            raise ValidationError({"cursor": "Invalid cursor"})
+        return Response({
+            "results": self.get_serializer(replies, many=True).data,
+            "next_cursor": next_cursor,
+        })
 
     def perform_create(self, serializer):
         project = Project.objects.get(pk=self.kwargs["project_pk"])
         serializer.save(user=self.request.user, project=project)
 
 
-class CriteriaViewSet(viewsets.ReadOnlyModelViewSet):
+class CriteriaViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Criteria.objects.all()
     serializer_class = CriteriaSerializer
-    permission_classes = [AllowAny]
\ No newline at end of file
+    permission_classes = [AllowAny]
+    pagination_class = None
+
+    # Served from the in-process registry, no queries
+    def get_queryset(self):
+        return criteria_registry.all()
+
+    def get_object(self):
+        try:
+            criteria = criteria_registry.get(int(self.kwargs["pk"]))
+        except ValueError:
+            criteria = None
+        if criteria is None:
+            raise Http404
+        return criteria
+
+    async def alist(self, request):
+        async def build():
+            return self.get_serializer(await criteria_registry.aall(), many=True).data
+        return await self.aconditional_response(request, lambda: self.acached_response(request, build))
+
+    async def aretrieve(self, request, pk=None):
+        async def build():
+            try:
+                criteria = await criteria_registry.aget(int(pk))
+            except ValueError:
+                criteria = None
+            if criteria is None:
+                raise Http404
+            return self.get_serializer(criteria).data
+        return await self.aconditional_response(request, lambda: self.acached_response(request, build))
+
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    """
+    GET /api/leaderboard/?limit=10              overall + every category
+    GET /api/leaderboard/?category=poll&limit=5 a single category
+    """
+    permission_classes = [AllowAny]
+
+    def get_params(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer"})
+        if limit < 1:
+            raise ValidationError({"limit": "Must be positive"})
+
+        category = request.query_params.get("category")
+        if category is not None and category not in dict(Project.CATEGORY_CHOICES):
+            raise ValidationError({"category": f"Unknown category '{category}'"})
+        return limit, category
+
+    @staticmethod
+    def entries(projects):
+        return LeaderboardEntrySerializer(projects, many=True).data
+
+    def list(self, request):
+        limit, category = self.get_params(request)
+        if category is not None:
+            results = vote_buffer.merge(self.entries(top_projects(category, limit)))
+            return Response({"category": category, "results": results})
+
+        board = leaderboard(limit)
+        return Response({
+            "overall": vote_buffer.merge(self.entries(board["overall"])),
+            "categories": {
+                key: vote_buffer.merge(self.entries(projects)) for key, projects in board["categories"].items()
+            },
+        })
+
+    async def alist(self, request):
+        limit, category = self.get_params(request)
+        if category is not None:
+            results = await vote_buffer.amerge(self.entries(await atop_projects(category, limit)))
+            return Response({"category": category, "results": results})
+
+        board = await aleaderboard(limit)
+        return Response({
+            "overall": await vote_buffer.amerge(self.entries(board["overall"])),
+            "categories": {
+                key: await vote_buffer.amerge(self.entries(projects)) for key, projects in board["categories"].items()
+            },
+        })
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    GET /api/exports/ratings/?format=csv&category=poll&since=2025-01-01&until=2025-01-31
+    GET /api/exports/votes/?format=ndjson
+    GET /api/exports/criteria_scores/?format=parquet
+
+    Streams the whole dataset (core/export.py); staff only.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [CSVRenderer, NDJSONRenderer, ParquetRenderer]
+    lookup_field = "dataset"
+    lookup_value_regex = "|".join(DATASETS)
+
+    def retrieve(self, request, dataset=None):
+        fmt = request.accepted_renderer.format
+        params = request.query_params
+        try:
+            chunks = export(
+                dataset, fmt, category=params.get("category"), since=params.get("since"), until=params.get("until")
+            )
+        except ExportError as exc:
+            raise ValidationError({"detail": str(exc)})
+        response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+        return response
@@ -0,0 +1,146 @@
+# core/vote_buffer.py
+"""
+Write-coalescing buffer for ``Project.vote_count``.
+
+With ``VOTE_BUFFER["ENABLED"]`` on, vote rows are still inserted and
+deleted durably, but the counter change goes to a per-project pending
+counter in the shared cache instead of an UPDATE on the hot Project row.
+``flush()`` (run every ``FLUSH_INTERVAL`` seconds by Celery beat) moves
+the pending deltas into the database with one UPDATE per dirty project.
+Readers add ``pending()`` to the stored count, so counts stay real time.
+
+The buffer needs a cache that every process shares (Redis): deltas
+buffered in a per-process cache such as LocMemCache would never reach
+the worker running the flush, so ``is_enabled()`` stays off there.
+
+Dirty projects are recorded in an append-only slot log (an atomic
+sequence counter plus one key per slot). A project is logged once per
+flush cycle, guarded by a marker key that also expires after
+``MARKER_TIMEOUT``, so a project whose slot got lost is logged again by
+its next vote.
+
+If the cache loses pending deltas, ``manage.py reconcile_stats`` rebuilds
+the counts from the Vote table.
+"""
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .cache import expire_lagged, response_cache_stats_lag
+
+DEFAULTS = {"ENABLED": False, "FLUSH_INTERVAL": 5, "MARKER_TIMEOUT": 60}
+
+PENDING_KEY = "nexus:votes:pending:{}"
+MARKER_KEY = "nexus:votes:dirty:{}"
+SLOT_KEY = "nexus:votes:slot:{}"
+SEQ_KEY = "nexus:votes:seq"
+FLUSHED_KEY = "nexus:votes:flushed"
+GAP_KEY = "nexus:votes:gap"
+
+# Backends whose entries only the current process sees
+PER_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+def buffer_setting(name):
+    return getattr(settings, "VOTE_BUFFER", {}).get(name, DEFAULTS[name])
+
+
+def is_enabled():
+    return buffer_setting("ENABLED") and not isinstance(caches["default"], PER_PROCESS_CACHES)
+
+
+def _incr(key, delta):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def add(project_id, delta):
+    """Buffer a vote_count change for a project."""
+    _incr(PENDING_KEY.format(project_id), delta)
+    if cache.add(MARKER_KEY.format(project_id), 1, timeout=buffer_setting("MARKER_TIMEOUT")):
+        slot = _incr(SEQ_KEY, 1)
+        cache.set(SLOT_KEY.format(slot), project_id, timeout=None)
+
+
+def pending(project_ids):
+    """Unflushed deltas for the given projects, as ``{project_id: delta}`` (zeros omitted)."""
+    keys = {PENDING_KEY.format(pk): pk for pk in project_ids}
+    return {keys[key]: delta for key, delta in cache.get_many(keys).items() if delta}
+
+
+def merge(projects):
+    """Add pending deltas to the ``vote_count`` of serialized project dicts, in place."""
+    if not is_enabled() or not projects:
+        return projects
+    deltas = pending([project["id"] for project in projects])
+    for project in projects:
+        project["vote_count"] += deltas.get(project["id"], 0)
+    return projects
+
+
+async def amerge(projects):
+    """``merge`` for async views, using the cache's async API."""
+    if not is_enabled() or not projects:
+        return projects
+    keys = {PENDING_KEY.format(project["id"]): project for project in projects}
+    for key, delta in (await cache.aget_many(keys)).items():
+        keys[key]["vote_count"] += delta
+    return projects
+
+
+def _dirty_projects():
+    last = cache.get(FLUSHED_KEY) or 0
+    current = cache.get(SEQ_KEY) or 0
+    if current <= last:
+        return set()
+    keys = {n: SLOT_KEY.format(n) for n in range(last + 1, current + 1)}
+    logged = cache.get_many(keys.values())
+    end = current
+    for n, key in keys.items():
+        if key in logged:
+            continue
+        # add() takes the slot number before it writes the slot. Stop short
+        # of an unwritten slot and read it next cycle; if the last cycle
+        # stopped there too, its writer is gone and the project's expiring
+        # marker gets it logged again.
+        if cache.get(GAP_KEY) != n:
+            cache.set(GAP_KEY, n, timeout=None)
+            end = n - 1
+            break
+    read = [keys[n] for n in range(last + 1, end + 1)]
+    cache.delete_many(read)
+    cache.set(FLUSHED_KEY, end, timeout=None)
+    return {logged[key] for key in read if key in logged}
+
+
+def flush(project_ids=()):
+    """
+    Move pending deltas into Project.vote_count: those of the logged
+    projects plus any in ``project_ids``. Returns the number of projects
+    updated.
+    """
+    from .models import Project
+
+    flushed = 0
+    for project_id in _dirty_projects() | set(project_ids):
+        # Drop the marker first: a vote from now on logs the project again,
+        # so an increment racing this flush is picked up next cycle.
+        cache.delete(MARKER_KEY.format(project_id))
+        key = PENDING_KEY.format(project_id)
+        delta = cache.get(key) or 0
+        if not delta:
+            continue
+        # Subtract what was read rather than resetting, keeping concurrent increments
+        cache.decr(key, delta)
+        Project.apply_vote_delta(project_id, delta, buffered=False)
+        flushed += 1
+    if flushed:
+        # Cached lists lag behind the stored counts, and the pending deltas
+        # that made up for it are gone now
+        expire_lagged("stats", response_cache_stats_lag())
+    return flushed
@@ -2,6 +2,10 @@
 ASGI config for polling_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Besides the regular API, it serves the async read endpoints under
+``/api/async/`` (core/async_views.py) natively on the event loop, and the
+Server-Sent Events stream at ``/api/stream/``. Streams are long-lived, so
+serve them from ASGI rather than WSGI.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,28 @@
+"""
+Celery app for polling_system.
+
+Run a worker with ``celery -A polling_system worker``. Configuration comes
+from the ``CELERY_*`` settings. The folders of a ``filesystem://`` broker are
+created once the app is configured.
+"""
+
+import os
+from pathlib import Path
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'polling_system.settings')
+
+app = Celery('polling_system')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+
+@app.on_after_configure.connect
+def create_broker_folders(sender, **kwargs):
+    if not sender.conf.broker_url.startswith('filesystem://'):
+        return
+    options = sender.conf.broker_transport_options
+    for name in ('data_folder_in', 'data_folder_out', 'processed_folder'):
+        if options.get(name):
+            Path(options[name]).mkdir(parents=True, exist_ok=True)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -38,6 +39,14 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer', 'JWT'),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Rotated refresh tokens are blacklisted in the shared cache (core/authentication.py)
+    'TOKEN_REFRESH_SERIALIZER': 'core.authentication.RotatingRefreshSerializer',
+}
+
+# Seconds an authenticated user is served from the cache instead of the
+# database (core/authentication.py); saves and deletes invalidate it.
+AUTH_CACHE = {
+    'USER_TTL': 60,
 }
 
 # Djoser Settings
@@ -81,15 +90,39 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 20,
+}
+
+# Comment threads: nesting depth and replies per comment rendered inline.
+# Anything beyond is served by /api/projects/<id>/comments/<id>/replies/
+COMMENT_THREADS = {
+    'MAX_DEPTH': 5,
+    'REPLY_LIMIT': 20,
+}
+
+# Project search, ?q= on /api/projects/ (core/search.py). Relevance is
+# multiplied by 1 + SCORE_WEIGHT * average_score / 10 + VOTE_WEIGHT * ln(1 + votes).
+# On Postgres, run "manage.py reindex_search" after changing CONFIG so the
+# search_vector trigger and the stored vectors follow it.
+PROJECT_SEARCH = {
+    'CONFIG': 'english',
+    'SCORE_WEIGHT': 0.5,
+    'VOTE_WEIGHT': 0.1,
 }
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -134,6 +167,114 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis when REDIS_URL is set (shared by all workers), per-process memory otherwise
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'nexus',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds a cached project/criteria response may live; invalidation is
+# generation based (core/cache.py), this only bounds memory. 0 disables.
+RESPONSE_CACHE_TIMEOUT = 300
+# Seconds project lists may lag behind vote/rating counters, so that
+# counter writes don't invalidate every cached list page. 0 follows them.
+RESPONSE_CACHE_STATS_LAG = 5
+
+
+# Stats pipeline (core/pipeline.py). ASYNC moves rating stats updates to a
+# Celery task, coalesced per project over WINDOW_SECONDS.
+STATS_PIPELINE = {
+    'ASYNC': os.environ.get('STATS_PIPELINE_ASYNC') == '1',
+    'WINDOW_SECONDS': 2,
+}
+
+# Vote buffer (core/vote_buffer.py). ENABLED queues vote_count changes in
+# the cache and flushes them to Project every FLUSH_INTERVAL seconds
+# (Celery beat), instead of updating the hot row on every vote. The
+# buffer lives in the shared cache, so it needs REDIS_URL: with the
+# per-process memory cache it stays off whatever ENABLED says.
+VOTE_BUFFER = {
+    'ENABLED': bool(REDIS_URL) and os.environ.get('VOTE_BUFFER_ENABLED') == '1',
+    'FLUSH_INTERVAL': 5,
+    'MARKER_TIMEOUT': 60,
+}
+
+# Live updates for /api/stream/ (core/events.py). BACKEND 'redis' fans
+# changes out to every ASGI process through REDIS_URL; 'inprocess' only
+# reaches streams served by the process that handled the write.
+LIVE_EVENTS = {
+    'BACKEND': 'redis' if REDIS_URL else 'inprocess',
+    'COALESCE_SECONDS': 0.25,
+    'KEEPALIVE_SECONDS': 15,
+}
+
+# Request instrumentation (core/instrumentation.py). SAMPLE_RATE of requests
+# get a Server-Timing header, N+1 detection and feed /api/metrics/, which
+# staff or a scraper sending "Authorization: Bearer <METRICS_TOKEN>" can read.
+# DUPLICATE_QUERY_THRESHOLD sits above fixed fan-outs such as the leaderboard's
+# query per category and below a page of PAGE_SIZE rows. Profiling a request
+# costs about ten cache writes, so INSTRUMENTATION_SAMPLE_RATE=1 (every
+# request) is for local debugging only.
+INSTRUMENTATION = {
+    'SAMPLE_RATE': float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', '0.05')),
+    'SERVER_TIMING': True,
+    'DUPLICATE_QUERY_THRESHOLD': 10,
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
+}
+
+# Image derivatives (core/images.py). Each upload gets a THUMBNAIL_SIZE
+# thumbnail (all that list pages send) and a variant per WIDTHS entry, in
+# every FORMATS. ASYNC runs that in a Celery worker after the upload
+# commits; it needs a real broker, so it follows REDIS_URL by default.
+IMAGE_DERIVATIVES = {
+    'ASYNC': os.environ.get('IMAGE_DERIVATIVES_ASYNC', '1' if REDIS_URL else '0') == '1',
+    'THUMBNAIL_SIZE': (400, 300),
+    'WIDTHS': (640, 1280, 1920),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'MAX_UPLOAD_BYTES': 10 * 1024 * 1024,
+}
+
+# Celery
+# Redis in production; CELERY_BROKER_URL=memory:// or filesystem:// for
+# offline runs, CELERY_TASK_ALWAYS_EAGER=1 to execute tasks inline.
+
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL or 'memory://')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1'
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'flush-vote-buffer': {
+        'task': 'core.tasks.flush_vote_buffer',
+        'schedule': VOTE_BUFFER['FLUSH_INTERVAL'],
+    },
+}
+
+if CELERY_BROKER_URL.startswith('filesystem://'):
+    CELERY_BROKER_TRANSPORT_OPTIONS = {
+        'data_folder_in': str(BASE_DIR / '.celery' / 'queue'),
+        'data_folder_out': str(BASE_DIR / '.celery' / 'queue'),
+        'processed_folder': str(BASE_DIR / '.celery' / 'processed'),
+        'store_processed': False,
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -170,6 +311,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploads
+# Every uploaded file is streamed to a temporary file on disk instead of
+# being held in memory; saving it to MEDIA_ROOT is then a rename.
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -10,8 +10,11 @@ from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from core.viewsets import (
     ProjectViewSet, ProjectImageViewSet,
-    RatingViewSet, CommentViewSet, CriteriaViewSet
+    RatingViewSet, CommentViewSet, CriteriaViewSet,
+    LeaderboardViewSet, ExportViewSet
 )
+from core import async_views
+from core.views import MetricsView
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
 router = DefaultRouter()
@@ -20,6 +23,8 @@ router.register(r"projects/(?P<project_pk>\d+)/images", ProjectImageViewSet, bas
 router.register(r"projects/(?P<project_pk>\d+)/ratings", RatingViewSet, basename="project-ratings")
 router.register(r"projects/(?P<project_pk>\d+)/comments", CommentViewSet, basename="project-comments")
 router.register(r"criteria", CriteriaViewSet)
+router.register(r"leaderboard", LeaderboardViewSet, basename="leaderboard")
+router.register(r"exports", ExportViewSet, basename="export")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -31,6 +36,15 @@ urlpatterns = [
     path('api/auth/', include('djoser.urls')),
     path('api/auth/', include('djoser.urls.jwt')),
     path("api/", include(router.urls)),
+
+    # ASGI-native reads (same payloads as above), see core/async_views.py
+    path("api/async/projects/", async_views.project_list, name="async-project-list"),
+    path("api/async/projects/<int:pk>/", async_views.project_detail, name="async-project-detail"),
+    path("api/async/criteria/", async_views.criteria_list, name="async-criteria-list"),
+    path("api/async/criteria/<int:pk>/", async_views.criteria_detail, name="async-criteria-detail"),
+    path("api/async/leaderboard/", async_views.leaderboard, name="async-leaderboard"),
+    path("api/stream/", async_views.live_stream, name="live-stream"),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),